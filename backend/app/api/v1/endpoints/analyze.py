@@ -3,6 +3,7 @@ Enhanced analysis endpoint for ATS Emulator V2
 Provides complete analysis matching frontend dashboard expectations
 """
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from starlette.concurrency import run_in_threadpool
 from typing import Optional
 import json
 
@@ -11,16 +12,58 @@ from app.services.ingestion.docx_parser import DOCXParser
 from app.services.features.extractor import FeatureExtractor
 from app.services.ml.friendliness_classifier import FriendlinessClassifier
 from app.services.ml.visibility_ranker import VisibilityRanker
+from app.services.ml.score_distribution import get_score_distribution
 from app.core.supabase_client import store_analysis, get_templates
+from app.core.lifecycle import WARMUP_RESUME, WARMUP_JD
 
 router = APIRouter()
 
-# Initialize services
-pdf_parser = PDFParser()
-docx_parser = DOCXParser()
-feature_extractor = FeatureExtractor()
-friendliness_classifier = FriendlinessClassifier()
-visibility_ranker = VisibilityRanker()
+# Service instances (lazy loaded; built and warmed by the app lifespan)
+_analyze_services = {}
+
+def get_pdf_parser():
+    if 'pdf_parser' not in _analyze_services:
+        _analyze_services['pdf_parser'] = PDFParser()
+    return _analyze_services['pdf_parser']
+
+def get_docx_parser():
+    if 'docx_parser' not in _analyze_services:
+        _analyze_services['docx_parser'] = DOCXParser()
+    return _analyze_services['docx_parser']
+
+def get_feature_extractor():
+    if 'feature_extractor' not in _analyze_services:
+        _analyze_services['feature_extractor'] = FeatureExtractor()
+    return _analyze_services['feature_extractor']
+
+def get_friendliness_classifier():
+    if 'friendliness_classifier' not in _analyze_services:
+        _analyze_services['friendliness_classifier'] = FriendlinessClassifier()
+    return _analyze_services['friendliness_classifier']
+
+def get_visibility_ranker():
+    if 'visibility_ranker' not in _analyze_services:
+        _analyze_services['visibility_ranker'] = VisibilityRanker()
+    return _analyze_services['visibility_ranker']
+
+
+def warm_features():
+    """Load NER/category/timeline models and run one dummy extraction."""
+    features = get_feature_extractor().extract_features({"raw_text": WARMUP_RESUME})
+    get_friendliness_classifier().predict(features)
+
+
+def warm_ranker():
+    """Load the relevance engine models and run one dummy ranking (not recorded)."""
+    get_visibility_ranker().rank(WARMUP_RESUME, WARMUP_JD, record=False)
+
+
+# Warmers for app.core.lifecycle, in load order
+WARMERS = {
+    "analyze.parsers": lambda: (get_pdf_parser(), get_docx_parser()),
+    "analyze.features": warm_features,
+    "analyze.ranker": warm_ranker,
+}
 
 
 def map_vendor_compatibility(features: dict, friendliness_result: dict) -> dict:
@@ -206,9 +249,9 @@ async def full_analysis(
         filename = file.filename.lower()
         
         if filename.endswith(".pdf"):
-            parsing_result = pdf_parser.parse(content)
+            parsing_result = get_pdf_parser().parse(content)
         elif filename.endswith(".docx"):
-            parsing_result = docx_parser.parse(content)
+            parsing_result = get_docx_parser().parse(content)
         else:
             raise HTTPException(
                 status_code=400,
@@ -219,11 +262,16 @@ async def full_analysis(
             raise HTTPException(status_code=500, detail=parsing_result["error"])
         
         # 2. Extract features
-        features = feature_extractor.extract_features(parsing_result)
+        # Model inference runs in the threadpool so concurrent requests can share batches
+        features = await run_in_threadpool(get_feature_extractor().extract_features, parsing_result)
         
         # 3. ATS Friendliness
-        friendliness_result = friendliness_classifier.predict(features)
+        friendliness_result = get_friendliness_classifier().predict(features)
         friendliness_score = friendliness_result.get("score", 0)
+        category = features.get("predicted_category")
+        score_distribution = get_score_distribution()
+        friendliness_percentile = score_distribution.percentile("friendliness", friendliness_score, category)
+        score_distribution.record("friendliness", friendliness_score, category)
         
         # 4. Visibility Ranking (if JD provided)
         match_score = None
@@ -231,7 +279,9 @@ async def full_analysis(
         
         if job_description:
             resume_text = parsing_result.get("raw_text", "")
-            visibility_result = visibility_ranker.rank(resume_text, job_description)
+            visibility_result = await run_in_threadpool(
+                get_visibility_ranker().rank, resume_text, job_description, category=category
+            )
             match_score = visibility_result.get("score", 0)
         
         # 5. Map to frontend format
@@ -266,7 +316,9 @@ async def full_analysis(
             "filename": file.filename,
             "file_size_bytes": len(content),
             "friendliness_score": friendliness_score,
+            "friendliness_percentile": friendliness_percentile,
             "match_score": match_score,
+            "match_percentile": visibility_result.get("percentile_value") if visibility_result else None,
             "vendor_compatibility": vendor_compatibility,
             "critical_issues": critical_issues,
             "ats_extracted": ats_extracted,
@@ -313,22 +365,22 @@ async def ingest_resume(
     parsing_result = {}
     
     if filename.endswith(".pdf"):
-        parsing_result = pdf_parser.parse(content)
+        parsing_result = get_pdf_parser().parse(content)
     elif filename.endswith(".docx"):
-        parsing_result = docx_parser.parse(content)
+        parsing_result = get_docx_parser().parse(content)
     else:
         raise HTTPException(status_code=400, detail="Unsupported file format. Please upload PDF or DOCX.")
     
     if "error" in parsing_result:
         raise HTTPException(status_code=500, detail=parsing_result["error"])
         
-    features = feature_extractor.extract_features(parsing_result)
-    friendliness_result = friendliness_classifier.predict(features)
+    features = get_feature_extractor().extract_features(parsing_result)
+    friendliness_result = get_friendliness_classifier().predict(features)
     
     visibility_result = None
     if jd_text:
         resume_text = parsing_result.get("raw_text", "")
-        visibility_result = visibility_ranker.rank(resume_text, jd_text)
+        visibility_result = get_visibility_ranker().rank(resume_text, jd_text, category=features.get("predicted_category"))
     
     return {
         "filename": file.filename,
@@ -0,0 +1,71 @@
+"""
+Artifact downloads (rewritten DOCX/PDF) from the content-addressed store.
+
+The URL is the sha256 of the content, so the ETag is too: If-None-Match
+answers 304 without touching the file. Range requests (resume, PDF viewers)
+are served by FileResponse, which hands the file to the server for sendfile
+when it supports the ASGI pathsend extension. Behind nginx, set
+ARTIFACTS_ACCEL_REDIRECT to an internal location mapped to ARTIFACTS_DIR and
+nginx serves the bytes itself (X-Accel-Redirect).
+"""
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from pathlib import Path
+import os
+import re
+import time
+import asyncio
+import logging
+
+from app.core.artifacts import artifact_store
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# e.g. "/protected-artifacts/" (nginx: location /protected-artifacts/ { internal; alias <ARTIFACTS_DIR>/; })
+ACCEL_REDIRECT_PREFIX = os.getenv("ARTIFACTS_ACCEL_REDIRECT", "")
+
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+@router.get("/artifacts/{digest}")
+async def download_artifact(digest: str, request: Request):
+    """
+    Download a generated file.
+
+    Supports If-None-Match (304) and single/multi byte ranges (206).
+    """
+    if not _DIGEST.fullmatch(digest):
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    info = await asyncio.to_thread(artifact_store.get, digest)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+
+    etag = f'"{digest}"'
+    # Content never changes under its hash; cache until it expires
+    max_age = max(0, int(info["expires_at"] - time.time()))
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={max_age}, immutable"}
+
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        metrics.inc("artifact_downloads", status="304")
+        return Response(status_code=304, headers=headers)
+
+    metrics.inc("artifact_downloads", status="200")
+    if ACCEL_REDIRECT_PREFIX:
+        relative = Path(info["path"]).relative_to(artifact_store.root).as_posix()
+        return Response(
+            media_type=info["content_type"],
+            headers={
+                **headers,
+                "X-Accel-Redirect": ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + relative,
+                "Content-Disposition": f'attachment; filename="{info["filename"]}"'
+            }
+        )
+    return FileResponse(info["path"], media_type=info["content_type"], filename=info["filename"], headers=headers)
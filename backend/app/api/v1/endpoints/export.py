@@ -4,43 +4,11 @@ Export endpoint to generate PDF from editor content
 from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel
 from typing import List, Optional, Dict
-from fpdf import FPDF
 import io
 
-router = APIRouter()
-
-# Modern Professional Colors (Same as generate_all_previews.py)
-PRIMARY_COLOR = (0, 0, 0)       # Black text
-ACCENT_COLOR = (0, 51, 102)     # Navy Blue for headers
-TEXT_COLOR = (50, 50, 50)       # Dark Gray for body
-
-class ATSResume(FPDF):
-    def header(self):
-        pass
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.set_text_color(128, 128, 128)
-        self.cell(0, 10, 'Page ' + str(self.page_no()), 0, 0, 'C')
+from app.services.export.schema_pdf_renderer import ATSResume, ACCENT_COLOR
 
-    def section_title(self, title):
-        self.ln(4)
-        self.set_font('Arial', 'B', 11)
-        self.set_text_color(*ACCENT_COLOR)
-        self.cell(0, 6, title.upper(), 0, 1, 'L')
-        
-        # Accent line
-        self.set_draw_color(*ACCENT_COLOR)
-        self.set_line_width(0.5)
-        self.line(15, self.get_y(), 195, self.get_y())
-        self.ln(2)
-
-    def section_body(self, body):
-        self.set_font('Arial', '', 10)
-        self.set_text_color(*TEXT_COLOR)
-        self.multi_cell(0, 5, body)
-        self.ln(2)
+router = APIRouter()
 
 class ExportRequest(BaseModel):
     name: str = "Your Name"
@@ -3,6 +3,7 @@ GitHub repository analysis endpoints.
 """
 import logging
 from fastapi import APIRouter, Form, HTTPException
+from starlette.concurrency import run_in_threadpool
 from typing import Optional
 
 from app.services.github.github_client import GitHubClient
@@ -52,7 +53,7 @@ async def analyze_github_repos(
         logger.info(f"Analyzing repositories for user: {username}, role: {job_role}, AI: {use_ai}, pinned: {len(pinned_list)}")
         
         # Fetch repositories
-        repositories = github_client.get_user_repositories(username)
+        repositories = await run_in_threadpool(github_client.get_user_repositories, username)
         
         if not repositories:
             return {
@@ -67,7 +68,8 @@ async def analyze_github_repos(
             }
         
         # Analyze and score repositories
-        analyzed_repos = analyzer.analyze_repositories(
+        # AI analyses run concurrently without blocking the event loop
+        analyzed_repos = await analyzer.analyze_repositories_async(
             repositories,
             job_role,
             job_description,
@@ -82,7 +84,7 @@ async def analyze_github_repos(
         top_repos = analyzed_repos[:5]
         
         # Get rate limit info
-        rate_limit = github_client.get_rate_limit()
+        rate_limit = await run_in_threadpool(github_client.get_rate_limit)
         
         # Check if any repos were AI-enhanced
         ai_used = any(repo.get("ai_enhanced", False) for repo in analyzed_repos)
@@ -120,7 +122,7 @@ async def get_rate_limit(github_token: Optional[str] = None):
     """
     try:
         github_client = GitHubClient(access_token=github_token)
-        rate_limit = github_client.get_rate_limit()
+        rate_limit = await run_in_threadpool(github_client.get_rate_limit)
         
         return {
             "rate_limit": rate_limit,
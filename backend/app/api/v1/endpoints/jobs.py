@@ -0,0 +1,116 @@
+"""
+Background job endpoints for the long-running rewrite pipelines.
+
+Submitting returns a job id right away; poll GET /jobs/{id} for stage
+progress, partial section rewrites and, once finished, the same body the
+synchronous endpoint would have returned.
+"""
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from typing import Optional
+import logging
+
+from app.core.jobs import job_queue
+from app.core.llm_usage import current_usage
+from app.api.v1.endpoints.rewrite import get_rewrite_pipeline
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def _rewrite_full_job(params, input_bytes, checkpoint):
+    return get_rewrite_pipeline().events(
+        input_bytes, params["filename"], params["job_description"], checkpoint, mode=params.get("mode")
+    )
+
+
+def _rewrite_brutal_job(params, input_bytes, checkpoint):
+    return get_rewrite_pipeline().brutal_review_events(
+        input_bytes, params["filename"], params["job_description"], checkpoint
+    )
+
+
+# LibreOffice and the rewrite fan-out are heavy: few full rewrites at a time
+job_queue.register("rewrite_full", _rewrite_full_job, concurrency=2)
+job_queue.register("rewrite_brutal", _rewrite_brutal_job, concurrency=4)
+
+
+async def _submit(job_type: str, file: UploadFile, job_description: str, user_id: str, mode: Optional[str] = None):
+    if not file.filename.endswith(('.pdf', '.docx')):
+        raise HTTPException(status_code=400, detail="Unsupported file type. Please upload PDF or DOCX.")
+    file_bytes = await file.read()
+    # The job's LLM spend counts against the submitting user's daily budget
+    usage = current_usage()
+    job_id = await job_queue.submit_async(
+        job_type,
+        {
+            "filename": file.filename,
+            "job_description": job_description,
+            "user_id": user_id,
+            "budget_user": usage.user if usage else None,
+            "mode": mode
+        },
+        file_bytes
+    )
+    logger.info(f"Queued {job_type} job {job_id} for {file.filename}")
+    return {"job_id": job_id, "status": "queued", "status_url": f"/api/v1/jobs/{job_id}"}
+
+
+@router.post("/jobs/rewrite/full", status_code=202)
+async def submit_rewrite_full(
+    file: UploadFile = File(...),
+    job_description: str = Form(...),
+    user_id: str = Form("anonymous"),
+    mode: Optional[str] = Form(None)
+):
+    """Queue a /rewrite/full run."""
+    return await _submit("rewrite_full", file, job_description, user_id, mode)
+
+
+@router.post("/jobs/rewrite/brutal", status_code=202)
+async def submit_rewrite_brutal(
+    file: UploadFile = File(...),
+    job_description: str = Form(...),
+    user_id: str = Form("anonymous")
+):
+    """Queue a /rewrite/brutal run."""
+    return await _submit("rewrite_brutal", file, job_description, user_id)
+
+
+@router.get("/jobs")
+async def list_jobs(type: Optional[str] = None, status: Optional[str] = None, limit: int = 50):
+    return {"jobs": await job_queue.list_async(job_type=type, status=status, limit=min(limit, 500))}
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Job status.
+
+    Returns:
+        status (queued|running|succeeded|failed|cancelled), current stage,
+        progress (completed stages, rewritten sections so far), result, error
+    """
+    job = await job_queue.get_async(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    status = await job_queue.cancel_async(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_id": job_id, "status": status}
+
+
+@router.post("/jobs/{job_id}/retry")
+async def retry_job(job_id: str):
+    """Re-queue a failed job; it resumes from the stage that failed."""
+    job = await job_queue.get_async(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not await job_queue.retry_async(job_id):
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}; only failed jobs can be retried")
+    return {"job_id": job_id, "status": "queued"}
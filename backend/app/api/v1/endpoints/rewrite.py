@@ -2,20 +2,22 @@
 AI-powered rewrite endpoint for resume optimization with Gemini
 """
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
-import os
-import tempfile
+import json
 import logging
-from pathlib import Path
 
 # Import services
 from app.services.ingestion.pdf_parser import PDFParser
 from app.services.ingestion.docx_parser import DOCXParser
 from app.services.ingestion.layout_schema_extractor import LayoutSchemaExtractor
 from app.services.rewrite.rewriter import ResumeRewriter
+from app.services.rewrite.fast_rewriter import FastRewriter, get_fast_rewriter
+from app.services.rewrite.pipeline import RewritePipeline, RewritePipelineError
 from app.services.export.docx_rebuilder import DOCXRebuilder
 from app.services.export.pdf_exporter import PDFExporter
+from app.services.export.schema_pdf_renderer import SchemaPDFRenderer
 from app.services.ml.friendliness_classifier import FriendlinessClassifier
 from app.services.ml.visibility_ranker import VisibilityRanker
 from app.services.analysis.comprehensive_analyzer import ComprehensiveAnalyzer
@@ -57,6 +59,11 @@ def get_pdf_exporter():
         _rewrite_services['pdf_exporter'] = PDFExporter()
     return _rewrite_services['pdf_exporter']
 
+def get_pdf_renderer():
+    if 'pdf_renderer' not in _rewrite_services:
+        _rewrite_services['pdf_renderer'] = SchemaPDFRenderer()
+    return _rewrite_services['pdf_renderer']
+
 def get_friendliness_classifier():
     if 'friendliness_classifier' not in _rewrite_services:
         _rewrite_services['friendliness_classifier'] = FriendlinessClassifier()
@@ -72,6 +79,38 @@ def get_comprehensive_analyzer():
         _rewrite_services['comprehensive_analyzer'] = ComprehensiveAnalyzer()
     return _rewrite_services['comprehensive_analyzer']
 
+def get_feature_extractor():
+    if 'feature_extractor' not in _rewrite_services:
+        from app.services.features.extractor import FeatureExtractor
+        _rewrite_services['feature_extractor'] = FeatureExtractor()
+    return _rewrite_services['feature_extractor']
+
+def _llm_rewriter_or_none():
+    # Without provider keys the pipeline still serves fast (local) rewrites
+    try:
+        return get_rewriter()
+    except RuntimeError as e:
+        logger.warning(f"LLM rewriter unavailable, only fast rewrites will run: {e}")
+        return None
+
+def get_rewrite_pipeline():
+    if 'pipeline' not in _rewrite_services:
+        _rewrite_services['pipeline'] = RewritePipeline(
+            pdf_parser=get_pdf_parser(),
+            docx_parser=get_docx_parser(),
+            comprehensive_analyzer=get_comprehensive_analyzer(),
+            schema_extractor=get_schema_extractor(),
+            visibility_ranker=get_visibility_ranker(),
+            feature_extractor=get_feature_extractor(),
+            friendliness_classifier=get_friendliness_classifier(),
+            rewriter=_llm_rewriter_or_none(),
+            docx_rebuilder=get_docx_rebuilder(),
+            pdf_exporter=get_pdf_exporter(),
+            fast_rewriter=get_fast_rewriter(),
+            pdf_renderer=get_pdf_renderer()
+        )
+    return _rewrite_services['pipeline']
+
 
 class RewriteSectionRequest(BaseModel):
     """Request model for section rewrite"""
@@ -79,6 +118,8 @@ class RewriteSectionRequest(BaseModel):
     section_index: int
     job_description: str
     target_keywords: List[str]
+    # "llm" or "fast" (local rewrite, no AI call); SKILLS defaults to fast, others to llm
+    mode: Optional[str] = None
 
 
 class RewriteFullResponse(BaseModel):
@@ -112,6 +153,11 @@ async def rewrite_section(request: RewriteSectionRequest):
         section = sections[request.section_index]
         section_type = section.get("type")
         
+        # Skills/keyword-gap fixes need no LLM round trip; the AI rewrite is opt-in (mode=llm)
+        default_mode = "fast" if section_type == "SKILLS" else "llm"
+        if (request.mode or default_mode).lower() == "fast":
+            return _rewrite_section_fast(request, section)
+        
         # Rewrite based on section type
         if section_type == "EXPERIENCE":
             # Rewrite experience entry
@@ -119,7 +165,7 @@ async def rewrite_section(request: RewriteSectionRequest):
             # Assuming 'section_content' should be derived from 'section'
             # The original code used section["entries"][0]
             section_content = section.get("entries")[0] if section.get("entries") else {}
-            result = rewriter.gemini_client.rewrite_experience_entry(
+            result = await rewriter.ai_client.rewrite_experience_entry_async(
                 entry=section_content,
                 job_description=request.job_description or "",
                 target_keywords=request.target_keywords or []
@@ -133,7 +179,7 @@ async def rewrite_section(request: RewriteSectionRequest):
                 }
         elif section_type == "SUMMARY":
             rewriter = get_rewriter() # Added lazy getter
-            result = rewriter.gemini_client.rewrite_summary(
+            result = await rewriter.ai_client.rewrite_summary_async(
                 section.get("raw", ""),
                 request.job_description,
                 request.target_keywords
@@ -146,7 +192,7 @@ async def rewrite_section(request: RewriteSectionRequest):
             }
         elif section_type == "SKILLS":
             rewriter = get_rewriter() # Added lazy getter
-            result = rewriter.gemini_client.rewrite_skills(
+            result = await rewriter.ai_client.rewrite_skills_async(
                 section.get("raw", ""),
                 request.job_description,
                 request.target_keywords
@@ -165,11 +211,42 @@ async def rewrite_section(request: RewriteSectionRequest):
         raise HTTPException(status_code=500, detail=f"Rewrite failed: {str(e)}")
 
 
+def _rewrite_section_fast(request: RewriteSectionRequest, section: Dict[str, Any]) -> Dict[str, Any]:
+    """/rewrite/section with mode=fast: FastRewriter, milliseconds, no AI call."""
+    fast_rewriter = get_fast_rewriter()
+    section_type = section.get("type")
+    if section_type == "EXPERIENCE":
+        section_content = section.get("entries")[0] if section.get("entries") else {}
+        result = fast_rewriter.rewrite_experience_entry(section_content)
+        rewritten = result.get("bullets", [])
+    elif section_type == "SUMMARY":
+        result = fast_rewriter.rewrite_summary(section.get("raw", ""))
+        rewritten = result.get("content", "")
+    elif section_type == "SKILLS":
+        result = fast_rewriter.rewrite_skills(
+            section.get("raw", ""),
+            request.job_description or "",
+            request.target_keywords or [],
+            FastRewriter.evidence_text(request.layout_schema)
+        )
+        rewritten = result.get("content", "")
+    else:
+        raise HTTPException(status_code=400, detail=f"Section type {section_type} not supported for rewriting")
+    return {
+        "section_index": request.section_index,
+        "section_type": section_type,
+        "rewritten": rewritten,
+        "explanation": result.get("explanation", ""),
+        "mode": "fast"
+    }
+
+
 @router.post("/rewrite/full")
 async def rewrite_full(
     file: UploadFile = File(...),
     job_description: str = Form(...),
-    user_id: str = Form("anonymous")
+    user_id: str = Form("anonymous"),
+    mode: Optional[str] = Form(None)
 ):
     """
     Rewrite entire resume using Gemini AI.
@@ -178,147 +255,63 @@ async def rewrite_full(
         file: Resume file (PDF or DOCX)
         job_description: Target job description
         user_id: User identifier
+        mode: "llm" (AI rewrite) or "fast" (local skills/format fixes, no AI call);
+            default REWRITE_DEFAULT_MODE
         
     Returns:
         Complete rewrite results with before/after scores
     """
     try:
-        # Read file
         file_bytes = await file.read()
-        filename = file.filename
-        
-        # Parse file (lazy loaded)
-        logger.info(f"Parsing resume: {filename}")
-        if file.filename.endswith('.pdf'):
-            parser = get_pdf_parser()
-        elif file.filename.endswith('.docx'):
-            parser = get_docx_parser()
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file type. Please upload PDF or DOCX.")
-        
-        parsing_result = parser.parse(file_bytes)
-        text = parsing_result.get("raw_text", "")
-        
-        if not text:
-            raise HTTPException(status_code=400, detail="Could not extract text from resume")
-        
-        # COMPREHENSIVE ANALYSIS (NEW)
-        logger.info("Performing comprehensive analysis")
-        comprehensive_analyzer = get_comprehensive_analyzer() # Use lazy getter
-        comprehensive_analysis = comprehensive_analyzer.analyze_comprehensive(text, job_description)
-        
-        # Extract layout schema
-        logger.info("Extracting layout schema")
-        schema_extractor = get_schema_extractor()
-        layout_schema = schema_extractor.extract_from_parsed_data(parsing_result, filename) # Kept original method signature
-        
-        # Score original resume (lazy loaded)
-        logger.info("Scoring original resume")
-        
-        # Get visibility score
-        visibility_ranker = get_visibility_ranker()
-        visibility_before = visibility_ranker.rank(raw_text, job_description)
-        
-        # Get friendliness score
-        from app.services.features.extractor import FeatureExtractor
-        feature_extractor = FeatureExtractor()
-        features = feature_extractor.extract_features(parsing_result)
-        friendliness_classifier = get_friendliness_classifier()
-        friendliness_before = friendliness_classifier.predict(features)
-        
-        # Perform full resume rewrite (lazy loaded)
-        logger.info("Rewriting resume")
-        target_keywords = visibility_before.get("missing_keywords", [])
-        
-        rewriter = get_rewriter()
-        rewrite_result = rewriter.rewrite_full_resume(
-            layout_schema=layout_schema,
-            job_description=job_description,
-            target_keywords=target_keywords
-        )
-        
-        rewritten_schema = rewrite_result["rewritten_schema"]
-        delta_report = rewrite_result["delta_report"]
-        explanations = rewrite_result["explanations"]
-        
-        # Rebuild DOCX (lazy loaded)
-        logger.info("Rebuilding DOCX from schema")
-        
-        # Create output directory if not exists
-        output_dir = Path("outputs")
-        output_dir.mkdir(exist_ok=True)
-        
-        # Generate unique filename
-        import uuid
-        file_id = str(uuid.uuid4())
-        docx_filename = f"rewritten_{file_id}.docx"
-        docx_path = output_dir / docx_filename
-        
-        docx_rebuilder = get_docx_rebuilder()
-        docx_rebuilder.rebuild_from_schema(rewritten_schema, str(docx_path))
-        
-        # Convert to PDF (lazy loaded)
-        logger.info("Converting to PDF")
-        pdf_filename = f"rewritten_{file_id}.pdf"
-        pdf_path = output_dir / pdf_filename
-        
-        try:
-            pdf_exporter = get_pdf_exporter()
-            pdf_exporter.convert_docx_to_pdf(str(docx_path), str(output_dir))
-            final_file_url = f"/outputs/{pdf_filename}"
-        except Exception as e:
-            logger.warning(f"PDF conversion failed: {e}. Using DOCX only.")
-            final_file_url = f"/outputs/{docx_filename}"
-            pdf_path = None
-        
-        # Re-score rewritten resume (lazy loaded)
-        logger.info("Scoring rewritten resume")
-        
-        # Read rewritten text from DOCX
-        docx_parser = get_docx_parser()
-        rewritten_docx_result = docx_parser.parse(open(docx_path, 'rb').read())
-        rewritten_text = rewritten_docx_result.get("raw_text", "")
-        
-        visibility_ranker = get_visibility_ranker()
-        visibility_after = visibility_ranker.rank(rewritten_text, job_description)
-        
-        # Re-extract features for friendliness
-        from app.services.features.extractor import FeatureExtractor
-        feature_extractor = FeatureExtractor()
-        rewritten_features = feature_extractor.extract_features(rewritten_docx_result)
-        friendliness_classifier = get_friendliness_classifier()
-        friendliness_after = friendliness_classifier.predict(rewritten_features)
-        
-        # Build response
-        response = {
-            "before_score": visibility_before.get("score", 0),
-            "after_score": visibility_after.get("score", 0),
-            "before_friendliness": friendliness_before.get("score", 0),
-            "after_friendliness": friendliness_after.get("score", 0),
-            "file_url": f"http://localhost:8000{final_file_url}", # Full URL for local dev
-            "docx_path": str(docx_path),
-            "pdf_path": str(pdf_path) if pdf_path else None,
-            "original_text": text,  # Add original text for comparison
-            "rewritten_text": rewritten_text,  # Add rewritten text for comparison
-            "delta_report": {
-                **delta_report,
-                "score_improvement": visibility_after.get("score", 0) - visibility_before.get("score", 0),
-                "friendliness_improvement": friendliness_after.get("score", 0) - friendliness_before.get("score", 0),
-                "keywords_before": len(visibility_before.get("missing_keywords", [])),
-                "keywords_after": len(visibility_after.get("missing_keywords", [])),
-            },
-            "explanations": explanations
-        }
-        
-        logger.info(f"Rewrite complete. Score: {visibility_before.get('score', 0)} → {visibility_after.get('score', 0)}")
-        
-        return response
-        
+        return await get_rewrite_pipeline().run(file_bytes, file.filename, job_description, mode=mode)
+    except RewritePipelineError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Full rewrite failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Rewrite failed: {str(e)}")
 
 
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.post("/rewrite/full/stream")
+async def rewrite_full_stream(
+    file: UploadFile = File(...),
+    job_description: str = Form(...),
+    user_id: str = Form("anonymous"),
+    mode: Optional[str] = Form(None)
+):
+    """
+    Same as /rewrite/full, streamed as server-sent events.
+    
+    Emits `stage` events as each step starts and finishes, `scores_before`
+    once the original resume is scored, a `section` event for every rewritten
+    section as soon as its LLM call completes, then `complete` with the full
+    /rewrite/full body (scores, file URL). Failures end the stream with `error`.
+    """
+    # Read before streaming: the upload is closed once the handler returns
+    file_bytes = await file.read()
+    filename = file.filename
+    
+    async def event_stream():
+        try:
+            pipeline = get_rewrite_pipeline()
+            async for event in pipeline.events(file_bytes, filename, job_description, mode=mode):
+                yield _sse(event["event"], event["data"])
+        except RewritePipelineError as e:
+            yield _sse("error", {"status_code": 400, "detail": str(e)})
+        except Exception as e:
+            logger.error(f"Streaming rewrite failed: {e}", exc_info=True)
+            yield _sse("error", {"status_code": 500, "detail": f"Rewrite failed: {str(e)}"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # Keep legacy endpoint for backward compatibility
 @router.post("/rewrite/ats_optimized")
 async def rewrite_resume_legacy(resume_text: str = Form(...), jd_text: str = Form(...)):
@@ -348,52 +341,10 @@ async def rewrite_with_brutal_feedback(
         Marked-up resume, changes, company expectations, and harsh review
     """
     try:
-        # Read file
         file_bytes = await file.read()
-        filename = file.filename
-        
-        # Parse file
-        logger.info(f"Parsing resume for brutal review: {filename}")
-        if file.filename.endswith('.pdf'):
-            parser = get_pdf_parser()
-        elif file.filename.endswith('.docx'):
-            parser = get_docx_parser()
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file type. Please upload PDF or DOCX.")
-        
-        parsing_result = parser.parse(file_bytes)
-        original_text = parsing_result.get("raw_text", "")
-        
-        if not original_text:
-            raise HTTPException(status_code=400, detail="Could not extract text from resume")
-        
-        # Get rewriter with brutal review capability
-        logger.info("Generating brutal review")
-        rewriter = get_rewriter()
-        
-        # Call the new brutal review method
-        brutal_result = rewriter.ai_client.rewrite_with_brutal_review(
-            original_resume_text=original_text,
-            job_description=job_description
-        )
-        
-        # Extract layout schema for rebuilding
-        schema_extractor = get_schema_extractor()
-        layout_schema = schema_extractor.extract_from_parsed_data(parsing_result, filename)
-        
-        # Build DOCX from plain_text (we'll need to update the schema with new text)
-        # For now, just return the JSON response
-        # TODO: Rebuild DOCX with marked-up content
-        
-        return {
-            "plain_text": brutal_result.get("plain_text", ""),
-            "marked_up_resume": brutal_result.get("marked_up_resume", ""),
-            "changes": brutal_result.get("changes", []),
-            "company_expectations": brutal_result.get("company_expectations", {}),
-            "harsh_review": brutal_result.get("harsh_review", {}),
-            "original_text": original_text
-        }
-        
+        return await get_rewrite_pipeline().run_brutal_review(file_bytes, file.filename, job_description)
+    except RewritePipelineError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Brutal review failed: {e}")
         raise HTTPException(status_code=500, detail=f"Brutal review failed: {str(e)}")
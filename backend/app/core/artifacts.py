@@ -0,0 +1,234 @@
+"""
+Content-addressed artifact store for generated files (rewritten DOCX/PDF).
+
+Files are stored once per sha256 of their content under ARTIFACTS_DIR
+(ab/abcdef...), so identical outputs (the native PDF renderer is
+deterministic) are written once. Metadata lives in SQLite (shared by worker
+processes): owner, content type, download name, created/accessed time and
+expiry. Re-storing existing content refreshes its expiry.
+
+Eviction: entries expire after their TTL (ARTIFACT_TTL_SECONDS by default),
+and once the store exceeds ARTIFACTS_MAX_BYTES the least recently accessed
+entries are removed. A background sweeper runs every
+ARTIFACT_SWEEP_INTERVAL seconds; writes over quota evict immediately.
+
+Downloads: GET /api/v1/artifacts/{sha256} (see
+app.api.v1.endpoints.artifacts).
+"""
+
+import os
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_DATA_DIR = Path(__file__).parent.parent.parent / "data"
+ARTIFACTS_DIR = os.getenv("ARTIFACTS_DIR", str(_DATA_DIR / "artifacts"))
+ARTIFACTS_DB_PATH = os.getenv("ARTIFACTS_DB_PATH", str(_DATA_DIR / "artifacts.sqlite3"))
+ARTIFACT_TTL_SECONDS = float(os.getenv("ARTIFACT_TTL_SECONDS", str(7 * 24 * 3600)))
+ARTIFACTS_MAX_BYTES = int(os.getenv("ARTIFACTS_MAX_BYTES", str(1024 ** 3)))
+ARTIFACT_SWEEP_INTERVAL = float(os.getenv("ARTIFACT_SWEEP_INTERVAL", "600"))
+ARTIFACTS_URL_PREFIX = "/api/v1/artifacts"
+
+
+class ArtifactStore:
+    def __init__(
+        self,
+        root: str = ARTIFACTS_DIR,
+        db_path: str = ARTIFACTS_DB_PATH,
+        ttl_seconds: float = ARTIFACT_TTL_SECONDS,
+        max_bytes: int = ARTIFACTS_MAX_BYTES
+    ):
+        self.root = Path(root)
+        self.db_path = Path(db_path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread (and per process: reopened after fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS artifacts (
+                    digest TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    content_type TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    owner TEXT,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_accessed ON artifacts(accessed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_expires ON artifacts(expires_at)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def put(
+        self,
+        data: bytes,
+        content_type: str,
+        filename: str,
+        owner: Optional[str] = None,
+        ttl_seconds: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Store content (once per hash) and return its metadata.
+
+        Args:
+            data: File contents
+            content_type: MIME type served on download
+            filename: Download name (Content-Disposition)
+            owner: User the artifact was generated for
+            ttl_seconds: Lifetime (default ARTIFACT_TTL_SECONDS)
+
+        Returns:
+            Artifact metadata with digest, path and url
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest)
+        now = time.time()
+        expires_at = now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+
+        deduplicated = path.exists()
+        if not deduplicated:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Atomic: readers never see a partial file
+            fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except BaseException:
+                Path(tmp).unlink(missing_ok=True)
+                raise
+        metrics.inc("artifact_puts", deduplicated="yes" if deduplicated else "no")
+
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO artifacts (digest, size, content_type, filename, owner, created_at, accessed_at, expires_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(digest) DO UPDATE SET accessed_at = excluded.accessed_at, "
+            "expires_at = MAX(expires_at, excluded.expires_at)",
+            (digest, len(data), content_type, filename, owner, now, now, expires_at)
+        )
+        if self.total_bytes() > self.max_bytes:
+            self.sweep(keep=digest)
+        return self._info(conn.execute("SELECT * FROM artifacts WHERE digest = ?", (digest,)).fetchone())
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Metadata for a live artifact (marks it recently used), or None."""
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM artifacts WHERE digest = ?", (digest,)).fetchone()
+        if row is None:
+            return None
+        info = self._info(row)
+        if info["expires_at"] < time.time() or not Path(info["path"]).exists():
+            self._delete(digest)
+            return None
+        conn.execute("UPDATE artifacts SET accessed_at = ? WHERE digest = ?", (time.time(), digest))
+        return info
+
+    def _info(self, row) -> Dict[str, Any]:
+        digest, size, content_type, filename, owner, created_at, accessed_at, expires_at = row
+        return {
+            "digest": digest,
+            "size": size,
+            "content_type": content_type,
+            "filename": filename,
+            "owner": owner,
+            "created_at": created_at,
+            "accessed_at": accessed_at,
+            "expires_at": expires_at,
+            "path": str(self.path_for(digest)),
+            "url": f"{ARTIFACTS_URL_PREFIX}/{digest}"
+        }
+
+    def _delete(self, digest: str):
+        # Row first: a concurrent put of the same content re-creates both
+        self._connect().execute("DELETE FROM artifacts WHERE digest = ?", (digest,))
+        self.path_for(digest).unlink(missing_ok=True)
+
+    def total_bytes(self) -> int:
+        return self._connect().execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+
+    def sweep(self, keep: Optional[str] = None) -> int:
+        """
+        Remove expired artifacts, then least recently used ones until under quota.
+
+        Args:
+            keep: Digest never evicted (the artifact being stored)
+
+        Returns:
+            Number of artifacts removed
+        """
+        conn = self._connect()
+        removed = 0
+        expired = conn.execute(
+            "SELECT digest FROM artifacts WHERE expires_at < ? AND digest IS NOT ?", (time.time(), keep)
+        ).fetchall()
+        for (digest,) in expired:
+            self._delete(digest)
+            removed += 1
+            metrics.inc("artifact_evictions", reason="expired")
+
+        total = self.total_bytes()
+        if total > self.max_bytes:
+            for digest, size in conn.execute("SELECT digest, size FROM artifacts ORDER BY accessed_at").fetchall():
+                if total <= self.max_bytes:
+                    break
+                if digest == keep:
+                    continue
+                self._delete(digest)
+                total -= size
+                removed += 1
+                metrics.inc("artifact_evictions", reason="quota")
+
+        metrics.set_gauge("artifact_store_bytes", total)
+        metrics.set_gauge("artifact_store_count", conn.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0])
+        if removed:
+            logger.info(f"Artifact sweep removed {removed} files ({total} bytes stored)")
+        return removed
+
+    async def start(self):
+        """Background service hook (see app.core.lifecycle.build_lifespan)."""
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+    async def _sweep_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                logger.error(f"Artifact sweep failed: {e}")
+            await asyncio.sleep(ARTIFACT_SWEEP_INTERVAL)
+
+
+artifact_store = ArtifactStore()
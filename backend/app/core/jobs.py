@@ -0,0 +1,446 @@
+"""
+Durable background jobs for long-running pipelines.
+
+Submitting a job stores its input in SQLite and returns an id immediately;
+a dispatcher in every server process claims queued jobs and runs their
+handler on the event loop. Handlers are async generators of pipeline events
+(see app.services.rewrite.pipeline): stage and section events are written to
+the job's progress, the "complete" event becomes its result.
+
+- Concurrency is capped per job type across all processes sharing the
+  store (the claim counts running jobs inside one write transaction).
+- Each handler gets a checkpoint dict that is persisted as stages finish, so
+  a failed job is retried from the stage that failed rather than from scratch.
+  Failures are retried automatically up to JOB_MAX_ATTEMPTS, after which
+  POST /jobs/{id}/retry re-queues them.
+- Cancellation is a flag polled by the running worker, which then cancels the
+  handler (and with it any in-flight LLM calls).
+- Running jobs heartbeat; jobs whose process died are re-queued.
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, AsyncIterator
+
+from app.core.metrics import metrics
+from app.core.llm_usage import usage_scope_async
+
+logger = logging.getLogger(__name__)
+
+JOBS_DB_PATH = os.getenv(
+    "JOBS_DB_PATH",
+    str(Path(__file__).parent.parent.parent / "data" / "jobs.sqlite3")
+)
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+# A running job not heard from for this long is assumed orphaned and re-queued
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "300"))
+# Finished jobs (and their inputs) are dropped after this long
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(24 * 3600)))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+# Section events kept in a job's progress for polling clients
+_MAX_PROGRESS_SECTIONS = 200
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=str)
+
+
+class JobStore:
+    """SQLite-backed job table, safe to share between worker processes."""
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        self.path = Path(path)
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                status TEXT NOT NULL,
+                params TEXT NOT NULL,
+                input BLOB,
+                stage TEXT,
+                progress TEXT NOT NULL DEFAULT '{}',
+                checkpoint TEXT NOT NULL DEFAULT '{}',
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, type, created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread (and per process: reopened after fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=10.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def create(self, job_type: str, params: Dict[str, Any], input_bytes: Optional[bytes] = None) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO jobs (id, type, status, params, input, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, job_type, QUEUED, _dumps(params), input_bytes, now, now)
+        )
+        return job_id
+
+    def get(self, job_id: str, with_input: bool = False) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = {
+            "id": row["id"],
+            "type": row["type"],
+            "status": row["status"],
+            "stage": row["stage"],
+            "params": json.loads(row["params"]),
+            "progress": json.loads(row["progress"]),
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "cancel_requested": bool(row["cancel_requested"]),
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"]
+        }
+        if with_input:
+            job["input"] = row["input"]
+            job["checkpoint"] = json.loads(row["checkpoint"])
+        return job
+
+    def list(self, job_type: Optional[str] = None, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        query = "SELECT id, type, status, stage, attempts, error, created_at, updated_at FROM jobs"
+        clauses, args = [], []
+        if job_type:
+            clauses.append("type = ?")
+            args.append(job_type)
+        if status:
+            clauses.append("status = ?")
+            args.append(status)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        return [dict(row) for row in self._connect().execute(query, args).fetchall()]
+
+    def claim(self, job_type: str, limit: int) -> Optional[str]:
+        """
+        Mark the oldest queued job of a type as running, unless `limit` jobs
+        of that type are already running in any process.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            running = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE type = ? AND status = ?", (job_type, RUNNING)
+            ).fetchone()[0]
+            row = None
+            if running < limit:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE type = ? AND status = ? ORDER BY created_at LIMIT 1",
+                    (job_type, QUEUED)
+                ).fetchone()
+                if row:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, error = NULL, updated_at = ? WHERE id = ?",
+                        (RUNNING, time.time(), row["id"])
+                    )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row["id"] if row else None
+
+    def update(self, job_id: str, **fields):
+        """Update columns; dict/list values are stored as JSON."""
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        values = [_dumps(v) if isinstance(v, (dict, list)) else v for v in fields.values()]
+        self._connect().execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*values, job_id))
+
+    def request_cancel(self, job_id: str) -> Optional[str]:
+        """Cancel a queued job outright, or flag a running one. Returns the new status."""
+        conn = self._connect()
+        conn.execute(
+            "UPDATE jobs SET status = ?, input = NULL, updated_at = ? WHERE id = ? AND status = ?",
+            (CANCELLED, time.time(), job_id, QUEUED)
+        )
+        conn.execute(
+            "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND status = ?",
+            (time.time(), job_id, RUNNING)
+        )
+        job = self.get(job_id)
+        return job["status"] if job else None
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        row = self._connect().execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def requeue(self, job_id: str, reset_attempts: bool = False) -> bool:
+        """Put a failed job back in the queue, keeping its checkpoint."""
+        attempts = ", attempts = 0" if reset_attempts else ""
+        return self._connect().execute(
+            f"UPDATE jobs SET status = ?, cancel_requested = 0, updated_at = ?{attempts} "
+            "WHERE id = ? AND status = ? AND input IS NOT NULL",
+            (QUEUED, time.time(), job_id, FAILED)
+        ).rowcount > 0
+
+    def recover_stale(self) -> int:
+        """Re-queue running jobs whose worker stopped heartbeating."""
+        return self._connect().execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE status = ? AND updated_at < ?",
+            (QUEUED, time.time(), RUNNING, time.time() - JOB_STALE_SECONDS)
+        ).rowcount
+
+    def purge(self, older_than: float = JOB_RETENTION_SECONDS) -> int:
+        placeholders = ", ".join("?" for _ in FINISHED)
+        return self._connect().execute(
+            f"DELETE FROM jobs WHERE status IN ({placeholders}) AND updated_at < ?",
+            (*FINISHED, time.time() - older_than)
+        ).rowcount
+
+
+class JobQueue:
+    """
+    Per-process dispatcher and worker pool over a shared JobStore.
+
+    Handlers are registered per job type as
+    `handler(params, input_bytes, checkpoint) -> async iterator of events`.
+    Exceptions with a truthy `permanent` attribute (bad input) fail the job
+    without automatic retries.
+    """
+
+    def __init__(self, store: Optional[JobStore] = None):
+        self._store = store
+        self._handlers: Dict[str, Callable[..., AsyncIterator[Dict[str, Any]]]] = {}
+        self._limits: Dict[str, int] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            self._store = JobStore()
+        return self._store
+
+    def register(self, job_type: str, handler: Callable[..., AsyncIterator[Dict[str, Any]]], concurrency: int):
+        """Register a handler; JOB_CONCURRENCY_<TYPE> overrides the cap."""
+        self._handlers[job_type] = handler
+        self._limits[job_type] = int(os.getenv(f"JOB_CONCURRENCY_{job_type.upper()}", str(concurrency)))
+
+    def submit(self, job_type: str, params: Dict[str, Any], input_bytes: Optional[bytes] = None) -> str:
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        job_id = self.store.create(job_type, params, input_bytes)
+        metrics.inc("jobs_submitted", type=job_type)
+        self._wake()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        status = self.store.request_cancel(job_id)
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        return status
+
+    def retry(self, job_id: str) -> bool:
+        requeued = self.store.requeue(job_id, reset_attempts=True)
+        if requeued:
+            self._wake()
+        return requeued
+
+    # Request handlers use the async variants: store calls are blocking SQLite
+    # I/O and must stay off the event loop (the wakeup event stays on it)
+
+    async def submit_async(self, job_type: str, params: Dict[str, Any], input_bytes: Optional[bytes] = None) -> str:
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        job_id = await asyncio.to_thread(self.store.create, job_type, params, input_bytes)
+        metrics.inc("jobs_submitted", type=job_type)
+        self._wake()
+        return job_id
+
+    async def get_async(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def list_async(self, **filters) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.list, **filters)
+
+    async def cancel_async(self, job_id: str) -> Optional[str]:
+        status = await asyncio.to_thread(self.store.request_cancel, job_id)
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        return status
+
+    async def retry_async(self, job_id: str) -> bool:
+        requeued = await asyncio.to_thread(self.store.requeue, job_id, reset_attempts=True)
+        if requeued:
+            self._wake()
+        return requeued
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self):
+        if self._dispatcher is None:
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+            logger.info(f"Job queue started: {self._limits}")
+
+    async def stop(self):
+        if self._dispatcher is None:
+            return
+        self._dispatcher.cancel()
+        for task in list(self._running.values()):
+            task.cancel()
+        await asyncio.gather(self._dispatcher, *self._running.values(), return_exceptions=True)
+        self._dispatcher = None
+
+    async def _dispatch_loop(self):
+        last_maintenance = 0.0
+        while True:
+            try:
+                if time.monotonic() - last_maintenance > JOB_STALE_SECONDS / 4:
+                    last_maintenance = time.monotonic()
+                    recovered = await asyncio.to_thread(self.store.recover_stale)
+                    if recovered:
+                        logger.warning(f"Re-queued {recovered} orphaned jobs")
+                    await asyncio.to_thread(self.store.purge)
+                for job_type, limit in self._limits.items():
+                    while True:
+                        job_id = await asyncio.to_thread(self.store.claim, job_type, limit)
+                        if job_id is None:
+                            break
+                        self._running[job_id] = asyncio.create_task(self._run(job_id))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job dispatch failed: {e}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run(self, job_id: str):
+        store = self.store
+        job = await asyncio.to_thread(store.get, job_id, True)
+        job_type = job["type"]
+        checkpoint = job["checkpoint"]
+        progress = {"completed_stages": [], "sections": []}
+        started = time.perf_counter()
+        logger.info(f"Job {job_id} ({job_type}) started, attempt {job['attempts']}")
+
+        async def consume():
+            async with usage_scope_async(f"job:{job_type}", job["params"].get("budget_user")):
+                return await run_handler()
+
+        async def run_handler():
+            handler = self._handlers[job_type]
+            async for event in handler(job["params"], job["input"], checkpoint):
+                name, data = event["event"], event["data"]
+                if name == "complete":
+                    return data
+                if name == "stage":
+                    progress["stage"] = data["stage"]
+                    if data["status"] == "done":
+                        progress["completed_stages"].append(data["stage"])
+                    await asyncio.to_thread(
+                        store.update, job_id, stage=data["stage"], progress=progress, checkpoint=checkpoint
+                    )
+                elif name == "section":
+                    if len(progress["sections"]) < _MAX_PROGRESS_SECTIONS:
+                        progress["sections"].append(data)
+                    await asyncio.to_thread(store.update, job_id, progress=progress)
+                else:
+                    progress[name] = data
+            raise RuntimeError("Pipeline ended without a result")
+
+        consumer = asyncio.create_task(consume())
+        try:
+            # Heartbeat and cancellation watch while the handler runs
+            while not consumer.done():
+                await asyncio.wait({consumer}, timeout=JOB_POLL_INTERVAL)
+                if consumer.done():
+                    break
+                if await asyncio.to_thread(store.is_cancel_requested, job_id):
+                    consumer.cancel()
+                    raise JobCancelled()
+                await asyncio.to_thread(store.update, job_id)
+            result = consumer.result()
+            await asyncio.to_thread(
+                store.update, job_id, status=SUCCEEDED, result=result, progress=progress, input=None
+            )
+            metrics.inc("jobs_completed", type=job_type, status=SUCCEEDED)
+            metrics.observe("job_seconds", time.perf_counter() - started, type=job_type)
+            logger.info(f"Job {job_id} succeeded in {time.perf_counter() - started:.1f}s")
+        except (asyncio.CancelledError, JobCancelled) as e:
+            consumer.cancel()
+            cancelled = isinstance(e, JobCancelled) or await asyncio.to_thread(store.is_cancel_requested, job_id)
+            if cancelled:
+                await asyncio.to_thread(store.update, job_id, status=CANCELLED, progress=progress, input=None)
+                metrics.inc("jobs_completed", type=job_type, status=CANCELLED)
+                logger.info(f"Job {job_id} cancelled")
+            else:
+                # Server shutting down: leave it for another worker
+                await asyncio.to_thread(store.update, job_id, status=QUEUED, checkpoint=checkpoint)
+            if isinstance(e, asyncio.CancelledError) and not cancelled:
+                raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            retry = job["attempts"] < JOB_MAX_ATTEMPTS and not getattr(e, "permanent", False)
+            await asyncio.to_thread(
+                store.update, job_id, status=QUEUED if retry else FAILED,
+                error=error, progress=progress, checkpoint=checkpoint
+            )
+            metrics.inc("job_stage_failures", type=job_type, stage=progress.get("stage", ""))
+            if retry:
+                logger.warning(f"Job {job_id} failed (attempt {job['attempts']}), retrying from checkpoint: {error}")
+                self._wake()
+            else:
+                metrics.inc("jobs_completed", type=job_type, status=FAILED)
+                logger.error(f"Job {job_id} failed: {error}")
+        finally:
+            self._running.pop(job_id, None)
+            # A slot freed up
+            self._wake()
+
+
+job_queue = JobQueue()
@@ -0,0 +1,146 @@
+"""
+Startup lifecycle: model preloading, warmup and readiness.
+
+Each app passes a dict of named warmers (callables that build a service and run
+one dummy inference through it). Warmup runs in a background thread at startup so
+/health (liveness) answers immediately while /ready reports 503 until every
+warmer has finished. Failed warmers (e.g. a transient model download error)
+are retried with exponential backoff, so the instance rejoins rotation once
+they succeed.
+
+Set PRELOAD_MODELS=1 to warm at import time instead. Under
+`gunicorn --preload -k uvicorn.workers.UvicornWorker` that happens in the master
+before workers fork, so model weights are shared copy-on-write.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Any, Sequence
+
+logger = logging.getLogger(__name__)
+
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "0") == "1"
+# Block startup until warm (instead of warming in the background)
+WARMUP_BLOCKING = os.getenv("WARMUP_BLOCKING", "0") == "1"
+WARMUP_RETRY_INITIAL = float(os.getenv("WARMUP_RETRY_INITIAL", "5"))
+WARMUP_RETRY_MAX = float(os.getenv("WARMUP_RETRY_MAX", "300"))
+
+WARMUP_RESUME = """John Doe
+john.doe@example.com | (555) 123-4567
+
+SUMMARY
+Software engineer with 5 years of experience building Python services.
+
+EXPERIENCE
+Senior Software Engineer | Acme Corp | Jan 2020 - Present
+- Built FastAPI microservices on AWS with Docker and Kubernetes
+- Reduced API latency by 40% through caching and query optimization
+
+EDUCATION
+B.S. Computer Science, State University, 2018
+
+SKILLS
+Python, SQL, Docker, Kubernetes, AWS
+"""
+
+WARMUP_JD = """Backend Engineer
+We are looking for a backend engineer with strong Python and SQL skills.
+Experience with Docker, Kubernetes and AWS is required.
+"""
+
+
+class Readiness:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ready = False
+        self.started_at = None
+        self.finished_at = None
+        self.components: Dict[str, Dict[str, Any]] = {}
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "warmup_seconds": round(self.finished_at - self.started_at, 2)
+                if self.started_at and self.finished_at else None,
+                "components": {name: dict(info) for name, info in self.components.items()}
+            }
+
+    def warm_up(self, warmers: Dict[str, Callable[[], Any]]):
+        """Run every warmer once; idempotent across calls (e.g. master then worker)."""
+        with self._lock:
+            pending = {n: fn for n, fn in warmers.items() if self.components.get(n, {}).get("status") != "ready"}
+            if self.started_at is None:
+                self.started_at = time.monotonic()
+            attempts = {n: self.components.get(n, {}).get("attempts", 0) + 1 for n in pending}
+            for name in pending:
+                self.components[name] = {"status": "loading", "attempts": attempts[name]}
+
+        for name, warmer in pending.items():
+            start = time.perf_counter()
+            try:
+                warmer()
+                info = {"status": "ready", "seconds": round(time.perf_counter() - start, 2), "attempts": attempts[name]}
+                logger.info(f"Warmed up {name} in {info['seconds']}s")
+            except Exception as e:
+                logger.error(f"Warmup failed for {name}: {e}", exc_info=True)
+                info = {"status": "failed", "error": str(e), "attempts": attempts[name]}
+            with self._lock:
+                self.components[name] = info
+
+        with self._lock:
+            self.finished_at = time.monotonic()
+            self.ready = all(c.get("status") == "ready" for c in self.components.values())
+
+    def warm_up_with_retry(self, warmers: Dict[str, Callable[[], Any]]):
+        """warm_up, then retry failed warmers with exponential backoff until all are ready."""
+        delay = WARMUP_RETRY_INITIAL
+        while True:
+            self.warm_up(warmers)
+            with self._lock:
+                failed = [n for n in warmers if self.components.get(n, {}).get("status") != "ready"]
+            if not failed:
+                return
+            logger.warning(f"Retrying warmup of {', '.join(failed)} in {delay:.0f}s")
+            time.sleep(delay)
+            delay = min(delay * 2, WARMUP_RETRY_MAX)
+
+
+readiness = Readiness()
+
+
+def preload_if_requested(warmers: Dict[str, Callable[[], Any]]):
+    """Call at app import time; warms immediately when PRELOAD_MODELS=1 (pre-fork)."""
+    if PRELOAD_MODELS:
+        logger.info("PRELOAD_MODELS=1: warming models before serving")
+        readiness.warm_up(warmers)
+
+
+def build_lifespan(warmers: Dict[str, Callable[[], Any]], background: Sequence[Any] = ()):
+    """
+    FastAPI lifespan that warms every model on startup.
+
+    Args:
+        warmers: Component name -> warm-up callable
+        background: Services with async start()/stop() run for the app's lifetime
+    """
+
+    @asynccontextmanager
+    async def lifespan(app):
+        if WARMUP_BLOCKING:
+            await asyncio.to_thread(readiness.warm_up, warmers)
+        if not readiness.ready:
+            threading.Thread(target=readiness.warm_up_with_retry, args=(warmers,), name="warmup", daemon=True).start()
+        for service in background:
+            await service.start()
+        try:
+            yield
+        finally:
+            for service in reversed(background):
+                await service.stop()
+
+    return lifespan
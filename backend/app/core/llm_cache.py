@@ -0,0 +1,169 @@
+"""
+Persistent LLM response cache.
+
+Responses are stored in SQLite keyed by a fingerprint of (provider, model,
+temperature, generation options, prompt). Entries expire after a TTL and the
+store is bounded by entry count, evicting least-recently-used rows. SQLite in
+WAL mode is safe to share between worker processes; hits, misses and
+evictions are reported through app.core.metrics.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    str(Path(__file__).parent.parent.parent / "data" / "llm_cache.sqlite3")
+)
+CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+
+# Check the size bound every N writes rather than on each one
+_EVICT_EVERY = 100
+
+
+def fingerprint(provider: str, model: str, temperature: Optional[float], prompt: str, **options) -> str:
+    """Stable sha256 over everything that determines a completion."""
+    payload = {
+        "provider": provider,
+        "model": model,
+        "temperature": temperature,
+        "options": {k: v for k, v in sorted(options.items()) if v is not None},
+        "prompt": prompt
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        ttl_seconds: float = CACHE_TTL_SECONDS,
+        max_entries: int = CACHE_MAX_ENTRIES
+    ):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    provider TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread (and per process: reopened after fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str, provider: str = "") -> Optional[str]:
+        """Cached response text, or None on miss/expiry."""
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[1] <= self.ttl_seconds:
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                metrics.inc("llm_cache_hits", provider=provider)
+                return row[0]
+            if row:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache read failed: {e}")
+        metrics.inc("llm_cache_misses", provider=provider)
+        return None
+
+    def set(self, key: str, response: str, provider: str = "", model: str = ""):
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, provider, model, response, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, provider, model, response, now, now)
+            )
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                self.evict()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    def delete(self, key: str):
+        try:
+            self._connect().execute("DELETE FROM responses WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache delete failed: {e}")
+
+    def evict(self) -> int:
+        """Drop expired rows, then least-recently-used rows beyond max_entries."""
+        conn = self._connect()
+        removed = conn.execute(
+            "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+        ).rowcount
+        count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            removed += conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,)
+            ).rowcount
+            count = self.max_entries
+        if removed:
+            metrics.inc("llm_cache_evictions", removed)
+        metrics.set_gauge("llm_cache_entries", count)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"entries": count, "max_entries": self.max_entries, "ttl_seconds": self.ttl_seconds}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Process-wide cache, or None when disabled (LLM_CACHE_ENABLED=0) or unavailable."""
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = LLMResponseCache()
+            except Exception as e:
+                logger.error(f"Failed to open LLM cache at {CACHE_PATH}: {e}")
+                return None
+        return _cache
@@ -0,0 +1,98 @@
+"""
+Recording of live LLM responses for offline replay.
+
+With LLM_RECORD_PATH set, every successful provider call (rewrite, feedback
+and GitHub analysis) is appended to a JSONL file together with the observed
+latency. The replay provider (app.services.rewrite.replay_client) serves
+those recordings back, so benchmarks and load tests run without API keys,
+quota or provider-side variance.
+
+Recordings are keyed by prompt, system prompt and JSON mode only; provider,
+model and temperature are kept for reference but do not affect lookup, so a
+file captured against Gemini also replays prompts built for OpenAI-style runs
+when the prompt text matches.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RECORD_PATH = os.getenv("LLM_RECORD_PATH", "")
+
+
+def recording_key(prompt: str, system: Optional[str] = None, json_mode: bool = False) -> str:
+    payload = {"prompt": prompt, "system": system or None, "json_mode": bool(json_mode)}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResponseRecorder:
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        prompt: str,
+        response: str,
+        latency_ms: float,
+        provider: str,
+        model: str = "",
+        **options
+    ):
+        """Append one completion. Single O_APPEND writes keep lines whole across processes."""
+        entry = {
+            "key": recording_key(prompt, options.get("system"), options.get("json_mode", False)),
+            "provider": provider,
+            "model": model,
+            "temperature": options.get("temperature"),
+            "max_tokens": options.get("max_tokens"),
+            "latency_ms": round(latency_ms, 1),
+            "recorded_at": time.time(),
+            "prompt_head": prompt[:200],
+            "response": response
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            logger.warning(f"Failed to record LLM response to {self.path}: {e}")
+
+
+def load_recordings(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    """key -> recorded entries in file order (a prompt may have been recorded several times)."""
+    recordings: Dict[str, List[Dict[str, Any]]] = {}
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping malformed recording at {path}:{line_no}")
+                continue
+            recordings.setdefault(entry["key"], []).append(entry)
+    return recordings
+
+
+_recorder = None
+
+
+def get_recorder() -> Optional[ResponseRecorder]:
+    """Shared recorder, or None when LLM_RECORD_PATH is unset."""
+    global _recorder
+    if not RECORD_PATH:
+        return None
+    if _recorder is None:
+        _recorder = ResponseRecorder(RECORD_PATH)
+        logger.info(f"Recording LLM responses to {RECORD_PATH}")
+    return _recorder
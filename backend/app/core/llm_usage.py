@@ -0,0 +1,470 @@
+"""
+LLM token, latency and cost accounting per request, endpoint and user.
+
+LLMUsageMiddleware opens a RequestUsage for every HTTP request and keeps it
+in a context variable, so every provider call made while serving the
+request (rewrite clients, insights, GitHub analyzer, including calls made
+from the threadpool or gathered tasks) adds its tokens, latency, retries and
+estimated cost to it. When the response is finished the totals are exported
+as per-endpoint metrics and charged to the user's daily spend. Background
+jobs open their own scope (endpoint "job:<type>").
+
+With LLM_USAGE_HEADER=1 the request totals are returned in an X-LLM-Usage
+header (debugging, load tests).
+
+Budgets: with LLM_USER_DAILY_BUDGET_USD > 0 each client address may spend
+that much per UTC day across all workers. The X-User-Id header is
+client-supplied, so it only replaces the address with
+LLM_TRUST_USER_HEADER=1, for deployments behind an authenticating proxy that
+sets it (behind any proxy, run uvicorn with --proxy-headers so the address
+is the real client's). Over budget, LLM_BUDGET_ACTION=reject answers LLM endpoints with
+429, and =downgrade lets the request run but fails its LLM calls fast with
+LLMBudgetExceeded, so callers take their existing non-LLM fallbacks
+(rule-based insights, the local fast rewrite, original section text).
+"""
+
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+import contextvars
+from pathlib import Path
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, Any, Optional, Tuple
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+USAGE_HEADER_ENABLED = os.getenv("LLM_USAGE_HEADER", "0") == "1"
+USAGE_HEADER = "X-LLM-Usage"
+USER_HEADER = "x-user-id"
+# Only behind an authenticating proxy that sets X-User-Id; otherwise anyone could dodge the budget with a new id
+TRUST_USER_HEADER = os.getenv("LLM_TRUST_USER_HEADER", "0") == "1"
+USER_DAILY_BUDGET_USD = float(os.getenv("LLM_USER_DAILY_BUDGET_USD", "0"))
+# reject | downgrade
+BUDGET_ACTION = os.getenv("LLM_BUDGET_ACTION", "reject").lower()
+# Requests rejected over budget; other paths (analysis, health) always run
+BUDGET_PATHS = tuple(
+    p.strip() for p in os.getenv(
+        "LLM_BUDGET_PATHS", "/api/v1/rewrite,/api/v1/jobs/rewrite,/api/v1/github/analyze"
+    ).split(",") if p.strip()
+)
+USAGE_DB_PATH = os.getenv(
+    "LLM_USAGE_DB_PATH",
+    str(Path(__file__).parent.parent.parent / "data" / "llm_usage.sqlite3")
+)
+
+# USD per 1M tokens: (input, cached input, output). Model names match by
+# longest prefix, so dated and -exp variants share their family's price.
+# Override or extend with LLM_PRICES='{"model": [input, cached, output]}'.
+MODEL_PRICES: Dict[str, Tuple[float, float, float]] = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gemini-1.5-flash": (0.075, 0.01875, 0.30),
+    "gemini-1.5-pro": (1.25, 0.3125, 5.00),
+    "gemini-2.0-flash": (0.10, 0.025, 0.40),
+    "gemini-2.5-flash": (0.30, 0.075, 2.50),
+    "gemini-2.5-pro": (1.25, 0.31, 10.00),
+    # Offline replay provider
+    "replay": (0.0, 0.0, 0.0),
+}
+try:
+    MODEL_PRICES.update({k: tuple(v) for k, v in json.loads(os.getenv("LLM_PRICES", "{}")).items()})
+except (ValueError, TypeError) as e:
+    logger.warning(f"Ignoring invalid LLM_PRICES: {e}")
+
+_unpriced_models = set()
+
+
+class LLMBudgetExceeded(Exception):
+    """The current user has spent their daily LLM budget (downgrade mode)."""
+    # Not worth a job retry: the budget is still spent
+    permanent = True
+
+
+def model_price(model: str) -> Optional[Tuple[float, float, float]]:
+    model = (model or "").lower()
+    matches = [name for name in MODEL_PRICES if model.startswith(name)]
+    if not matches:
+        return None
+    return MODEL_PRICES[max(matches, key=len)]
+
+
+def estimate_cost(model: str, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> float:
+    """Estimated USD for one call; 0 for models missing from the price table."""
+    price = model_price(model)
+    if price is None:
+        if model and model not in _unpriced_models:
+            _unpriced_models.add(model)
+            logger.warning(f"No price for LLM model {model}; its calls are counted at $0")
+        return 0.0
+    input_price, cached_price, output_price = price
+    uncached = max(0, prompt_tokens - cached_tokens)
+    return (uncached * input_price + cached_tokens * cached_price + completion_tokens * output_price) / 1_000_000
+
+
+class RequestUsage:
+    """
+    LLM totals for one request or job. Shared by the threads and tasks serving it.
+
+    over_budget=None defers the spend-store read to the first LLM call, so
+    requests that make none never touch it.
+    """
+
+    def __init__(self, endpoint: str, user: Optional[str] = None, over_budget: Optional[bool] = False):
+        self.endpoint = endpoint
+        self.user = user
+        self._over_budget = over_budget
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.cache_hits = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.latency_ms = 0.0
+        self.cost_usd = 0.0
+
+    @property
+    def budget_known(self) -> bool:
+        return self._over_budget is not None
+
+    @property
+    def over_budget(self) -> bool:
+        """Whether the user is over budget (blocking spend-store read on first use)."""
+        if self._over_budget is None:
+            self._over_budget = bool(self.user) and is_over_budget(self.user)
+        return self._over_budget
+
+    def add_call(
+        self,
+        latency_ms: float,
+        prompt_tokens: int = 0,
+        cached_tokens: int = 0,
+        completion_tokens: int = 0,
+        cost_usd: float = 0.0
+    ):
+        with self._lock:
+            self.calls += 1
+            self.latency_ms += latency_ms
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached_tokens
+            self.completion_tokens += completion_tokens
+            self.cost_usd += cost_usd
+
+    def add_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def add_cache_hit(self):
+        with self._lock:
+            self.cache_hits += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "endpoint": self.endpoint,
+                "calls": self.calls,
+                "cache_hits": self.cache_hits,
+                "retries": self.retries,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "completion_tokens": self.completion_tokens,
+                "llm_latency_ms": round(self.latency_ms, 1),
+                "cost_usd": round(self.cost_usd, 6),
+                "over_budget": bool(self._over_budget)
+            }
+
+    def header_value(self) -> str:
+        usage = self.to_dict()
+        usage.pop("endpoint")
+        return "; ".join(f"{k}={str(v).lower() if isinstance(v, bool) else v}" for k, v in usage.items())
+
+
+_current: contextvars.ContextVar[Optional[RequestUsage]] = contextvars.ContextVar("llm_request_usage", default=None)
+
+
+def current_usage() -> Optional[RequestUsage]:
+    return _current.get()
+
+
+def record_call(provider: str, model: str, latency_ms: float, prompt_tokens: int = 0,
+                cached_tokens: int = 0, completion_tokens: int = 0):
+    """Charge one finished provider call to the global and per-request totals."""
+    cost = estimate_cost(model, prompt_tokens, cached_tokens, completion_tokens)
+    if cost:
+        metrics.inc("llm_cost_usd", cost, provider=provider, model=model)
+    usage = _current.get()
+    if usage is not None:
+        usage.add_call(latency_ms, prompt_tokens, cached_tokens, completion_tokens, cost)
+
+
+def record_retry(provider: str):
+    metrics.inc("llm_retries", provider=provider)
+    usage = _current.get()
+    if usage is not None:
+        usage.add_retry()
+
+
+def record_cache_hit():
+    usage = _current.get()
+    if usage is not None:
+        usage.add_cache_hit()
+
+
+def budget_downgraded() -> bool:
+    """True when the current request is over budget and must not make LLM calls."""
+    usage = _current.get()
+    return usage is not None and usage.over_budget and BUDGET_ACTION == "downgrade"
+
+
+def check_budget():
+    """Raise LLMBudgetExceeded before a call when the request runs in downgrade mode."""
+    if budget_downgraded():
+        metrics.inc("llm_budget_downgraded_calls")
+        raise LLMBudgetExceeded(f"Daily LLM budget of ${USER_DAILY_BUDGET_USD:.2f} used up")
+
+
+async def check_budget_async():
+    """check_budget() for the event loop: a pending spend-store read runs in a thread."""
+    usage = _current.get()
+    if usage is not None and not usage.budget_known:
+        await asyncio.to_thread(lambda: usage.over_budget)
+    check_budget()
+
+
+def _utc_day(now: Optional[float] = None) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(now))
+
+
+class SpendStore:
+    """Per-user daily spend in SQLite, shared by every worker process."""
+
+    def __init__(self, path: str = USAGE_DB_PATH):
+        self.path = Path(path)
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS user_spend ("
+            "user TEXT NOT NULL, day TEXT NOT NULL, cost_usd REAL NOT NULL DEFAULT 0, "
+            "calls INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (user, day))"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread (and per process: reopened after fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def spent_today(self, user: str) -> float:
+        row = self._connect().execute(
+            "SELECT cost_usd FROM user_spend WHERE user = ? AND day = ?", (user, _utc_day())
+        ).fetchone()
+        return row[0] if row else 0.0
+
+    def charge(self, user: str, cost_usd: float, calls: int):
+        self._connect().execute(
+            "INSERT INTO user_spend (user, day, cost_usd, calls) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(user, day) DO UPDATE SET cost_usd = cost_usd + excluded.cost_usd, "
+            "calls = calls + excluded.calls",
+            (user, _utc_day(), cost_usd, calls)
+        )
+
+    def purge(self, keep_days: int = 7) -> int:
+        cutoff = _utc_day(time.time() - keep_days * 86400)
+        return self._connect().execute("DELETE FROM user_spend WHERE day < ?", (cutoff,)).rowcount
+
+
+_spend_store: Optional[SpendStore] = None
+_spend_lock = threading.Lock()
+
+
+def get_spend_store() -> Optional[SpendStore]:
+    """Shared spend store, or None when budgets are off."""
+    global _spend_store
+    if USER_DAILY_BUDGET_USD <= 0:
+        return None
+    if _spend_store is None:
+        with _spend_lock:
+            if _spend_store is None:
+                _spend_store = SpendStore()
+                _spend_store.purge()
+    return _spend_store
+
+
+def is_over_budget(user: str) -> bool:
+    store = get_spend_store()
+    if store is None:
+        return False
+    try:
+        return store.spent_today(user) >= USER_DAILY_BUDGET_USD
+    except sqlite3.Error as e:
+        logger.warning(f"LLM budget check failed, allowing request: {e}")
+        return False
+
+
+def finish_usage(usage: RequestUsage):
+    """Export a finished request's totals and charge them to its user."""
+    if not usage.calls and not usage.cache_hits:
+        return
+    totals = usage.to_dict()
+    labels = {"endpoint": usage.endpoint}
+    metrics.inc("llm_endpoint_requests", **labels)
+    metrics.inc("llm_endpoint_calls", totals["calls"], **labels)
+    metrics.inc("llm_endpoint_cache_hits", totals["cache_hits"], **labels)
+    metrics.inc("llm_endpoint_retries", totals["retries"], **labels)
+    metrics.inc("llm_endpoint_prompt_tokens", totals["prompt_tokens"], **labels)
+    metrics.inc("llm_endpoint_cached_prompt_tokens", totals["cached_tokens"], **labels)
+    metrics.inc("llm_endpoint_completion_tokens", totals["completion_tokens"], **labels)
+    metrics.inc("llm_endpoint_cost_usd", usage.cost_usd, **labels)
+    metrics.observe("llm_request_cost_usd", usage.cost_usd, **labels)
+    metrics.observe("llm_request_latency_ms", usage.latency_ms, **labels)
+    metrics.observe("llm_request_calls", usage.calls, **labels)
+    store = get_spend_store()
+    if store is not None and usage.user and usage.calls:
+        try:
+            store.charge(usage.user, usage.cost_usd, usage.calls)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to record LLM spend for {usage.user}: {e}")
+
+
+@contextmanager
+def usage_scope(endpoint: str, user: Optional[str] = None):
+    """
+    Account the LLM calls made inside the block (background jobs, scripts).
+    Without a user the calls are exported as metrics but not charged to a budget.
+    """
+    usage = RequestUsage(endpoint, user, over_budget=None)
+    token = _current.set(usage)
+    try:
+        yield usage
+    finally:
+        _current.reset(token)
+        finish_usage(usage)
+
+
+@asynccontextmanager
+async def usage_scope_async(endpoint: str, user: Optional[str] = None):
+    """usage_scope() for coroutines: the budget read and the spend charge run off the event loop."""
+    usage = RequestUsage(endpoint, user, over_budget=None)
+    if user and USER_DAILY_BUDGET_USD > 0:
+        await asyncio.to_thread(lambda: usage.over_budget)
+    token = _current.set(usage)
+    try:
+        yield usage
+    finally:
+        _current.reset(token)
+        await _finish_usage_async(usage)
+
+
+async def _finish_usage_async(usage: RequestUsage):
+    if usage.calls or usage.cache_hits:
+        # Shielded: a cancelled request still gets charged
+        await asyncio.shield(asyncio.to_thread(finish_usage, usage))
+
+
+def _header(scope: Dict[str, Any], name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers") or []:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _budget_user(scope) -> str:
+    """Key a request is charged to: the trusted X-User-Id, else the client address."""
+    if TRUST_USER_HEADER:
+        user = _header(scope, USER_HEADER.encode())
+        if user and user != "anonymous":
+            return user
+    client = scope.get("client")
+    return f"ip:{client[0]}" if client else "anonymous"
+
+
+class LLMUsageMiddleware:
+    """
+    ASGI middleware opening a RequestUsage per HTTP request.
+
+    Pure ASGI rather than BaseHTTPMiddleware so streamed responses (SSE) are
+    accounted until their last chunk and the endpoint runs in the same
+    context as the usage it fills.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        user = _budget_user(scope)
+        path = scope.get("path", "")
+        over_budget: Optional[bool] = False
+        if USER_DAILY_BUDGET_USD > 0:
+            if path.startswith(BUDGET_PATHS):
+                over_budget = await asyncio.to_thread(is_over_budget, user)
+                if over_budget and BUDGET_ACTION == "reject":
+                    metrics.inc("llm_budget_rejections")
+                    await self._reject(send)
+                    return
+            else:
+                # Other paths (health, metrics, downloads) mostly make no LLM calls: check on the first one
+                over_budget = None
+
+        usage = RequestUsage(path, user, over_budget)
+        token = _current.set(usage)
+        finished = False
+
+        async def send_wrapper(message):
+            nonlocal finished
+            if message["type"] == "http.response.start":
+                # Label by route template, not the raw path (ids in paths)
+                route = scope.get("route")
+                usage.endpoint = f"{scope.get('method', '')} {getattr(route, 'path', path)}"
+                if USAGE_HEADER_ENABLED:
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [
+                        (USAGE_HEADER.lower().encode(), usage.header_value().encode("latin-1"))
+                    ]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                if not finished:
+                    finished = True
+                    await _finish_usage_async(usage)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            if not finished:
+                finished = True
+                await _finish_usage_async(usage)
+
+    async def _reject(self, send):
+        now = time.time()
+        retry_after = int(86400 - now % 86400) + 1
+        body = json.dumps({
+            "detail": f"Daily AI budget of ${USER_DAILY_BUDGET_USD:.2f} used up; try again tomorrow (UTC)."
+        }).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
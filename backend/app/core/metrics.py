@@ -0,0 +1,92 @@
+"""
+In-process metrics registry.
+Counters and summaries keyed by name and labels, exposed as JSON on /metrics.
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Any, Tuple
+
+# Samples kept per summary for quantile estimates
+_RESERVOIR_SIZE = 1024
+
+
+def _labels_key(labels: Dict[str, Any]) -> Tuple:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+class _Summary:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=_RESERVOIR_SIZE)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def quantile(self, q: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": round(self.total, 4),
+            "avg": round(self.total / self.count, 4) if self.count else 0.0,
+            "p50": round(self.quantile(0.5), 4),
+            "p95": round(self.quantile(0.95), 4),
+            "max": round(self.max, 4)
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple, float] = {}
+        self._summaries: Dict[Tuple, _Summary] = {}
+        self._gauges: Dict[Tuple, float] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            if key not in self._summaries:
+                self._summaries[key] = _Summary()
+            self._summaries[key].observe(value)
+
+    def set_gauge(self, name: str, value: float, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._gauges[key] = value
+
+    def get_counter(self, name: str, **labels) -> float:
+        return self._counters.get((name, _labels_key(labels)), 0)
+
+    def get_summary(self, name: str, **labels) -> Dict[str, float]:
+        summary = self._summaries.get((name, _labels_key(labels)))
+        return summary.snapshot() if summary else _Summary().snapshot()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All metrics as {name: [{labels, value|summary}]}."""
+        with self._lock:
+            result: Dict[str, Any] = {"counters": {}, "gauges": {}, "summaries": {}}
+            for (name, labels), value in self._counters.items():
+                result["counters"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+            for (name, labels), value in self._gauges.items():
+                result["gauges"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+            for (name, labels), summary in self._summaries.items():
+                result["summaries"].setdefault(name, []).append({"labels": dict(labels), **summary.snapshot()})
+        return result
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,362 @@
+"""
+Shared adaptive rate limiting for outbound LLM calls.
+
+One limiter per (provider, model), shared by every client instance in the
+process (GeminiClient, OpenAIClient, GitHubAIAnalyzer, the router's
+providers) and, through a small state file under an fcntl lock, by every
+worker process on the host:
+
+- A token bucket caps the request rate (LLM_RPM_<PROVIDER>, else LLM_RPM).
+- A concurrency limit caps calls in flight. It adapts with AIMD: each
+  success adds 1/limit, a 429 halves it (at most once per
+  LLM_AIMD_DECREASE_INTERVAL, so one storm counts once), and latency well
+  above the recent baseline for that call class shrinks it gently.
+- A 429 with Retry-After pauses the key for every worker, instead of each
+  one discovering the limit separately.
+
+Without fcntl (Windows) the state is kept in-process only.
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, Any, Optional, Tuple
+
+from app.core.metrics import metrics
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LIMITER_ENABLED = os.getenv("LLM_LIMITER_ENABLED", "1") == "1"
+LIMITER_DIR = os.getenv(
+    "LLM_LIMITER_DIR",
+    str(Path(__file__).parent.parent.parent / "data" / "llm_limits")
+)
+DEFAULT_RPM = float(os.getenv("LLM_RPM", "120"))
+MAX_CONCURRENCY = float(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+MIN_CONCURRENCY = float(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+AIMD_DECREASE_INTERVAL = float(os.getenv("LLM_AIMD_DECREASE_INTERVAL", "2"))
+# A call this many times slower than its class baseline counts as congestion
+LATENCY_CONGESTION_FACTOR = float(os.getenv("LLM_LATENCY_CONGESTION_FACTOR", "3"))
+# Give up waiting for a slot after this long (the caller's retry loop takes over)
+LIMITER_MAX_WAIT = float(os.getenv("LLM_LIMITER_MAX_WAIT", "60"))
+
+_LATENCY_ALPHA = 0.05
+_LATENCY_MIN_SAMPLES = 10
+_LATENCY_DECREASE = 0.9
+_RATE_LIMIT_DECREASE = 0.5
+# Without a Retry-After, a 429 pauses the key this long
+_DEFAULT_PAUSE = 1.0
+_POLL_CEILING = 0.5
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Server-requested delay from a Retry-After / retry-after-ms header, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            # HTTP-date form
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except Exception:
+        return None
+
+
+class RateLimiterTimeout(Exception):
+    """No slot became free within LLM_LIMITER_MAX_WAIT."""
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """429 / quota errors from either SDK (or a synthetic replay error)."""
+    for attr in ("status_code", "code", "http_status"):
+        if getattr(error, attr, None) == 429:
+            return True
+    response = getattr(error, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    text = str(error).lower()
+    return "429" in text or "rate limit" in text or "resource exhausted" in text or "quota" in text
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class _StateStore:
+    """Limiter state dict, shared across processes through a locked file when fcntl is available."""
+
+    def __init__(self, path: Path, initial: Dict[str, Any]):
+        self.path = path
+        self.initial = initial
+        self._lock = threading.Lock()
+        self._memory: Optional[Dict[str, Any]] = None
+        self._fd: Optional[int] = None
+        self._fd_pid: Optional[int] = None
+
+    def _file(self) -> int:
+        # A forked worker must not share the parent's descriptor (flock is per open file)
+        if self._fd is None or self._fd_pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._fd_pid = os.getpid()
+        return self._fd
+
+    @contextmanager
+    def locked(self):
+        with self._lock:
+            if fcntl is None:
+                if self._memory is None:
+                    self._memory = dict(self.initial)
+                yield self._memory
+                return
+            fd = self._file()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                raw = os.pread(fd, 1 << 16, 0)
+                try:
+                    state = json.loads(raw) if raw else dict(self.initial)
+                except ValueError:
+                    state = dict(self.initial)
+                yield state
+                data = json.dumps(state).encode("utf-8")
+                os.ftruncate(fd, 0)
+                os.pwrite(fd, data, 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, provider: str, model: str, rpm: float, max_concurrency: float = MAX_CONCURRENCY):
+        self.provider = provider
+        self.model = model
+        self.rpm = rpm
+        self.max_concurrency = max(max_concurrency, MIN_CONCURRENCY)
+        # Up to ten seconds' worth of requests can go out at once after a quiet spell
+        self.burst = max(1.0, rpm / 6)
+        self._labels = {"provider": provider, "model": model}
+        name = re.sub(r"[^A-Za-z0-9_.-]+", "_", f"{provider}-{model}")
+        self._store = _StateStore(Path(LIMITER_DIR) / f"{name}.json", {
+            "tokens": self.burst,
+            "refilled_at": time.time(),
+            "limit": self.max_concurrency,
+            "in_flight": {},
+            "paused_until": 0.0,
+            "decreased_at": 0.0
+        })
+        # Latency baselines stay per process; they only steer the shared limit
+        self._baselines: Dict[Any, Tuple[float, int]] = {}
+        self._baseline_lock = threading.Lock()
+
+    # -- Shared state ---------------------------------------------------------
+
+    def _try_acquire(self) -> float:
+        """Take a token and a concurrency slot; 0.0 on success, else seconds to wait before retrying."""
+        now = time.time()
+        pid = str(os.getpid())
+        with self._store.locked() as state:
+            if now < state["paused_until"]:
+                return state["paused_until"] - now
+
+            elapsed = max(0.0, now - state["refilled_at"])
+            state["tokens"] = min(self.burst, state["tokens"] + elapsed * self.rpm / 60.0)
+            state["refilled_at"] = now
+
+            in_flight = state["in_flight"]
+            # Slots held by workers that died mid-call are free again
+            for other in [p for p in in_flight if p != pid and not _pid_alive(int(p))]:
+                del in_flight[other]
+            if sum(in_flight.values()) >= int(state["limit"]):
+                return 0.05
+            if state["tokens"] < 1.0:
+                return (1.0 - state["tokens"]) * 60.0 / self.rpm
+
+            state["tokens"] -= 1.0
+            in_flight[pid] = in_flight.get(pid, 0) + 1
+            limit = state["limit"]
+        metrics.set_gauge("llm_limiter_concurrency", limit, **self._labels)
+        return 0.0
+
+    def _release(self, latency: Optional[float], error: Optional[BaseException], call_class: Any):
+        """Free the slot and apply AIMD for the call's outcome (None latency: cancelled, no signal)."""
+        now = time.time()
+        pid = str(os.getpid())
+        congested = latency is not None and error is None and self._is_slow(call_class, latency)
+        rate_limited = error is not None and is_rate_limited(error)
+        with self._store.locked() as state:
+            in_flight = state["in_flight"]
+            if in_flight.get(pid, 0) > 1:
+                in_flight[pid] -= 1
+            else:
+                in_flight.pop(pid, None)
+
+            if rate_limited:
+                if now - state["decreased_at"] >= AIMD_DECREASE_INTERVAL:
+                    state["limit"] = max(MIN_CONCURRENCY, state["limit"] * _RATE_LIMIT_DECREASE)
+                    state["decreased_at"] = now
+                # Every worker holds off until the provider's window has passed
+                pause = retry_after_seconds(error) or _DEFAULT_PAUSE
+                state["paused_until"] = max(state["paused_until"], now + pause)
+                state["tokens"] = 0.0
+            elif congested:
+                if now - state["decreased_at"] >= AIMD_DECREASE_INTERVAL:
+                    state["limit"] = max(MIN_CONCURRENCY, state["limit"] * _LATENCY_DECREASE)
+                    state["decreased_at"] = now
+            elif error is None and latency is not None:
+                state["limit"] = min(self.max_concurrency, state["limit"] + 1.0 / state["limit"])
+            limit = state["limit"]
+
+        if rate_limited:
+            metrics.inc("llm_rate_limited", **self._labels)
+            logger.warning(f"{self.provider}/{self.model} rate limited; concurrency limit now {limit:.1f}")
+        metrics.set_gauge("llm_limiter_concurrency", limit, **self._labels)
+
+    def _is_slow(self, call_class: Any, latency: float) -> bool:
+        with self._baseline_lock:
+            baseline, samples = self._baselines.get(call_class, (latency, 0))
+            slow = samples >= _LATENCY_MIN_SAMPLES and latency > baseline * LATENCY_CONGESTION_FACTOR
+            if not slow:
+                # Outliers stay out of the baseline so a slow spell is not normalised away
+                baseline = baseline + _LATENCY_ALPHA * (latency - baseline) if samples else latency
+            self._baselines[call_class] = (baseline, samples + 1)
+        return slow
+
+    # -- Call wrappers --------------------------------------------------------
+
+    def _note_wait(self, waited: float):
+        if waited > 0:
+            metrics.inc("llm_limiter_waits", **self._labels)
+            metrics.observe("llm_limiter_wait_seconds", waited, **self._labels)
+
+    @contextmanager
+    def slot(self, call_class: Any = None):
+        """Blocking: hold a rate/concurrency slot around one provider request."""
+        started = time.monotonic()
+        while True:
+            wait = self._try_acquire()
+            if wait <= 0:
+                break
+            if time.monotonic() - started + wait > LIMITER_MAX_WAIT:
+                raise RateLimiterTimeout(f"No {self.provider} slot within {LIMITER_MAX_WAIT:.0f}s")
+            time.sleep(min(wait, _POLL_CEILING))
+        self._note_wait(time.monotonic() - started)
+
+        call_started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self._release(time.monotonic() - call_started, e, call_class)
+            raise
+        except BaseException:
+            self._release(None, None, call_class)
+            raise
+        self._release(time.monotonic() - call_started, None, call_class)
+
+    async def _try_acquire_async(self, call_class: Any) -> float:
+        # The shared state is behind a blocking flock and file I/O: keep it off the event loop
+        acquire = asyncio.ensure_future(asyncio.to_thread(self._try_acquire))
+        try:
+            return await asyncio.shield(acquire)
+        except asyncio.CancelledError:
+            # The thread still finishes; give back a slot it took for the cancelled caller
+            def give_back(done: "asyncio.Future"):
+                if not done.cancelled() and done.exception() is None and done.result() <= 0:
+                    asyncio.ensure_future(self._release_async(None, None, call_class))
+            acquire.add_done_callback(give_back)
+            raise
+
+    async def _release_async(self, latency: Optional[float], error: Optional[BaseException], call_class: Any):
+        # Shielded: a second cancellation must not drop the release
+        await asyncio.shield(asyncio.to_thread(self._release, latency, error, call_class))
+
+    @asynccontextmanager
+    async def slot_async(self, call_class: Any = None):
+        """Non-blocking slot(); a cancelled call (e.g. a hedge loser) frees its slot without an AIMD signal."""
+        started = time.monotonic()
+        while True:
+            wait = await self._try_acquire_async(call_class)
+            if wait <= 0:
+                break
+            if time.monotonic() - started + wait > LIMITER_MAX_WAIT:
+                raise RateLimiterTimeout(f"No {self.provider} slot within {LIMITER_MAX_WAIT:.0f}s")
+            await asyncio.sleep(min(wait, _POLL_CEILING))
+        self._note_wait(time.monotonic() - started)
+
+        call_started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            await self._release_async(time.monotonic() - call_started, e, call_class)
+            raise
+        except BaseException:
+            # Cancelled (CancelledError is a BaseException)
+            await self._release_async(None, None, call_class)
+            raise
+        await self._release_async(time.monotonic() - call_started, None, call_class)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._store.locked() as state:
+            return {
+                "limit": round(state["limit"], 2),
+                "in_flight": sum(state["in_flight"].values()),
+                "tokens": round(state["tokens"], 2),
+                "paused_for": max(0.0, round(state["paused_until"] - time.time(), 2))
+            }
+
+
+class _NoLimit:
+    """Stand-in when LLM_LIMITER_ENABLED=0."""
+
+    @contextmanager
+    def slot(self, call_class: Any = None):
+        yield
+
+    @asynccontextmanager
+    async def slot_async(self, call_class: Any = None):
+        yield
+
+
+_limiters: Dict[Tuple[str, str], AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, model: str):
+    """Process-wide limiter for (provider, model)."""
+    if not LIMITER_ENABLED:
+        return _NoLimit()
+    key = (provider, model or "")
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                rpm = float(os.getenv(f"LLM_RPM_{re.sub(r'[^A-Z0-9]', '_', provider.upper())}", str(DEFAULT_RPM)))
+                limiter = AdaptiveRateLimiter(provider, key[1], rpm)
+                _limiters[key] = limiter
+    return limiter
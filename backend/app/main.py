@@ -1,8 +1,22 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.v1.endpoints import analyze, rewrite, templates, export, github
+from fastapi.responses import JSONResponse
+from app.api.v1.endpoints import analyze, rewrite, templates, export, github, jobs, artifacts
+from app.core.metrics import metrics
+from app.core.llm_usage import LLMUsageMiddleware
+from app.core.lifecycle import readiness, build_lifespan, preload_if_requested
+from app.core.jobs import job_queue
+from app.services.export.office_pool import office_pool
+from app.core.artifacts import artifact_store
 
-app = FastAPI(title="ATS Emulator V2 API")
+# Models warmed at startup; /ready stays 503 until all of them are loaded
+WARMERS = dict(analyze.WARMERS)
+preload_if_requested(WARMERS)
+
+app = FastAPI(title="ATS Emulator V2 API", lifespan=build_lifespan(WARMERS, background=[job_queue, office_pool, artifact_store]))
+
+# Per-request LLM token/cost accounting and budgets (inside CORS, so 429s carry CORS headers)
+app.add_middleware(LLMUsageMiddleware)
 
 # CORS middleware for frontend
 app.add_middleware(
@@ -11,6 +25,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-LLM-Usage", "ETag", "Content-Range", "Content-Disposition"],
 )
 
 app.include_router(analyze.router, prefix="/api/v1", tags=["analyze"])
@@ -18,6 +33,8 @@ app.include_router(rewrite.router, prefix="/api/v1", tags=["rewrite"])
 app.include_router(templates.router, prefix="/api/v1", tags=["templates"])
 app.include_router(export.router, prefix="/api/v1", tags=["export"])
 app.include_router(github.router, prefix="/api/v1", tags=["github"])
+app.include_router(jobs.router, prefix="/api/v1", tags=["jobs"])
+app.include_router(artifacts.router, prefix="/api/v1", tags=["artifacts"])
 
 @app.get("/")
 async def root():
@@ -27,3 +44,15 @@ async def root():
 async def health_check():
     return {"status": "healthy", "version": "2.0.0"}
 
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once every model is loaded and warmed, 503 before."""
+    status = readiness.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """In-process metrics (inference batching, caches, LLM usage)."""
+    return metrics.snapshot()
@@ -7,6 +7,7 @@ from docx import Document
 from docx.shared import Pt, Inches, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from typing import Dict, Any, List
+import io
 import logging
 
 logger = logging.getLogger(__name__)
@@ -47,6 +48,29 @@ class DOCXRebuilder:
         Returns:
             Path to created DOCX file
         """
+        doc = self._build_document(schema)
+        
+        # Save document
+        doc.save(output_path)
+        logger.info(f"Saved DOCX to {output_path}")
+        
+        return output_path
+    
+    def render_to_bytes(self, schema: Dict[str, Any]) -> bytes:
+        """
+        Rebuild DOCX from layout schema in memory.
+        
+        Args:
+            schema: Layout schema with sections
+            
+        Returns:
+            DOCX file contents
+        """
+        buffer = io.BytesIO()
+        self._build_document(schema).save(buffer)
+        return buffer.getvalue()
+    
+    def _build_document(self, schema: Dict[str, Any]) -> Document:
         doc = Document()
         
         # Set default style
@@ -79,11 +103,70 @@ class DOCXRebuilder:
                 # Generic section
                 self._add_generic_section(doc, section)
         
-        # Save document
-        doc.save(output_path)
-        logger.info(f"Saved DOCX to {output_path}")
+        return doc
+    
+    def schema_to_text(self, schema: Dict[str, Any]) -> str:
+        """
+        Plain text of the document rebuild_from_schema would write, paragraph by
+        paragraph (what DOCXParser would extract from it), without building or
+        parsing a DOCX.
         
-        return output_path
+        Args:
+            schema: Layout schema with sections
+            
+        Returns:
+            Document text, one line per paragraph
+        """
+        lines = []
+        sections = sorted(schema.get("sections", []), key=lambda s: s.get("pos", 0))
+        defaults = {
+            "SUMMARY": "PROFESSIONAL SUMMARY",
+            "EXPERIENCE": "PROFESSIONAL EXPERIENCE",
+            "EDUCATION": "EDUCATION",
+            "SKILLS": "SKILLS",
+            "PROJECTS": "PROJECTS",
+            "CERTIFICATIONS": "CERTIFICATIONS",
+        }
+        
+        for section in sections:
+            section_type = section.get("type")
+            
+            if section_type == "CONTACT":
+                raw_lines = section.get("raw", "").split('\n')
+                lines.append(raw_lines[0].strip())
+                parsed = section.get("parsed", {})
+                contact_parts = [parsed[k] for k in ("email", "phone", "linkedin", "github") if parsed.get(k)]
+                if contact_parts:
+                    lines.append(" | ".join(contact_parts))
+            elif section_type in defaults:
+                lines.append(section.get("heading", defaults[section_type]))
+                if section_type == "EXPERIENCE":
+                    for entry in section.get("entries", []):
+                        lines.append(f"{entry.get('title', 'Unknown Title')}")
+                        lines.append(
+                            f"{entry.get('company', 'Unknown Company')} | "
+                            f"{entry.get('start', '')} - {entry.get('end', 'Present')}"
+                        )
+                        lines.extend(b for b in map(self._sanitize_text, entry.get("bullets", [])) if b)
+                        lines.append("")
+                    continue
+                if section_type == "EDUCATION" and section.get("entries"):
+                    for entry in section["entries"]:
+                        lines.append(entry.get("degree", ""))
+                        lines.append(" | ".join(v for v in (entry.get("institution", ""), entry.get("year", "")) if v))
+                        lines.extend(entry.get("details", []))
+                elif section_type == "CERTIFICATIONS" or section_type == "EDUCATION":
+                    lines.append(section.get("raw", ""))
+                else:
+                    text = self._sanitize_text(section.get("raw", ""))
+                    if text:
+                        lines.append(text)
+            else:
+                lines.append(section.get("type", "UNKNOWN").upper())
+                lines.append(section.get("raw", ""))
+            lines.append("")
+        
+        return '\n'.join(lines)
     
     def _add_contact_section(self, doc: Document, section: Dict[str, Any]):
         """Add contact information section."""
@@ -121,7 +204,7 @@ class DOCXRebuilder:
     def _add_summary_section(self, doc: Document, section: Dict[str, Any]):
         """Add professional summary section."""
         # Section header
-        heading = doc.add_heading('PROFESSIONAL SUMMARY', level=2)
+        heading = doc.add_heading(section.get("heading", 'PROFESSIONAL SUMMARY'), level=2)
         heading.runs[0].font.size = Pt(self.heading_font_size)
         heading.runs[0].font.color.rgb = RGBColor(0, 0, 0)
         
@@ -137,7 +220,7 @@ class DOCXRebuilder:
     def _add_experience_section(self, doc: Document, section: Dict[str, Any]):
         """Add work experience section."""
         # Section header
-        heading = doc.add_heading('PROFESSIONAL EXPERIENCE', level=2)
+        heading = doc.add_heading(section.get("heading", 'PROFESSIONAL EXPERIENCE'), level=2)
         heading.runs[0].font.size = Pt(self.heading_font_size)
         heading.runs[0].font.color.rgb = RGBColor(0, 0, 0)
         
@@ -176,7 +259,7 @@ class DOCXRebuilder:
     def _add_education_section(self, doc: Document, section: Dict[str, Any]):
         """Add education section."""
         # Section header
-        heading = doc.add_heading('EDUCATION', level=2)
+        heading = doc.add_heading(section.get("heading", 'EDUCATION'), level=2)
         heading.runs[0].font.size = Pt(self.heading_font_size)
         heading.runs[0].font.color.rgb = RGBColor(0, 0, 0)
         
@@ -221,7 +304,7 @@ class DOCXRebuilder:
     def _add_skills_section(self, doc: Document, section: Dict[str, Any]):
         """Add skills section."""
         # Section header
-        heading = doc.add_heading('SKILLS', level=2)
+        heading = doc.add_heading(section.get("heading", 'SKILLS'), level=2)
         heading.runs[0].font.size = Pt(self.heading_font_size)
         heading.runs[0].font.color.rgb = RGBColor(0, 0, 0)
         
@@ -237,7 +320,7 @@ class DOCXRebuilder:
     def _add_projects_section(self, doc: Document, section: Dict[str, Any]):
         """Add projects section."""
         # Section header
-        heading = doc.add_heading('PROJECTS', level=2)
+        heading = doc.add_heading(section.get("heading", 'PROJECTS'), level=2)
         heading.runs[0].font.size = Pt(self.heading_font_size)
         heading.runs[0].font.color.rgb = RGBColor(0, 0, 0)
         
@@ -253,7 +336,7 @@ class DOCXRebuilder:
     def _add_certifications_section(self, doc: Document, section: Dict[str, Any]):
         """Add certifications section."""
         # Section header
-        heading = doc.add_heading('CERTIFICATIONS', level=2)
+        heading = doc.add_heading(section.get("heading", 'CERTIFICATIONS'), level=2)
         heading.runs[0].font.size = Pt(self.heading_font_size)
         heading.runs[0].font.color.rgb = RGBColor(0, 0, 0)
         
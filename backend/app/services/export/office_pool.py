@@ -0,0 +1,318 @@
+"""
+LibreOffice worker pool
+Long-lived headless soffice processes for DOCX -> PDF conversion.
+
+Starting `soffice --headless --convert-to` per document costs seconds of cold
+start, and concurrent runs sharing the default user profile hand documents to
+each other or fail. Each pool worker is one soffice process with its own
+profile directory, listening on its own localhost UNO socket; conversions are
+load + storeToURL calls on an already-running office.
+
+- Job queue: callers wait (FIFO-ish, bounded by OFFICE_POOL_QUEUE_TIMEOUT)
+  for an idle worker.
+- Per-job timeout: a watchdog kills the worker's process when a conversion
+  exceeds OFFICE_POOL_JOB_TIMEOUT; the worker is restarted in the background.
+- Health checks: idle workers are probed every OFFICE_POOL_HEALTH_INTERVAL
+  seconds and restarted when dead or unresponsive; workers are also recycled
+  after OFFICE_POOL_MAX_JOBS conversions (soffice leaks memory).
+
+Needs the `uno` Python bridge (python3-uno / LibreOffice's bundled Python).
+Without it, or with OFFICE_POOL_SIZE=0, PDFExporter keeps converting with
+one-shot soffice processes.
+"""
+
+import os
+import time
+import queue
+import socket
+import shutil
+import asyncio
+import logging
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+try:
+    import uno
+except ImportError:
+    uno = None
+
+OFFICE_POOL_SIZE = int(os.getenv("OFFICE_POOL_SIZE", "2"))
+OFFICE_POOL_JOB_TIMEOUT = float(os.getenv("OFFICE_POOL_JOB_TIMEOUT", "60"))
+OFFICE_POOL_QUEUE_TIMEOUT = float(os.getenv("OFFICE_POOL_QUEUE_TIMEOUT", "120"))
+OFFICE_POOL_HEALTH_INTERVAL = float(os.getenv("OFFICE_POOL_HEALTH_INTERVAL", "30"))
+OFFICE_POOL_MAX_JOBS = int(os.getenv("OFFICE_POOL_MAX_JOBS", "200"))
+OFFICE_POOL_STARTUP_TIMEOUT = float(os.getenv("OFFICE_POOL_STARTUP_TIMEOUT", "30"))
+OFFICE_PROFILE_DIR = os.getenv("OFFICE_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "ats_office_profiles"))
+
+
+def _free_port() -> int:
+    # Ports are per process: several app workers on one host each run a pool
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _props(**values) -> tuple:
+    props = []
+    for name, value in values.items():
+        prop = uno.createUnoStruct("com.sun.star.beans.PropertyValue")
+        prop.Name, prop.Value = name, value
+        props.append(prop)
+    return tuple(props)
+
+
+class OfficeWorker:
+    """One headless soffice process with an isolated profile and a UNO socket."""
+
+    def __init__(self, soffice_path: str, index: int):
+        self.soffice_path = soffice_path
+        self.index = index
+        self.profile_dir = Path(OFFICE_PROFILE_DIR) / f"worker_{os.getpid()}_{index}"
+        self.process: Optional[subprocess.Popen] = None
+        self.port: Optional[int] = None
+        self.desktop = None
+        self.jobs_done = 0
+
+    def start(self):
+        self.port = _free_port()
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        self.process = subprocess.Popen(
+            [
+                self.soffice_path,
+                "--headless", "--invisible", "--nologo", "--nodefault",
+                "--norestore", "--nolockcheck", "--nofirststartwizard",
+                f"-env:UserInstallation={self.profile_dir.resolve().as_uri()}",
+                f"--accept=socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        self.desktop = self._connect()
+        self.jobs_done = 0
+        logger.info(f"Office worker {self.index} ready (pid {self.process.pid}, port {self.port})")
+
+    def _connect(self):
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+        deadline = time.monotonic() + OFFICE_POOL_STARTUP_TIMEOUT
+        while True:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"soffice exited during startup (code {self.process.returncode})")
+            try:
+                ctx = resolver.resolve(f"uno:socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext")
+                return ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+            except Exception:
+                if time.monotonic() > deadline:
+                    self.kill()
+                    raise RuntimeError(f"soffice did not accept connections within {OFFICE_POOL_STARTUP_TIMEOUT:.0f}s")
+                time.sleep(0.1)
+
+    def convert(self, docx_path: str, pdf_path: str):
+        document = self.desktop.loadComponentFromURL(
+            Path(docx_path).resolve().as_uri(), "_blank", 0, _props(Hidden=True, ReadOnly=True)
+        )
+        if document is None:
+            raise RuntimeError(f"LibreOffice could not open {docx_path}")
+        try:
+            document.storeToURL(Path(pdf_path).resolve().as_uri(), _props(FilterName="writer_pdf_Export"))
+        finally:
+            document.close(True)
+        self.jobs_done += 1
+
+    def healthy(self) -> bool:
+        if self.process is None or self.process.poll() is not None or self.desktop is None:
+            return False
+        try:
+            self.desktop.getFrames().getCount()
+            return True
+        except Exception:
+            return False
+
+    def kill(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                pass
+        self.desktop = None
+
+    def restart(self, reason: str):
+        logger.warning(f"Restarting office worker {self.index}: {reason}")
+        metrics.inc("office_worker_restarts", reason=reason)
+        self.kill()
+        if reason == "crashed":
+            # A crash can leave the profile locked or corrupt
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+        self.start()
+
+
+class OfficeWorkerPool:
+    """Fixed set of OfficeWorkers shared by all conversion threads."""
+
+    def __init__(self, size: int = OFFICE_POOL_SIZE):
+        self.size = size
+        self.workers: List[OfficeWorker] = []
+        self._idle: "queue.Queue[OfficeWorker]" = queue.Queue()
+        self._health_task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def available(self) -> bool:
+        return bool(self.workers) and not self._stopping
+
+    async def start(self):
+        """
+        Background service hook (see app.core.lifecycle.build_lifespan).
+
+        Workers boot in the background; until one is up PDFExporter falls
+        back to one-shot conversions, so startup is not delayed.
+        """
+        if self.size <= 0 or self._health_task is not None:
+            return
+        if uno is None:
+            logger.info("uno bridge not installed: PDF export uses one-shot soffice processes")
+            return
+        self._stopping = False
+        self._health_task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        from app.services.export.pdf_exporter import find_libreoffice
+        soffice_path = await asyncio.to_thread(find_libreoffice)
+        if not soffice_path:
+            return
+        await asyncio.gather(*(asyncio.to_thread(self._add_worker, soffice_path, i) for i in range(self.size)))
+        self._update_gauges()
+        if self.workers:
+            await self._health_loop()
+
+    def _add_worker(self, soffice_path: str, index: int):
+        worker = OfficeWorker(soffice_path, index)
+        try:
+            worker.start()
+        except Exception as e:
+            logger.error(f"Office worker {index} failed to start: {e}")
+            return
+        if self._stopping:
+            worker.kill()
+            return
+        self.workers.append(worker)
+        self._idle.put(worker)
+
+    async def stop(self):
+        self._stopping = True
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+        for worker in self.workers:
+            await asyncio.to_thread(worker.kill)
+        self.workers = []
+        self._idle = queue.Queue()
+
+    def convert(self, docx_path: str, pdf_path: str, timeout: float = OFFICE_POOL_JOB_TIMEOUT) -> str:
+        """
+        Convert on the next idle worker (blocking; call from a worker thread).
+
+        Args:
+            docx_path: Source document
+            pdf_path: Target PDF path
+            timeout: Per-job limit; the worker is killed and restarted when exceeded
+
+        Returns:
+            pdf_path
+        """
+        waited = time.perf_counter()
+        try:
+            worker = self._idle.get(timeout=OFFICE_POOL_QUEUE_TIMEOUT)
+        except queue.Empty:
+            raise RuntimeError(f"No LibreOffice worker free within {OFFICE_POOL_QUEUE_TIMEOUT:.0f}s")
+        metrics.observe("office_pool_wait_seconds", time.perf_counter() - waited)
+        self._update_gauges()
+
+        watchdog = threading.Timer(timeout, worker.kill)
+        watchdog.daemon = True
+        started = time.perf_counter()
+        watchdog.start()
+        try:
+            worker.convert(docx_path, pdf_path)
+        except Exception as e:
+            timed_out = not watchdog.is_alive()
+            self._release(worker, "timeout" if timed_out else "crashed" if not worker.healthy() else None)
+            if timed_out:
+                raise RuntimeError(f"PDF conversion timed out after {timeout:.0f} seconds")
+            raise RuntimeError(f"PDF conversion failed: {e}")
+        finally:
+            watchdog.cancel()
+        metrics.observe("pdf_conversion_seconds", time.perf_counter() - started, mode="pool")
+        if worker.process.poll() is not None:
+            # Watchdog fired just as the conversion finished
+            self._release(worker, "crashed")
+        else:
+            self._release(worker, "recycled" if worker.jobs_done >= OFFICE_POOL_MAX_JOBS else None)
+        return pdf_path
+
+    def _release(self, worker: OfficeWorker, restart_reason: Optional[str] = None):
+        """Return a worker to the queue, restarting it first (off the caller's thread) if needed."""
+        if self._stopping:
+            return
+        if restart_reason is None:
+            self._idle.put(worker)
+            self._update_gauges()
+            return
+
+        def restart():
+            try:
+                worker.restart(restart_reason)
+            except Exception as e:
+                logger.error(f"Office worker {worker.index} failed to restart: {e}")
+                metrics.inc("office_worker_restart_failures")
+                # Back in the queue anyway; the health check retries it
+            self._idle.put(worker)
+            self._update_gauges()
+
+        threading.Thread(target=restart, name=f"office-restart-{worker.index}", daemon=True).start()
+
+    def check_health(self) -> int:
+        """Probe every idle worker; returns how many were restarted."""
+        restarted = 0
+        for _ in range(self._idle.qsize()):
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker.healthy():
+                self._idle.put(worker)
+            else:
+                restarted += 1
+                self._release(worker, "unhealthy")
+        return restarted
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(OFFICE_POOL_HEALTH_INTERVAL)
+            try:
+                await asyncio.to_thread(self.check_health)
+            except Exception as e:
+                logger.error(f"Office pool health check failed: {e}")
+
+    def _update_gauges(self):
+        metrics.set_gauge("office_workers", len(self.workers))
+        metrics.set_gauge("office_workers_idle", self._idle.qsize())
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self.workers),
+            "idle": self._idle.qsize(),
+            "jobs": [w.jobs_done for w in self.workers]
+        }
+
+
+office_pool = OfficeWorkerPool()
@@ -1,16 +1,59 @@
 """
 PDF Exporter
 Converts DOCX files to PDF format.
+
+Conversions run on the long-lived LibreOffice worker pool (office_pool) when
+it is up, otherwise on a one-shot soffice process with a per-thread profile.
 """
 
 import subprocess
 import os
+import time
 import logging
+import threading
+from pathlib import Path
 from typing import Optional
 
+from app.core.metrics import metrics
+from app.services.export.office_pool import office_pool, OFFICE_PROFILE_DIR
+
 logger = logging.getLogger(__name__)
 
 
+def find_libreoffice() -> Optional[str]:
+    """Find LibreOffice installation."""
+    # Common LibreOffice paths
+    possible_paths = [
+        "/Applications/LibreOffice.app/Contents/MacOS/soffice",  # macOS
+        "/usr/bin/libreoffice",  # Linux
+        "/usr/bin/soffice",  # Linux alternative
+        "C:\\Program Files\\LibreOffice\\program\\soffice.exe",  # Windows
+    ]
+    
+    for path in possible_paths:
+        if os.path.exists(path):
+            logger.info(f"Found LibreOffice at: {path}")
+            return path
+    
+    # Try which command
+    try:
+        result = subprocess.run(
+            ["which", "soffice"],
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+        if result.returncode == 0:
+            path = result.stdout.strip()
+            logger.info(f"Found LibreOffice via which: {path}")
+            return path
+    except Exception as e:
+        logger.warning(f"Failed to find LibreOffice via which: {e}")
+    
+    logger.warning("LibreOffice not found. PDF export will not be available.")
+    return None
+
+
 class PDFExporter:
     def __init__(self):
         """Initialize PDF exporter."""
@@ -18,36 +61,7 @@ class PDFExporter:
     
     def _find_libreoffice(self) -> Optional[str]:
         """Find LibreOffice installation."""
-        # Common LibreOffice paths
-        possible_paths = [
-            "/Applications/LibreOffice.app/Contents/MacOS/soffice",  # macOS
-            "/usr/bin/libreoffice",  # Linux
-            "/usr/bin/soffice",  # Linux alternative
-            "C:\\Program Files\\LibreOffice\\program\\soffice.exe",  # Windows
-        ]
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                logger.info(f"Found LibreOffice at: {path}")
-                return path
-        
-        # Try which command
-        try:
-            result = subprocess.run(
-                ["which", "soffice"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                path = result.stdout.strip()
-                logger.info(f"Found LibreOffice via which: {path}")
-                return path
-        except Exception as e:
-            logger.warning(f"Failed to find LibreOffice via which: {e}")
-        
-        logger.warning("LibreOffice not found. PDF export will not be available.")
-        return None
+        return find_libreoffice()
     
     def convert_docx_to_pdf(self, docx_path: str, output_dir: Optional[str] = None) -> str:
         """
@@ -73,11 +87,20 @@ class PDFExporter:
         # Ensure output directory exists
         os.makedirs(output_dir, exist_ok=True)
         
+        base_name = os.path.splitext(os.path.basename(docx_path))[0]
+        if office_pool.available:
+            return office_pool.convert(docx_path, os.path.join(output_dir, f"{base_name}.pdf"))
+        
         # Run LibreOffice conversion
+        started = time.perf_counter()
         try:
+            # Concurrent soffice runs must not share a profile; threadpool threads are reused,
+            # so a per-thread profile is only initialised once
+            profile_dir = Path(OFFICE_PROFILE_DIR) / f"oneshot_{os.getpid()}_{threading.get_ident()}"
             cmd = [
                 self.libreoffice_path,
                 "--headless",
+                f"-env:UserInstallation={profile_dir.resolve().as_uri()}",
                 "--convert-to", "pdf",
                 "--outdir", output_dir,
                 docx_path
@@ -97,12 +120,12 @@ class PDFExporter:
                 raise RuntimeError(f"PDF conversion failed: {result.stderr}")
             
             # Determine PDF path
-            base_name = os.path.splitext(os.path.basename(docx_path))[0]
             pdf_path = os.path.join(output_dir, f"{base_name}.pdf")
             
             if not os.path.exists(pdf_path):
                 raise RuntimeError(f"PDF file was not created: {pdf_path}")
             
+            metrics.observe("pdf_conversion_seconds", time.perf_counter() - started, mode="oneshot")
             logger.info(f"Successfully created PDF: {pdf_path}")
             return pdf_path
             
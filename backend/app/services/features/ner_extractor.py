@@ -7,11 +7,14 @@ from transformers import pipeline
 import logging
 import re
 
+from app.services.ml.inference_batcher import get_ner_batcher
+
 logger = logging.getLogger(__name__)
 
 class NERExtractor:
     def __init__(self):
         self.ner_pipeline = None
+        self.batcher = None
         self._load_model()
         
     def _load_model(self):
@@ -23,6 +26,8 @@ class NERExtractor:
                 model="yashpwr/resume-ner-bert-v2", 
                 aggregation_strategy="simple"
             )
+            # Coalesce concurrent requests into batched pipeline calls
+            self.batcher = get_ner_batcher(self.ner_pipeline)
             logger.info("NER Model loaded successfully")
         except Exception as e:
             logger.error(f"Failed to load NER model: {e}")
@@ -47,7 +52,7 @@ class NERExtractor:
         processed_text = text[:2000]
         
         try:
-            entities = self.ner_pipeline(processed_text)
+            entities = self.batcher.run([processed_text])[0]
         except Exception as e:
             logger.error(f"NER inference failed: {e}")
             return {'skills': [], 'error': str(e)}
@@ -2,12 +2,20 @@
 AI-powered GitHub repository analyzer using OpenAI.
 """
 import os
+import asyncio
 import logging
 from typing import Dict, Any, Optional
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from pathlib import Path
 from dotenv import load_dotenv
 import json
+import time
+
+from app.core.llm_recording import get_recorder
+from app.core.llm_usage import check_budget, check_budget_async, record_retry
+from app.core.rate_limiter import get_rate_limiter
+from app.services.rewrite.base_client import backoff_delay, record_usage
+from app.services.rewrite.jd_compactor import compact_job_description
 
 # Load environment variables
 env_path = Path(__file__).resolve().parent.parent.parent.parent / '.env'
@@ -66,98 +74,11 @@ ROLE_LANGUAGE_MAP = {
 }
 
 
-class GitHubAIAnalyzer:
-    def __init__(self):
-        """Initialize AI analyzer with OpenAI client."""
-        try:
-            openai_key = os.getenv("OPENAI_API_KEY")
-            if openai_key:
-                self.openai_client = OpenAI(api_key=openai_key)
-                self.openai_model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-                logger.info("OpenAI initialized for GitHub analysis")
-            else:
-                self.openai_client = None
-                logger.error("No OpenAI API key found")
-        except Exception as e:
-            logger.error(f"Failed to initialize OpenAI: {e}")
-            self.openai_client = None
-    
-    def analyze_repository(
-        self,
-        repo: Dict[str, Any],
-        job_role: str,
-        job_description: str = ""
-    ) -> Optional[Dict[str, Any]]:
-        """
-        Analyze repository using OpenAI to generate enhanced insights.
-        
-        Args:
-            repo: Repository data dictionary
-            job_role: Target job role
-            job_description: Optional job description
-            
-        Returns:
-            AI analysis with score, reasoning, resume bullets, etc.
-        """
-        if not self.openai_client:
-            logger.error("OpenAI client not initialized")
-            return None
-            
-        try:
-            prompt = self._build_prompt(repo, job_role, job_description)
-            result = self._call_openai(prompt)
-            if result:
-                logger.info(f"OpenAI analysis successful for {repo['name']}")
-                return result
-        except Exception as e:
-            logger.error(f"OpenAI analysis failed for {repo['name']}: {e}")
-            return None
-    
-    def _build_prompt(
-        self,
-        repo: Dict[str, Any],
-        job_role: str,
-        job_description: str
-    ) -> str:
-        """Build AI prompt that thinks like a recruiter evaluating freshers."""
-        
-        # Get role-specific requirements
-        role_reqs = ROLE_LANGUAGE_MAP.get(job_role, {
-            "primary": [],
-            "bonus": [],
-            "avoid": []
-        })
-        
-        # Format repo data
-        languages_list = list(repo.get("languages", {}).keys())
-        primary_language = repo.get("language", "Unknown")
-        topics = repo.get("topics", [])
-        readme_content = repo.get("readme_content", "")
-        repo_size = repo.get("size", 0)
-        
-        prompt = f"""You are a RECRUITER at a tech company evaluating a FRESHER candidate for a {job_role} position.
-
-You have 60 SECONDS to decide: "Should I interview this person?"
-
-🎯 WHAT YOU'RE HIRING FOR: {job_role.upper()}
-**Tech Stack We Use:** {', '.join(role_reqs.get('primary', []))}
-**Nice to Have:** {', '.join(role_reqs.get('bonus', []))}
-**Red Flags:** {', '.join(role_reqs.get('avoid', ['Outdated tech']))}
+SYSTEM_PROMPT = "You are a brutally honest technical recruiter. Return only valid JSON."
 
-📂 CANDIDATE'S PROJECT: "{repo['name']}"
+REPO_REVIEW_PROMPT_HEADER = """You are a RECRUITER at a tech company evaluating a FRESHER candidate for the position described at the end.
 
-**Quick Facts:**
-- Language: {primary_language}
-- Size: {repo_size} KB
-- Description: {repo.get('description', 'No description')}
-- Topics: {', '.join(topics) if topics else 'None'}
-
-📖 **README** (What they wrote):
-```
-{readme_content if readme_content else "❌ NO README - Can't even document their work!"}
-```
-
-{f"**Job Posting Keywords:** {job_description[:200]}" if job_description else ""}
+You have 60 SECONDS to decide: "Should I interview this person?"
 
 🧠 RECRUITER THOUGHT PROCESS:
 
@@ -201,17 +122,17 @@ Think like a recruiter. Be BRUTALLY HONEST:
 - Original idea or real problem solved
 - Multiple features showing depth
 - Clean code structure (you can tell from README)
-- Relevant tech stack for {job_role}
+- Relevant tech stack for the target role
 
 📦 OUTPUT (Strict JSON):
 
-{{
+{
   "relevance_score": 0-100,
   "interview_worthy": true/false,
   "first_impression": "Your honest first reaction in 1 sentence. Be blunt.",
   "can_they_code": "Based on README/project, do they seem capable? Why/why not?",
   "problem_solving_ability": "Did they solve a real problem or just follow tutorials? Evidence?",
-  "tech_stack_fit": "Does their tech match our {job_role} needs? Explain.",
+  "tech_stack_fit": "Does their tech match what the target role needs? Explain.",
   "passion_and_effort": "Does this show they care about quality? Or is it half-baked?",
   "would_you_interview": "Yes/No and why. Be specific about what convinced you or turned you off.",
   "strengths": [
@@ -234,7 +155,7 @@ Think like a recruiter. Be BRUTALLY HONEST:
     "What they should add/fix before putting this on resume",
     "Another improvement"
   ]
-}}
+}
 
 SCORING LIKE A RECRUITER:
 - **90-100**: "Wow, this is impressive for a fresher. Definitely interview."
@@ -246,39 +167,213 @@ SCORING LIKE A RECRUITER:
 **CRITICAL RULES:**
 - No README = Auto score <30 ("Can't even document their work")
 - Tutorial clone = Auto score <40 ("No original thinking")
-- Wrong tech stack = Penalty ("They don't know what {job_role} needs")
+- Wrong tech stack = Penalty ("They don't know what the target role needs")
 - Good README + Original project + Right tech = 80+ ("This person gets it")
 
-Be HARSH. You see 100 resumes a day. What makes THIS one special?
+Be HARSH. You see 100 resumes a day. What makes THIS one special?"""
 
-Return ONLY valid JSON, no markdown, no code blocks."""
 
-        return prompt
+class GitHubAIAnalyzer:
+    def __init__(self):
+        """Initialize AI analyzer with OpenAI client (or the replay provider with AI_PROVIDER=replay)."""
+        self.replay_client = None
+        if os.getenv("AI_PROVIDER", "").lower() == "replay":
+            from app.services.rewrite.replay_client import get_replay_client
+            self.replay_client = get_replay_client()
+            self.openai_client = None
+            self.async_openai_client = None
+            self.openai_model = self.replay_client.model_name
+            logger.info("Replay provider initialized for GitHub analysis")
+            return
+        try:
+            openai_key = os.getenv("OPENAI_API_KEY")
+            if openai_key:
+                self.openai_client = OpenAI(api_key=openai_key)
+                self.async_openai_client = AsyncOpenAI(api_key=openai_key)
+                self.openai_model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+                logger.info("OpenAI initialized for GitHub analysis")
+            else:
+                self.openai_client = None
+                self.async_openai_client = None
+                logger.error("No OpenAI API key found")
+        except Exception as e:
+            logger.error(f"Failed to initialize OpenAI: {e}")
+            self.openai_client = None
+            self.async_openai_client = None
+    
+    def analyze_repository(
+        self,
+        repo: Dict[str, Any],
+        job_role: str,
+        job_description: str = ""
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Analyze repository using OpenAI to generate enhanced insights.
+        
+        Args:
+            repo: Repository data dictionary
+            job_role: Target job role
+            job_description: Optional job description
+            
+        Returns:
+            AI analysis with score, reasoning, resume bullets, etc.
+        """
+        if not self.openai_client and not self.replay_client:
+            logger.error("OpenAI client not initialized")
+            return None
+            
+        try:
+            prompt = self._build_prompt(repo, job_role, job_description)
+            result = self._call_openai(prompt)
+            if result:
+                logger.info(f"OpenAI analysis successful for {repo['name']}")
+                return result
+        except Exception as e:
+            logger.error(f"OpenAI analysis failed for {repo['name']}: {e}")
+            return None
+    
+    async def analyze_repository_async(
+        self,
+        repo: Dict[str, Any],
+        job_role: str,
+        job_description: str = ""
+    ) -> Optional[Dict[str, Any]]:
+        """Non-blocking analyze_repository for event-loop callers."""
+        if not self.async_openai_client and not self.replay_client:
+            logger.error("OpenAI client not initialized")
+            return None
+            
+        try:
+            prompt = self._build_prompt(repo, job_role, job_description)
+            result = await self._call_openai_async(prompt)
+            if result:
+                logger.info(f"OpenAI analysis successful for {repo['name']}")
+                return result
+        except Exception as e:
+            logger.error(f"OpenAI analysis failed for {repo['name']}: {e}")
+            return None
+    
+    def _build_prompt(
+        self,
+        repo: Dict[str, Any],
+        job_role: str,
+        job_description: str
+    ) -> str:
+        """Build AI prompt that thinks like a recruiter evaluating freshers."""
+        
+        # Get role-specific requirements
+        role_reqs = ROLE_LANGUAGE_MAP.get(job_role, {
+            "primary": [],
+            "bonus": [],
+            "avoid": []
+        })
+        
+        # Format repo data
+        languages_list = list(repo.get("languages", {}).keys())
+        primary_language = repo.get("language", "Unknown")
+        topics = repo.get("topics", [])
+        readme_content = repo.get("readme_content", "")
+        repo_size = repo.get("size", 0)
+        
+        # Static instructions first, then the role (shared by every repo in a
+        # request), then this repo: the provider can serve the prefix from cache
+        job_keywords = (
+            f"**Job Posting Keywords:** {compact_job_description(job_description).text[:200]}\n\n"
+            if job_description else ""
+        )
+        return f"""{REPO_REVIEW_PROMPT_HEADER}
+
+🎯 WHAT YOU'RE HIRING FOR: {job_role.upper()}
+**Tech Stack We Use:** {', '.join(role_reqs.get('primary', []))}
+**Nice to Have:** {', '.join(role_reqs.get('bonus', []))}
+**Red Flags:** {', '.join(role_reqs.get('avoid', ['Outdated tech']))}
+
+{job_keywords}📂 CANDIDATE'S PROJECT: "{repo['name']}"
+
+**Quick Facts:**
+- Language: {primary_language}
+- Size: {repo_size} KB
+- Description: {repo.get('description', 'No description')}
+- Topics: {', '.join(topics) if topics else 'None'}
+
+📖 **README** (What they wrote):
+```
+{readme_content if readme_content else "❌ NO README - Can't even document their work!"}
+```
+
+Return ONLY valid JSON, no markdown, no code blocks."""
+    
+    def _request_args(self, prompt: str) -> Dict[str, Any]:
+        return {
+            "model": self.openai_model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.3,
+            "max_tokens": 1500
+        }
+    
+    def _parse_result(self, response) -> Dict[str, Any]:
+        return self._parse_text(response.choices[0].message.content)
+    
+    def _parse_text(self, text: str) -> Dict[str, Any]:
+        # Parse JSON response
+        text = text.strip()
+        # Remove markdown code blocks if present
+        if text.startswith("```"):
+            text = text.split("```")[1]
+            if text.startswith("json"):
+                text = text[4:]
+        
+        return json.loads(text.strip())
+    
+    def _replay_args(self) -> Dict[str, Any]:
+        """The options _request_args sends, in BaseLLMClient form."""
+        return {"system": SYSTEM_PROMPT, "temperature": 0.3, "max_tokens": 1500}
+    
+    def _record(self, prompt: str, response, started: float):
+        """Token accounting, and append the completion to LLM_RECORD_PATH for offline replay."""
+        record_usage("OpenAI", self.openai_model, response, started)
+        recorder = get_recorder()
+        if recorder is not None:
+            recorder.record(
+                prompt, response.choices[0].message.content, (time.monotonic() - started) * 1000,
+                "OpenAI", self.openai_model, **self._replay_args()
+            )
     
     def _call_openai(self, prompt: str) -> Optional[Dict[str, Any]]:
         """Call OpenAI API."""
+        if self.replay_client:
+            return self._parse_text(self.replay_client._call_gemini(prompt, **self._replay_args()))
+        check_budget()
         try:
-            response = self.openai_client.chat.completions.create(
-                model=self.openai_model,
-                messages=[
-                    {"role": "system", "content": "You are a brutally honest technical recruiter. Return only valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=1500
-            )
-            
-            # Parse JSON response
-            text = response.choices[0].message.content.strip()
-            # Remove markdown code blocks if present
-            if text.startswith("```"):
-                text = text.split("```")[1]
-                if text.startswith("json"):
-                    text = text[4:]
-            
-            result = json.loads(text.strip())
-            return result
+            started = time.monotonic()
+            with get_rate_limiter("OpenAI", self.openai_model).slot(1500):
+                response = self.openai_client.chat.completions.create(**self._request_args(prompt))
+            self._record(prompt, response, started)
+            return self._parse_result(response)
             
         except Exception as e:
             logger.error(f"OpenAI API error: {e}")
             raise
+    
+    async def _call_openai_async(self, prompt: str, max_retries: int = 2) -> Optional[Dict[str, Any]]:
+        """Call OpenAI API without blocking the event loop, with jittered backoff."""
+        if self.replay_client:
+            text = await self.replay_client._call_gemini_async(prompt, max_retries=max_retries, **self._replay_args())
+            return self._parse_text(text)
+        await check_budget_async()
+        for attempt in range(max_retries):
+            try:
+                started = time.monotonic()
+                async with get_rate_limiter("OpenAI", self.openai_model).slot_async(1500):
+                    response = await self.async_openai_client.chat.completions.create(**self._request_args(prompt))
+                self._record(prompt, response, started)
+                return self._parse_result(response)
+            except Exception as e:
+                logger.error(f"OpenAI API error (attempt {attempt + 1}/{max_retries}): {e}")
+                if attempt >= max_retries - 1:
+                    raise
+                record_retry("OpenAI")
+                await asyncio.sleep(backoff_delay(attempt, e))
@@ -1,12 +1,17 @@
 """
 Repository analyzer for scoring relevance to job roles.
 """
+import os
+import asyncio
 import logging
 from typing import List, Dict, Any
 import re
 
 logger = logging.getLogger(__name__)
 
+# Max concurrent OpenAI calls when enhancing repositories asynchronously
+AI_CONCURRENCY = int(os.getenv("GITHUB_AI_CONCURRENCY", "5"))
+
 
 # Job role to keywords/technologies mapping
 JOB_ROLE_KEYWORDS = {
@@ -91,6 +96,47 @@ class RepositoryAnalyzer:
         Returns:
             List of repositories with relevance scores, sorted by score
         """
+        analyzed_repos = self._score_repositories(repositories, job_role, job_description)
+        
+        # Apply AI enhancement to top repositories if requested
+        if use_ai:
+            analyzed_repos = self._enhance_with_ai(
+                analyzed_repos,
+                job_role,
+                job_description,
+                pinned_repos=pinned_repos or []
+            )
+        
+        return analyzed_repos
+    
+    async def analyze_repositories_async(
+        self,
+        repositories: List[Dict[str, Any]],
+        job_role: str,
+        job_description: str = "",
+        use_ai: bool = False,
+        pinned_repos: List[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Same as analyze_repositories, with the AI calls made concurrently on the event loop."""
+        analyzed_repos = self._score_repositories(repositories, job_role, job_description)
+        
+        if use_ai:
+            analyzed_repos = await self._enhance_with_ai_async(
+                analyzed_repos,
+                job_role,
+                job_description,
+                pinned_repos=pinned_repos or []
+            )
+        
+        return analyzed_repos
+    
+    def _score_repositories(
+        self,
+        repositories: List[Dict[str, Any]],
+        job_role: str,
+        job_description: str
+    ) -> List[Dict[str, Any]]:
+        """Algorithmic relevance scores, sorted best first."""
         analyzed_repos = []
         
         for repo in repositories:
@@ -110,15 +156,6 @@ class RepositoryAnalyzer:
         # Sort by relevance score (descending)
         analyzed_repos.sort(key=lambda x: x["relevance_score"], reverse=True)
         
-        # Apply AI enhancement to top repositories if requested
-        if use_ai:
-            analyzed_repos = self._enhance_with_ai(
-                analyzed_repos,
-                job_role,
-                job_description,
-                pinned_repos=pinned_repos or []
-            )
-        
         return analyzed_repos
     
     def _enhance_with_ai(
@@ -149,111 +186,155 @@ class RepositoryAnalyzer:
         """
         try:
             from .ai_analyzer import GitHubAIAnalyzer
-            from datetime import datetime, timedelta
-            
             ai_analyzer = GitHubAIAnalyzer()
-            pinned_repos = pinned_repos or []
-            
-            # TIER 1: User-pinned repos (ALWAYS analyze)
-            must_analyze = [r for r in repositories if r['name'] in pinned_repos]
-            
-            # TIER 2: High-value repos (hidden gems)
-            high_value = []
-            for repo in repositories:
-                # Skip if already in must_analyze
-                if repo['name'] in pinned_repos:
-                    continue
-                    
-                # High-value indicators
-                has_stars = repo.get('stars', 0) > 10
-                has_forks = repo.get('forks', 0) > 5
-                is_complex = len(repo.get('languages', {})) >= 3
-                
-                # Check if recently updated (< 6 months)
-                is_recent = False
-                if repo.get('pushed_at'):
-                    try:
-                        pushed_at = datetime.fromisoformat(repo['pushed_at'].replace('Z', '+00:00'))
-                        is_recent = datetime.now(pushed_at.tzinfo) - pushed_at < timedelta(days=180)
-                    except:
-                        pass
-                
-                # Add if meets any high-value criteria
-                if has_stars or has_forks or is_complex or is_recent:
-                    high_value.append(repo)
-            
-            # TIER 3: Top 15 by algorithmic score
-            top_scored = [r for r in repositories[:15] if r['name'] not in pinned_repos]
-            
-            # Combine all tiers and deduplicate
-            to_analyze = []
-            seen_names = set()
-            
-            for repo in must_analyze + high_value + top_scored:
-                if repo['name'] not in seen_names:
-                    to_analyze.append(repo)
-                    seen_names.add(repo['name'])
-                    
-                # Stop at max_repos
-                if len(to_analyze) >= max_repos:
-                    break
-            
-            logger.info(f"Smart filtering: {len(must_analyze)} pinned, {len(high_value)} high-value, analyzing {len(to_analyze)} total")
-            
-            # Enhance selected repos with AI
-            for repo in to_analyze:
-                try:
-                    ai_analysis = ai_analyzer.analyze_repository(
-                        repo,
-                        job_role,
-                        job_description
-                    )
-                    
-                    if ai_analysis:
-                        repo["ai_enhanced"] = True
-                        repo["ai_analysis"] = ai_analysis
-                        
-                        # Use AI-generated resume bullets if available
-                        resume_bullets = ai_analysis.get("suggested_resume_bullets", [])
-                        if resume_bullets:
-                            repo["suggested_resume_text"] = "\n".join(resume_bullets)
-                        
-                        # Add detailed reasoning fields for transparency
-                        repo["why_relevant"] = ai_analysis.get("would_you_interview", "")
-                        repo["first_impression"] = ai_analysis.get("first_impression", "")
-                        repo["can_they_code"] = ai_analysis.get("can_they_code", "")
-                        repo["problem_solving"] = ai_analysis.get("problem_solving_ability", "")
-                        repo["tech_stack_fit"] = ai_analysis.get("tech_stack_fit", "")
-                        repo["passion_and_effort"] = ai_analysis.get("passion_and_effort", "")
-                        repo["interview_worthy"] = ai_analysis.get("interview_worthy", False)
-                        
-                        # Add strengths and red flags
-                        repo["strengths"] = ai_analysis.get("strengths", [])
-                        repo["red_flags"] = ai_analysis.get("red_flags", [])
-                        repo["interview_questions"] = ai_analysis.get("interview_questions", [])
-                        repo["improvement_advice"] = ai_analysis.get("improvement_advice", [])
-                        
-                        # Override relevance score if AI provides one
-                        if "relevance_score" in ai_analysis:
-                            repo["relevance_score"] = ai_analysis["relevance_score"]
-                        
-                        # Add match level based on score
-                        score = repo["relevance_score"]
-                        if score >= 75:
-                            repo["match_level"] = "high"
-                        elif score >= 50:
-                            repo["match_level"] = "medium"
-                        else:
-                            repo["match_level"] = "low"
-                except Exception as e:
-                    logger.warning(f"AI enhancement failed for {repo['name']}: {e}")
-                    continue
-            
+        except Exception as e:
+            logger.error(f"Failed to initialize AI analyzer: {e}")
             return repositories
-            
+        
+        to_analyze = self._select_for_ai(repositories, pinned_repos or [], max_repos)
+        
+        # Enhance selected repos with AI
+        for repo in to_analyze:
+            try:
+                ai_analysis = ai_analyzer.analyze_repository(
+                    repo,
+                    job_role,
+                    job_description
+                )
+                self._apply_ai_analysis(repo, ai_analysis)
+            except Exception as e:
+                logger.warning(f"AI enhancement failed for {repo['name']}: {e}")
+        
+        return repositories
+    
+    async def _enhance_with_ai_async(
+        self,
+        repositories: List[Dict[str, Any]],
+        job_role: str,
+        job_description: str,
+        pinned_repos: List[str] = None,
+        max_repos: int = 20
+    ) -> List[Dict[str, Any]]:
+        """_enhance_with_ai with up to GITHUB_AI_CONCURRENCY analyses in flight."""
+        try:
+            from .ai_analyzer import GitHubAIAnalyzer
+            ai_analyzer = GitHubAIAnalyzer()
         except Exception as e:
             logger.error(f"Failed to initialize AI analyzer: {e}")
             return repositories
+        
+        to_analyze = self._select_for_ai(repositories, pinned_repos or [], max_repos)
+        semaphore = asyncio.Semaphore(AI_CONCURRENCY)
+        
+        async def analyze(repo):
+            async with semaphore:
+                return await ai_analyzer.analyze_repository_async(repo, job_role, job_description)
+        
+        analyses = await asyncio.gather(*(analyze(repo) for repo in to_analyze), return_exceptions=True)
+        for repo, ai_analysis in zip(to_analyze, analyses):
+            if isinstance(ai_analysis, Exception):
+                logger.warning(f"AI enhancement failed for {repo['name']}: {ai_analysis}")
+                continue
+            self._apply_ai_analysis(repo, ai_analysis)
+        
+        return repositories
+    
+    def _select_for_ai(
+        self,
+        repositories: List[Dict[str, Any]],
+        pinned_repos: List[str],
+        max_repos: int
+    ) -> List[Dict[str, Any]]:
+        """Pinned, then high-value, then top-scored repos, deduplicated and capped."""
+        from datetime import datetime, timedelta
+        
+        # TIER 1: User-pinned repos (ALWAYS analyze)
+        must_analyze = [r for r in repositories if r['name'] in pinned_repos]
+        
+        # TIER 2: High-value repos (hidden gems)
+        high_value = []
+        for repo in repositories:
+            # Skip if already in must_analyze
+            if repo['name'] in pinned_repos:
+                continue
+                
+            # High-value indicators
+            has_stars = repo.get('stars', 0) > 10
+            has_forks = repo.get('forks', 0) > 5
+            is_complex = len(repo.get('languages', {})) >= 3
+            
+            # Check if recently updated (< 6 months)
+            is_recent = False
+            if repo.get('pushed_at'):
+                try:
+                    pushed_at = datetime.fromisoformat(repo['pushed_at'].replace('Z', '+00:00'))
+                    is_recent = datetime.now(pushed_at.tzinfo) - pushed_at < timedelta(days=180)
+                except:
+                    pass
+            
+            # Add if meets any high-value criteria
+            if has_stars or has_forks or is_complex or is_recent:
+                high_value.append(repo)
+        
+        # TIER 3: Top 15 by algorithmic score
+        top_scored = [r for r in repositories[:15] if r['name'] not in pinned_repos]
+        
+        # Combine all tiers and deduplicate
+        to_analyze = []
+        seen_names = set()
+        
+        for repo in must_analyze + high_value + top_scored:
+            if repo['name'] not in seen_names:
+                to_analyze.append(repo)
+                seen_names.add(repo['name'])
+                
+            # Stop at max_repos
+            if len(to_analyze) >= max_repos:
+                break
+        
+        logger.info(f"Smart filtering: {len(must_analyze)} pinned, {len(high_value)} high-value, analyzing {len(to_analyze)} total")
+        return to_analyze
+    
+    def _apply_ai_analysis(self, repo: Dict[str, Any], ai_analysis: Dict[str, Any]):
+        """Merge one AI analysis into its repository entry (in place)."""
+        if not ai_analysis:
+            return
+        
+        repo["ai_enhanced"] = True
+        repo["ai_analysis"] = ai_analysis
+        
+        # Use AI-generated resume bullets if available
+        resume_bullets = ai_analysis.get("suggested_resume_bullets", [])
+        if resume_bullets:
+            repo["suggested_resume_text"] = "\n".join(resume_bullets)
+        
+        # Add detailed reasoning fields for transparency
+        repo["why_relevant"] = ai_analysis.get("would_you_interview", "")
+        repo["first_impression"] = ai_analysis.get("first_impression", "")
+        repo["can_they_code"] = ai_analysis.get("can_they_code", "")
+        repo["problem_solving"] = ai_analysis.get("problem_solving_ability", "")
+        repo["tech_stack_fit"] = ai_analysis.get("tech_stack_fit", "")
+        repo["passion_and_effort"] = ai_analysis.get("passion_and_effort", "")
+        repo["interview_worthy"] = ai_analysis.get("interview_worthy", False)
+        
+        # Add strengths and red flags
+        repo["strengths"] = ai_analysis.get("strengths", [])
+        repo["red_flags"] = ai_analysis.get("red_flags", [])
+        repo["interview_questions"] = ai_analysis.get("interview_questions", [])
+        repo["improvement_advice"] = ai_analysis.get("improvement_advice", [])
+        
+        # Override relevance score if AI provides one
+        if "relevance_score" in ai_analysis:
+            repo["relevance_score"] = ai_analysis["relevance_score"]
+        
+        # Add match level based on score
+        score = repo["relevance_score"]
+        if score >= 75:
+            repo["match_level"] = "high"
+        elif score >= 50:
+            repo["match_level"] = "medium"
+        else:
+            repo["match_level"] = "low"
     
     def _calculate_relevance_score(
         self,
@@ -9,22 +9,70 @@ import logging
 import json
 from typing import Dict, List, Any
 
+from app.services.rewrite.structured_output import INSIGHTS_SCHEMA
+
 logger = logging.getLogger(__name__)
 
+# The only feature fields the insights prompt and the rule-based feedback read
+FEEDBACK_FEATURE_FIELDS = (
+    "predicted_category", "ner_skills", "risk_flags", "summary_text", "timeline",
+    "email_found", "phone_found", "word_count"
+)
+
+INSIGHTS_PROMPT_HEADER = """You are an expert ATS resume consultant and career advisor. Analyze the resume analysis data at the end and provide highly specific, actionable feedback.
+
+INSTRUCTIONS:
+1. **Executive Summary** (2-3 sentences):
+   - Start with the overall assessment (ATS score + job match)
+   - Highlight the biggest opportunity for improvement
+   - Reference specific numbers from the data
+
+2. **Strengths** (3-5 items):
+   - Be VERY specific - reference actual skills, scores, or data points
+   - Explain WHY each is a strength (not just "good skills")
+   - Example: "Strong technical foundation with 15+ detected skills including React, JavaScript, and Python, which align well with modern web development roles"
+
+3. **Gaps** (3-5 items):
+   - Be SPECIFIC about what's missing or weak
+   - For missing keywords, mention 2-3 specific examples from the list
+   - Explain the IMPACT of each gap (e.g., "Low keyword score of 0.7% means the resume may be filtered out by ATS before human review")
+   - If semantic score is low, explain what that means in practical terms
+
+4. **Tactical Actions** (4-6 items):
+   - Provide CONCRETE, step-by-step actions
+   - Prioritize by impact (most impactful first)
+   - For keyword gaps, give specific examples: "Add 'Redux', 'React Hooks', and 'TypeScript' to your skills section if you have experience"
+   - For formatting issues, be specific: "Remove the table in the Experience section and use a simple list format"
+   - Include quick wins AND longer-term improvements
+
+CRITICAL RULES:
+- Reference actual numbers and data points from the analysis
+- Be specific with examples (don't say "add keywords", say "add 'Redux' and 'TypeScript'")
+- Explain WHY each recommendation matters
+- Prioritize actions by impact
+- If keyword_score is very low (<5%), make that a top priority
+- If semantic_score is low (<50%), focus on content relevance
+
+RESPONSE FORMAT (JSON):
+{
+  "executive_summary": "2-3 sentence overview with specific numbers",
+  "strengths": ["Specific strength with data point", "Another strength with explanation", ...],
+  "gaps": ["Specific gap with impact explanation", "Another gap with numbers", ...],
+  "tactical_actions": ["High-impact action with specific example", "Medium-impact action", ...]
+}
+
+Be direct, specific, and actionable. Every insight should reference actual data from the analysis."""
+
+
 class GenerativeFeedback:
     def __init__(self):
         """Initialize with AI client (Gemini or OpenAI) if available."""
         ai_provider = os.getenv("AI_PROVIDER", "gemini").lower()
         
         try:
-            if ai_provider == "openai":
-                from app.services.rewrite.openai_client import OpenAIClient
-                self.gemini_client = OpenAIClient()
-                logger.info("GenerativeFeedback initialized with OpenAI")
-            else:
-                from app.services.rewrite.gemini_client import GeminiClient
-                self.gemini_client = GeminiClient()
-                logger.info("GenerativeFeedback initialized with Gemini")
+            from app.services.rewrite.provider_router import create_ai_client
+            self.gemini_client = create_ai_client()
+            logger.info(f"GenerativeFeedback initialized with {self.gemini_client.provider_name} (AI_PROVIDER={ai_provider})")
             
             self.has_gemini = True
         except Exception as e:
@@ -48,6 +96,25 @@ class GenerativeFeedback:
             except Exception as e:
                 logger.error(f"Gemini feedback generation failed: {e}. Falling back to rule-based.")
         
+        return self.generate_rule_based_feedback(features, friendliness, relevance)
+    
+    async def generate_feedback_async(self, features: Dict[str, Any], friendliness: Dict[str, Any], relevance: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Non-blocking generate_feedback for event-loop callers."""
+        if self.has_gemini:
+            try:
+                logger.info("Generating AI-powered feedback (async)")
+                prompt = self._build_insights_prompt(features, friendliness, relevance)
+                result, problems = await self.gemini_client.generate_json_async(prompt, INSIGHTS_SCHEMA, "insights")
+                gemini_feedback = self._finish_insights(result, problems, relevance)
+                gemini_feedback["ai_powered"] = True
+                return gemini_feedback
+            except Exception as e:
+                logger.error(f"Gemini feedback generation failed: {e}. Falling back to rule-based.")
+        
+        return self.generate_rule_based_feedback(features, friendliness, relevance)
+    
+    def generate_rule_based_feedback(self, features: Dict[str, Any], friendliness: Dict[str, Any], relevance: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Deterministic feedback without any LLM call."""
         # Fallback to rule-based logic
         logger.info("Generating rule-based feedback")
         
@@ -76,6 +143,12 @@ class GenerativeFeedback:
         Generate AI-powered insights using Gemini/OpenAI.
         Enhanced with richer context for better analysis.
         """
+        prompt = self._build_insights_prompt(features, friendliness, relevance)
+        result, problems = self.gemini_client.generate_json(prompt, INSIGHTS_SCHEMA, "insights")
+        return self._finish_insights(result, problems, relevance)
+    
+    def _build_insights_prompt(self, features: Dict[str, Any], friendliness: Dict[str, Any], relevance: Dict[str, Any] = None) -> str:
+        """Structured insights prompt from the analysis data."""
         # Build structured prompt with enhanced context
         score = friendliness.get('score', 0)
         role = features.get('predicted_category', 'Professional')
@@ -106,74 +179,17 @@ class GenerativeFeedback:
             prompt_data["match_level"] = relevance.get('level', 'UNKNOWN')
             prompt_data["target_role"] = relevance.get('target_role', 'the target position')
         
-        prompt = f"""You are an expert ATS resume consultant and career advisor. Analyze this resume data and provide highly specific, actionable feedback.
-
-RESUME ANALYSIS DATA:
-{json.dumps(prompt_data, indent=2)}
-
-INSTRUCTIONS:
-1. **Executive Summary** (2-3 sentences):
-   - Start with the overall assessment (ATS score + job match)
-   - Highlight the biggest opportunity for improvement
-   - Reference specific numbers from the data
-
-2. **Strengths** (3-5 items):
-   - Be VERY specific - reference actual skills, scores, or data points
-   - Explain WHY each is a strength (not just "good skills")
-   - Example: "Strong technical foundation with 15+ detected skills including React, JavaScript, and Python, which align well with modern web development roles"
-
-3. **Gaps** (3-5 items):
-   - Be SPECIFIC about what's missing or weak
-   - For missing keywords, mention 2-3 specific examples from the list
-   - Explain the IMPACT of each gap (e.g., "Low keyword score of 0.7% means the resume may be filtered out by ATS before human review")
-   - If semantic score is low, explain what that means in practical terms
-
-4. **Tactical Actions** (4-6 items):
-   - Provide CONCRETE, step-by-step actions
-   - Prioritize by impact (most impactful first)
-   - For keyword gaps, give specific examples: "Add 'Redux', 'React Hooks', and 'TypeScript' to your skills section if you have experience"
-   - For formatting issues, be specific: "Remove the table in the Experience section and use a simple list format"
-   - Include quick wins AND longer-term improvements
-
-CRITICAL RULES:
-- Reference actual numbers and data points from the analysis
-- Be specific with examples (don't say "add keywords", say "add 'Redux' and 'TypeScript'")
-- Explain WHY each recommendation matters
-- Prioritize actions by impact
-- If keyword_score is very low (<5%), make that a top priority
-- If semantic_score is low (<50%), focus on content relevance
-
-RESPONSE FORMAT (JSON):
-{{
-  "executive_summary": "2-3 sentence overview with specific numbers",
-  "strengths": ["Specific strength with data point", "Another strength with explanation", ...],
-  "gaps": ["Specific gap with impact explanation", "Another gap with numbers", ...],
-  "tactical_actions": ["High-impact action with specific example", "Medium-impact action", ...]
-}}
-
-Be direct, specific, and actionable. Every insight should reference actual data from the analysis.
-"""
-        
-        # Call AI
-        response_text = self.gemini_client._call_gemini(prompt)
+        # Static instructions first so the provider can reuse the cached prefix
+        return f"{INSIGHTS_PROMPT_HEADER}\n\nRESUME ANALYSIS DATA:\n{json.dumps(prompt_data, indent=2)}\n"
+    
+    def _finish_insights(self, result: Dict[str, Any], problems: Dict[str, str], relevance: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Enrich the validated AI insights JSON; raises if it is unusable."""
+        if problems:
+            logger.warning(f"AI insights failed validation after re-ask: {problems}")
+            raise ValueError("Invalid response structure")
         
-        # Parse JSON response
-        try:
-            result = self.gemini_client._parse_json_response(response_text)
-            
-            # Validate structure
-            required_keys = ["executive_summary", "strengths", "gaps", "tactical_actions"]
-            if all(key in result for key in required_keys):
-                # Post-process to add priority indicators
-                result = self._enrich_insights(result, relevance)
-                return result
-            else:
-                logger.warning("AI response missing required keys, using fallback")
-                raise ValueError("Invalid response structure")
-                
-        except Exception as e:
-            logger.error(f"Failed to parse AI insights: {e}")
-            raise
+        # Post-process to add priority indicators
+        return self._enrich_insights(result, relevance)
     
     def _enrich_insights(self, insights: Dict[str, Any], relevance: Dict[str, Any] = None) -> Dict[str, Any]:
         """
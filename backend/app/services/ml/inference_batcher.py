@@ -0,0 +1,178 @@
+"""
+Inference Micro-Batcher
+Coalesces single-input model calls from concurrent requests into one batched call.
+
+Callers submit inputs from any thread (or await from the event loop). A worker
+thread flushes the queue as one batch once `max_wait_ms` has passed since the
+first queued item or `max_batch_size` items are waiting, then hands each result
+back to its caller. Queue wait, batch size and model time go to app.core.metrics.
+"""
+
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+BATCHING_ENABLED = os.getenv("INFERENCE_BATCHING", "1") == "1"
+DEFAULT_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH", "32"))
+DEFAULT_MAX_WAIT_MS = float(os.getenv("INFERENCE_BATCH_WAIT_MS", "5"))
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS
+    ):
+        """
+        Args:
+            name: Metric label (e.g. "encode", "ner")
+            batch_fn: Maps a list of inputs to a list of outputs of the same length
+            max_batch_size: Flush as soon as this many inputs are queued
+            max_wait_ms: Flush at most this long after the first input was queued
+        """
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._start_worker()
+
+    def _start_worker(self):
+        # Threads do not survive fork(); a batcher created in a preloading
+        # master restarts its worker on first use in each child process
+        self._pid = os.getpid()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name=f"batcher-{self.name}", daemon=True)
+        self._worker.start()
+
+    def submit(self, item: Any) -> Future:
+        if self._pid != os.getpid():
+            with _batchers_lock:
+                if self._pid != os.getpid():
+                    self._start_worker()
+        future: Future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def run(self, items: List[Any]) -> List[Any]:
+        """Blocking: queue every item and wait for all results (in order)."""
+        futures = [self.submit(item) for item in items]
+        return [f.result() for f in futures]
+
+    async def run_async(self, items: List[Any]) -> List[Any]:
+        """Non-blocking variant for event-loop callers."""
+        futures = [asyncio.wrap_future(self.submit(item)) for item in items]
+        return list(await asyncio.gather(*futures))
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                metrics.observe("inference_queue_wait_ms", (started - enqueued) * 1000, model=self.name)
+            metrics.observe("inference_batch_size", len(batch), model=self.name)
+
+            try:
+                outputs = self.batch_fn([item for item, _, _ in batch])
+                if len(outputs) != len(batch):
+                    raise RuntimeError(f"{self.name} batch returned {len(outputs)} results for {len(batch)} inputs")
+            except Exception as e:
+                logger.error(f"Batched {self.name} inference failed: {e}")
+                metrics.inc("inference_batch_errors", model=self.name)
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            finally:
+                metrics.observe("inference_model_ms", (time.perf_counter() - started) * 1000, model=self.name)
+
+            for (_, future, _), output in zip(batch, outputs):
+                future.set_result(output)
+
+
+class _DirectRunner:
+    """Same interface as MicroBatcher without the queue (INFERENCE_BATCHING=0)."""
+
+    def __init__(self, name: str, batch_fn: Callable[[List[Any]], List[Any]]):
+        self.name = name
+        self.batch_fn = batch_fn
+
+    def run(self, items: List[Any]) -> List[Any]:
+        started = time.perf_counter()
+        try:
+            return self.batch_fn(items)
+        finally:
+            metrics.observe("inference_model_ms", (time.perf_counter() - started) * 1000, model=self.name)
+            metrics.observe("inference_batch_size", len(items), model=self.name)
+
+    async def run_async(self, items: List[Any]) -> List[Any]:
+        return await asyncio.to_thread(self.run, items)
+
+
+def make_batcher(name: str, batch_fn: Callable[[List[Any]], List[Any]], **kwargs):
+    if BATCHING_ENABLED:
+        return MicroBatcher(name, batch_fn, **kwargs)
+    return _DirectRunner(name, batch_fn)
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def get_encode_batcher():
+    """Batched, normalized SentenceTransformer.encode over single strings."""
+    with _batchers_lock:
+        if "encode" not in _batchers:
+            from app.services.ml.relevance_engine import get_semantic_model
+            model = get_semantic_model()
+
+            def encode(texts: List[str]):
+                embeddings = model.encode(
+                    texts,
+                    batch_size=len(texts),
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                    show_progress_bar=False
+                )
+                return list(embeddings)
+
+            _batchers["encode"] = make_batcher("encode", encode)
+        return _batchers["encode"]
+
+
+def get_ner_batcher(ner_pipeline):
+    """Batched HuggingFace NER pipeline over single texts."""
+    with _batchers_lock:
+        if "ner" not in _batchers:
+            def ner(texts: List[str]):
+                results = ner_pipeline(texts, batch_size=len(texts))
+                # A single-item list can come back unwrapped
+                if len(texts) == 1 and results and isinstance(results[0], dict):
+                    results = [results]
+                return list(results)
+
+            _batchers["ner"] = make_batcher("ner", ner)
+        return _batchers["ner"]
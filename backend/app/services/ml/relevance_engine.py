@@ -0,0 +1,329 @@
+"""
+Relevance Engine
+Single resume/JD scoring engine shared by VisibilityRanker and VisibilityScorer.
+
+Every component scores from one ScoringContext, so a request tokenizes each text
+once and embeds each text once no matter how many components (or facades) use it.
+"""
+
+import re
+import logging
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Lazy loading model to avoid startup delay if not used
+_semantic_model = None
+_engine = None
+
+
+def get_semantic_model():
+    """Process-wide SentenceTransformer shared by every scorer."""
+    global _semantic_model
+    if _semantic_model is None:
+        from sentence_transformers import SentenceTransformer
+        _semantic_model = SentenceTransformer(SEMANTIC_MODEL_NAME)
+    return _semantic_model
+
+
+def encode_texts(texts: List[str]) -> np.ndarray:
+    """Normalized embeddings, micro-batched with concurrent requests."""
+    from app.services.ml.inference_batcher import get_encode_batcher
+    return np.stack(get_encode_batcher().run(texts))
+
+
+def get_relevance_engine() -> "RelevanceEngine":
+    """Process-wide engine with the default component set."""
+    global _engine
+    if _engine is None:
+        _engine = RelevanceEngine.default()
+    return _engine
+
+
+# Very basic list of capitalized words that are never skills
+MUST_HAVE_STOPWORDS = {
+    "The", "A", "An", "In", "On", "For", "To", "Of", "And", "Or", "With", "By", "Is", "Are", "Be",
+    "We", "You", "It", "This", "That"
+}
+
+# Common tech keywords (Sync with NER extractor for consistency)
+GAZETTEER_KEYWORDS = {
+    "Python", "Java", "JavaScript", "TypeScript", "React", "Angular", "Vue", "Node.js", "Django", "Flask",
+    "FastAPI", "Spring Boot", "SQL", "PostgreSQL", "MySQL", "MongoDB", "Redis", "Docker", "Kubernetes",
+    "AWS", "Azure", "GCP", "Git", "CI/CD", "Jenkins", "Terraform", "Linux", "C++", "C#", ".NET",
+    "Go", "Rust", "Swift", "Kotlin", "Flutter", "React Native", "HTML", "CSS", "SASS", "GraphQL",
+    "REST API", "Microservices", "Machine Learning", "Deep Learning", "NLP", "TensorFlow", "PyTorch",
+    "Pandas", "NumPy", "Scikit-learn", "Data Analysis", "Agile", "Scrum", "Jira", "Tableau", "Power BI",
+    "Hadoop", "Spark", "Kafka", "Elasticsearch", "Cybersecurity", "Blockchain", "IoT", "DevOps"
+}
+
+# Pre-compiled once; each gazetteer term matched on word boundaries
+_GAZETTEER_PATTERNS = [
+    (keyword, re.compile(r'\b' + re.escape(keyword.lower()) + r'\b'))
+    for keyword in sorted(GAZETTEER_KEYWORDS)
+]
+
+
+class ScoringContext:
+    """
+    Per-request cache of derived representations of a resume/JD pair.
+    Components read from here instead of re-tokenizing or re-embedding.
+    """
+
+    def __init__(self, resume_text: str, jd_text: str, encoder=encode_texts):
+        self.resume_text = resume_text
+        self.jd_text = jd_text
+        self._encoder = encoder
+        self._cache: Dict[str, Any] = {}
+
+    def _cached(self, key, fn):
+        if key not in self._cache:
+            self._cache[key] = fn()
+        return self._cache[key]
+
+    @property
+    def resume_lower(self) -> str:
+        return self._cached("resume_lower", lambda: self.resume_text.lower())
+
+    @property
+    def jd_lower(self) -> str:
+        return self._cached("jd_lower", lambda: self.jd_text.lower())
+
+    @property
+    def resume_tokens(self) -> List[str]:
+        return self._cached("resume_tokens", lambda: self.resume_lower.split())
+
+    @property
+    def jd_tokens(self) -> List[str]:
+        return self._cached("jd_tokens", lambda: self.jd_lower.split())
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """Normalized [resume, jd] embeddings from a single encode call."""
+        return self._cached("embeddings", lambda: self._encoder([self.resume_text, self.jd_text]))
+
+
+class ScoringComponent:
+    """
+    Base class for engine components.
+    score() returns a 0-100 score, or None when the component is unavailable
+    (its weight is then redistributed over the remaining components).
+    """
+
+    name = "component"
+
+    def score(self, ctx: ScoringContext) -> Optional[float]:
+        raise NotImplementedError
+
+    def missing_keywords(self, ctx: ScoringContext) -> List[str]:
+        return []
+
+
+class BM25Component(ScoringComponent):
+    """Keyword overlap with the JD as query and the resume as a one-document corpus."""
+
+    name = "bm25"
+
+    def __init__(self, saturation: float = 20.0):
+        # Heuristic max score ~ 20-30 for good match
+        self.saturation = saturation
+
+    def score(self, ctx: ScoringContext) -> Optional[float]:
+        from rank_bm25 import BM25Okapi
+
+        if not ctx.resume_tokens or not ctx.jd_tokens:
+            return 0.0
+        bm25 = BM25Okapi([ctx.resume_tokens])
+        raw = float(bm25.get_scores(ctx.jd_tokens)[0])
+        # Single-document IDF can go negative; clamp into 0-100
+        return max(0.0, min(raw / self.saturation, 1.0)) * 100
+
+
+class TfidfComponent(ScoringComponent):
+    """Cosine similarity in the trained TF-IDF space."""
+
+    name = "tfidf"
+
+    def __init__(self, vectorizer=None):
+        self.vectorizer = vectorizer
+
+    def score(self, ctx: ScoringContext) -> Optional[float]:
+        if self.vectorizer is None:
+            return None
+        try:
+            from sklearn.metrics.pairwise import cosine_similarity
+            tfidf_matrix = self.vectorizer.transform([ctx.resume_text, ctx.jd_text])
+            return float(cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]) * 100
+        except Exception as e:
+            logger.warning(f"TF-IDF calculation failed: {e}")
+            return None
+
+
+class SemanticComponent(ScoringComponent):
+    """Sentence-embedding cosine similarity."""
+
+    name = "semantic"
+
+    def score(self, ctx: ScoringContext) -> Optional[float]:
+        try:
+            resume_emb, jd_emb = ctx.embeddings
+        except Exception as e:
+            logger.error(f"Semantic scoring failed: {e}")
+            return None
+        # Normalized embeddings: dot product == cosine. Clamp -1..1 -> 0..1
+        return max(0.0, float(np.dot(resume_emb, jd_emb))) * 100
+
+
+class MustHaveComponent(ScoringComponent):
+    """Boolean coverage of capitalized JD terms (likely skills and tools)."""
+
+    name = "must_have"
+
+    def _terms(self, ctx: ScoringContext) -> List[str]:
+        def extract():
+            words = re.findall(r'\b[A-Z][a-zA-Z]+\b', ctx.jd_text)
+            # Ordered set keeps output deterministic across runs
+            return list(dict.fromkeys(w for w in words if w not in MUST_HAVE_STOPWORDS))
+        return ctx._cached("must_have_terms", extract)
+
+    def _missing(self, ctx: ScoringContext) -> List[str]:
+        return ctx._cached(
+            "must_have_missing",
+            lambda: [t for t in self._terms(ctx) if t.lower() not in ctx.resume_lower]
+        )
+
+    def score(self, ctx: ScoringContext) -> Optional[float]:
+        terms = self._terms(ctx)
+        if not terms:
+            return 100.0
+        return (len(terms) - len(self._missing(ctx))) / len(terms) * 100
+
+    def missing_keywords(self, ctx: ScoringContext) -> List[str]:
+        return self._missing(ctx)
+
+
+class GazetteerComponent(ScoringComponent):
+    """Coverage of high-value tech keywords that the JD mentions."""
+
+    name = "gazetteer"
+
+    def _matches(self, ctx: ScoringContext):
+        def match():
+            in_jd = [(kw, p) for kw, p in _GAZETTEER_PATTERNS if p.search(ctx.jd_lower)]
+            missing = [kw for kw, p in in_jd if not p.search(ctx.resume_lower)]
+            return [kw for kw, _ in in_jd], missing
+        return ctx._cached("gazetteer", match)
+
+    def score(self, ctx: ScoringContext) -> Optional[float]:
+        in_jd, missing = self._matches(ctx)
+        if not in_jd:
+            return 100.0
+        return (len(in_jd) - len(missing)) / len(in_jd) * 100
+
+    def missing_keywords(self, ctx: ScoringContext) -> List[str]:
+        return self._matches(ctx)[1]
+
+
+class RelevanceEngine:
+    """
+    Weighted combination of pluggable scoring components.
+    Callers pass their own weight profile; only components with a positive
+    weight (plus those whose missing keywords the caller reads) are evaluated.
+    """
+
+    def __init__(
+        self,
+        components: List[ScoringComponent],
+        model_provider=get_semantic_model,
+        encoder=encode_texts
+    ):
+        self.components = {c.name: c for c in components}
+        self.model_provider = model_provider
+        self.encoder = encoder
+
+    @classmethod
+    def default(cls) -> "RelevanceEngine":
+        return cls([
+            BM25Component(),
+            TfidfComponent(_load_tfidf_vectorizer()),
+            SemanticComponent(),
+            MustHaveComponent(),
+            GazetteerComponent()
+        ])
+
+    @property
+    def semantic_model(self):
+        return self.model_provider()
+
+    def get_component(self, name: str) -> Optional[ScoringComponent]:
+        return self.components.get(name)
+
+    def score(
+        self,
+        resume_text: str,
+        jd_text: str,
+        weights: Dict[str, float],
+        ctx: Optional[ScoringContext] = None,
+        keywords_from: Iterable[str] = ()
+    ) -> Dict[str, Any]:
+        """
+        Score a resume against a JD.
+
+        Args:
+            resume_text: Resume plain text
+            jd_text: Job description text
+            weights: Component name -> weight (need not sum to 1)
+            ctx: Optional pre-built context to share with other callers
+            keywords_from: Components whose missing keywords are returned
+
+        Returns:
+            Dictionary with weighted score (0-100), breakdown of the weighted
+            components and missing keywords of the keywords_from components
+        """
+        ctx = ctx or ScoringContext(resume_text, jd_text, self.encoder)
+
+        breakdown = {}
+        for name, component in self.components.items():
+            if weights.get(name, 0) <= 0:
+                continue
+            value = component.score(ctx)
+            breakdown[name] = round(value, 1) if value is not None else None
+
+        # Redistribute weight of unavailable components over the available ones
+        active = {n: w for n, w in weights.items() if w > 0 and breakdown.get(n) is not None}
+        total_weight = sum(active.values())
+        if total_weight > 0:
+            final_score = sum(breakdown[n] * w for n, w in active.items()) / total_weight
+        else:
+            final_score = 0.0
+
+        missing = {
+            name: self.components[name].missing_keywords(ctx)
+            for name in keywords_from
+            if name in self.components
+        }
+
+        return {
+            "score": round(final_score, 1),
+            "breakdown": breakdown,
+            "weights": active,
+            "missing_keywords": missing
+        }
+
+
+def _load_tfidf_vectorizer():
+    """Load the trained TF-IDF vectorizer if it is on disk."""
+    try:
+        import joblib
+        tfidf_path = Path(__file__).parent.parent.parent.parent / "data" / "models" / "tfidf_vectorizer.joblib"
+        if tfidf_path.exists():
+            return joblib.load(tfidf_path)
+        logger.warning("TF-IDF Vectorizer not found. TF-IDF component disabled.")
+    except Exception as e:
+        logger.error(f"Error loading TF-IDF vectorizer: {e}")
+    return None
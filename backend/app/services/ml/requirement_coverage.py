@@ -0,0 +1,159 @@
+"""
+Requirement Coverage Matrix
+Scores every job description requirement against every resume bullet in a single
+normalized-embedding matrix product, so the frontend can show coverage without LLM calls.
+"""
+
+import os
+import re
+import time
+import logging
+from typing import Dict, Any, List, Callable, Optional
+
+import numpy as np
+
+from app.services.ml.relevance_engine import encode_texts
+
+logger = logging.getLogger(__name__)
+
+# Cosine similarity at or above which a requirement counts as covered
+DEFAULT_COVERAGE_THRESHOLD = float(os.getenv("COVERAGE_THRESHOLD", "0.5"))
+
+# Caps keep the matrix (and the encode batch) bounded for pathological inputs
+MAX_REQUIREMENTS = 40
+MAX_BULLETS = 80
+
+
+class RequirementCoverage:
+    """
+    Builds a requirement x bullet similarity matrix.
+    Reuses an already-loaded SentenceTransformer (e.g. VisibilityScorer.semantic_model)
+    so no extra model is loaded; texts are encoded through the shared encode
+    batcher, so concurrent requests share batches.
+    """
+
+    def __init__(
+        self,
+        semantic_model,
+        threshold: float = DEFAULT_COVERAGE_THRESHOLD,
+        encoder: Optional[Callable[[List[str]], np.ndarray]] = encode_texts
+    ):
+        self.semantic_model = semantic_model
+        self.threshold = threshold
+        self.encoder = encoder
+
+    def compute(self, layout_schema: Dict[str, Any], jd_text: str) -> Dict[str, Any]:
+        """
+        Compute the coverage matrix.
+
+        Args:
+            layout_schema: Schema from LayoutSchemaExtractor
+            jd_text: Job description text
+
+        Returns:
+            Dictionary with per-requirement best evidence, uncovered requirements and the matrix
+        """
+        start = time.perf_counter()
+
+        requirements = self.extract_requirements(jd_text)
+        bullets = self.extract_bullets(layout_schema)
+
+        if not self.semantic_model or not requirements or not bullets:
+            return self._empty_result(requirements, bullets)
+
+        # One encode call for both sides, then one matrix product.
+        # With normalized embeddings the dot product is the cosine similarity.
+        texts = requirements + [b["text"] for b in bullets]
+        embeddings = self.encoder(texts)
+        req_emb = embeddings[:len(requirements)]
+        bullet_emb = embeddings[len(requirements):]
+        matrix = req_emb @ bullet_emb.T
+
+        best_idx = matrix.argmax(axis=1)
+        best_sim = matrix[np.arange(len(requirements)), best_idx]
+
+        coverage = []
+        uncovered = []
+        for i, requirement in enumerate(requirements):
+            similarity = float(best_sim[i])
+            covered = similarity >= self.threshold
+            coverage.append({
+                "requirement": requirement,
+                "best_bullet_index": int(best_idx[i]),
+                "best_bullet": bullets[int(best_idx[i])]["text"],
+                "similarity": round(similarity, 3),
+                "covered": covered
+            })
+            if not covered:
+                uncovered.append(requirement)
+
+        covered_count = len(requirements) - len(uncovered)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        return {
+            "requirements": coverage,
+            "bullets": bullets,
+            "matrix": np.round(matrix, 3).tolist(),
+            "uncovered_requirements": uncovered,
+            "coverage_ratio": round(covered_count / len(requirements), 3),
+            "threshold": self.threshold,
+            "elapsed_ms": round(elapsed_ms, 1)
+        }
+
+    def extract_requirements(self, jd_text: str) -> List[str]:
+        """Split a job description into requirement sentences."""
+        if not jd_text:
+            return []
+
+        requirements = []
+        seen = set()
+        for line in jd_text.split('\n'):
+            line = line.strip().lstrip('•-*○▪►–—· ').strip()
+            if not line:
+                continue
+            for sentence in re.split(r'(?<=[.!?;])\s+', line):
+                sentence = sentence.strip()
+                # Skip headings ("Requirements:") and fragments too short to carry meaning
+                if len(sentence.split()) < 4 or sentence.endswith(':'):
+                    continue
+                key = sentence.lower()
+                if key in seen:
+                    continue
+                seen.add(key)
+                requirements.append(sentence)
+
+        return requirements[:MAX_REQUIREMENTS]
+
+    def extract_bullets(self, layout_schema: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Collect experience bullets (and project lines) from a layout schema."""
+        bullets = []
+        for section in layout_schema.get("sections", []):
+            section_type = section.get("type")
+            if section_type == "EXPERIENCE":
+                for entry in section.get("entries", []):
+                    source = f"{entry.get('title', '')} @ {entry.get('company', '')}".strip(" @")
+                    for bullet in entry.get("bullets", []):
+                        text = bullet.get("content", "") if isinstance(bullet, dict) else bullet
+                        if text and text.strip():
+                            bullets.append({"text": text.strip(), "source": source or "Experience"})
+            elif section_type == "PROJECTS":
+                for line in section.get("raw", "").split('\n'):
+                    line = line.strip().lstrip('•-*○▪►–— ').strip()
+                    if len(line) > 15:
+                        bullets.append({"text": line, "source": "Projects"})
+
+        return bullets[:MAX_BULLETS]
+
+    def _empty_result(self, requirements: List[str], bullets: List[Dict[str, str]]) -> Dict[str, Any]:
+        return {
+            "requirements": [
+                {"requirement": r, "best_bullet_index": None, "best_bullet": None, "similarity": 0.0, "covered": False}
+                for r in requirements
+            ],
+            "bullets": bullets,
+            "matrix": [],
+            "uncovered_requirements": list(requirements),
+            "coverage_ratio": 0.0,
+            "threshold": self.threshold,
+            "elapsed_ms": 0.0
+        }
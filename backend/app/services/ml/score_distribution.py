@@ -0,0 +1,291 @@
+"""
+Score Distribution
+Empirical percentiles for match and friendliness scores, backed by mergeable
+KLL streaming quantile sketches kept per role category.
+
+Each worker records into an in-memory delta sketch. Deltas are periodically
+folded (under a file lock) into one shared JSON file, so sketches merge across
+workers and survive restarts. Lookups hit a precomputed CDF table, so reading
+a percentile is O(1) and recording a score is amortized O(1).
+"""
+
+import os
+import json
+import math
+import time
+import atexit
+import random
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ALL_CATEGORIES = "all"
+
+SKETCH_PATH = os.getenv(
+    "SCORE_SKETCH_PATH",
+    str(Path(__file__).parent.parent.parent.parent / "data" / "score_sketches.json")
+)
+PERSIST_INTERVAL_SECONDS = float(os.getenv("SCORE_SKETCH_PERSIST_INTERVAL", "60"))
+# Below this many samples a category falls back to the "all" sketch
+MIN_SAMPLES = int(os.getenv("SCORE_SKETCH_MIN_SAMPLES", "50"))
+
+# CDF table resolution over the 0-100 score range (0.1 points)
+_TABLE_BINS = 1001
+
+
+class _Compactor(list):
+    def compact(self, rng: random.Random):
+        """Sort and emit every other item; each emitted item doubles in weight."""
+        self.sort()
+        offset = rng.random() < 0.5
+        out = self[offset::2] if len(self) % 2 == 0 else self[offset:-1:2]
+        leftover = self[-1:] if len(self) % 2 else []
+        self[:] = leftover
+        return out
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang, Liberty 2016).
+    Memory is O(k log(n/k)) and two sketches merge by concatenating levels.
+    """
+
+    def __init__(self, k: int = 200, c: float = 2.0 / 3.0, seed: int = 0):
+        self.k = k
+        self.c = c
+        self.count = 0
+        self._rng = random.Random(seed)
+        self.compactors: List[_Compactor] = []
+        self._size = 0
+        self._max_size = 0
+        self._grow()
+
+    def _grow(self):
+        self.compactors.append(_Compactor())
+        self._max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil((self.c ** depth) * self.k)) + 1
+
+    def update(self, value: float):
+        self.compactors[0].append(float(value))
+        self._size += 1
+        self.count += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def _compress(self):
+        for level in range(len(self.compactors)):
+            if len(self.compactors[level]) >= self._capacity(level):
+                if level + 1 >= len(self.compactors):
+                    self._grow()
+                self.compactors[level + 1].extend(self.compactors[level].compact(self._rng))
+                self._size = sum(len(c) for c in self.compactors)
+                # Compress lazily: one level per call is enough to get under capacity
+                break
+
+    def merge(self, other: "KLLSketch"):
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.count += other.count
+        self._size = sum(len(c) for c in self.compactors)
+        while self._size >= self._max_size:
+            self._compress()
+
+    def weighted_items(self) -> List[Tuple[float, int]]:
+        items = []
+        for level, compactor in enumerate(self.compactors):
+            weight = 1 << level
+            items.extend((value, weight) for value in compactor)
+        items.sort()
+        return items
+
+    def cdf_table(self, lo: float = 0.0, hi: float = 100.0, bins: int = _TABLE_BINS) -> List[float]:
+        """Fraction of observations <= each of `bins` evenly spaced points in [lo, hi]."""
+        items = self.weighted_items()
+        total = sum(w for _, w in items)
+        table = []
+        idx = 0
+        cumulative = 0
+        step = (hi - lo) / (bins - 1)
+        for b in range(bins):
+            point = lo + b * step
+            while idx < len(items) and items[idx][0] <= point:
+                cumulative += items[idx][1]
+                idx += 1
+            table.append(cumulative / total if total else 0.0)
+        return table
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"k": self.k, "c": self.c, "count": self.count, "compactors": [list(c) for c in self.compactors]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "KLLSketch":
+        sketch = cls(k=data.get("k", 200), c=data.get("c", 2.0 / 3.0))
+        sketch.compactors = [_Compactor(c) for c in data.get("compactors", [[]])] or [_Compactor()]
+        sketch._max_size = sum(sketch._capacity(h) for h in range(len(sketch.compactors)))
+        sketch._size = sum(len(c) for c in sketch.compactors)
+        sketch.count = data.get("count", sketch._size)
+        return sketch
+
+
+class ScoreDistribution:
+    """
+    Per (metric, category) sketches with O(1) percentile lookup.
+
+    Metrics used by the app: "match" (VisibilityRanker), "relevance"
+    (VisibilityScorer) and "friendliness".
+    """
+
+    def __init__(self, path: str = SKETCH_PATH, persist_interval: float = PERSIST_INTERVAL_SECONDS):
+        self.path = Path(path)
+        self.persist_interval = persist_interval
+        self._lock = threading.Lock()
+        # Merged state from disk (all workers) and this worker's unflushed delta
+        self._baseline: Dict[str, KLLSketch] = {}
+        self._delta: Dict[str, KLLSketch] = {}
+        self._tables: Dict[str, Tuple[int, List[float]]] = {}
+        self._last_persist = time.monotonic()
+        self._flushing = False
+        self._load_baseline()
+        self._rebuild_tables()
+
+    @staticmethod
+    def _key(metric: str, category: str) -> str:
+        return f"{metric}:{category}"
+
+    def record(self, metric: str, score: Optional[float], category: Optional[str] = None):
+        """Feed one observed score (0-100) into the category and global sketches."""
+        if score is None:
+            return
+        categories = {ALL_CATEGORIES, _normalize_category(category)}
+        with self._lock:
+            for cat in categories:
+                key = self._key(metric, cat)
+                if key not in self._delta:
+                    self._delta[key] = KLLSketch()
+                self._delta[key].update(score)
+            due = time.monotonic() - self._last_persist >= self.persist_interval and not self._flushing
+            if due:
+                self._flushing = True
+        if due:
+            # Persist off the request path
+            threading.Thread(target=self.flush, daemon=True).start()
+
+    def percentile(self, metric: str, score: float, category: Optional[str] = None) -> Optional[float]:
+        """
+        Percentile (0-100) of `score` among observed scores, or None without enough data.
+        O(1): a table lookup on the precomputed CDF.
+        """
+        for cat in (_normalize_category(category), ALL_CATEGORIES):
+            entry = self._tables.get(self._key(metric, cat))
+            if entry and entry[0] >= MIN_SAMPLES:
+                table = entry[1]
+                idx = int(round(min(100.0, max(0.0, score)) * (len(table) - 1) / 100.0))
+                return round(table[idx] * 100, 1)
+        return None
+
+    def flush(self):
+        """Fold this worker's delta into the shared file and refresh lookup tables."""
+        with self._lock:
+            delta, self._delta = self._delta, {}
+        try:
+            if delta:
+                self._merge_into_file(delta)
+            self._load_baseline()
+            self._rebuild_tables()
+        except Exception as e:
+            logger.error(f"Failed to persist score sketches: {e}")
+            # Keep the observations for the next attempt
+            with self._lock:
+                for key, sketch in delta.items():
+                    if key in self._delta:
+                        sketch.merge(self._delta[key])
+                    self._delta[key] = sketch
+        finally:
+            self._last_persist = time.monotonic()
+            self._flushing = False
+
+    def _merge_into_file(self, delta: Dict[str, KLLSketch]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lock_path = self.path.with_suffix(".lock")
+        with open(lock_path, "w") as lock_file:
+            _lock_file(lock_file)
+            try:
+                stored = self._read_file()
+                for key, sketch in delta.items():
+                    if key in stored:
+                        stored[key].merge(sketch)
+                    else:
+                        stored[key] = sketch
+                tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+                with open(tmp_path, "w") as f:
+                    json.dump({key: s.to_dict() for key, s in stored.items()}, f)
+                os.replace(tmp_path, self.path)
+            finally:
+                _unlock_file(lock_file)
+
+    def _read_file(self) -> Dict[str, KLLSketch]:
+        if not self.path.exists():
+            return {}
+        with open(self.path, "r") as f:
+            data = json.load(f)
+        return {key: KLLSketch.from_dict(value) for key, value in data.items()}
+
+    def _load_baseline(self):
+        try:
+            self._baseline = self._read_file()
+        except Exception as e:
+            logger.warning(f"Could not load score sketches from {self.path}: {e}")
+
+    def _rebuild_tables(self):
+        with self._lock:
+            keys = set(self._baseline) | set(self._delta)
+            merged = {}
+            for key in keys:
+                sketch = KLLSketch()
+                if key in self._baseline:
+                    sketch.merge(self._baseline[key])
+                if key in self._delta:
+                    sketch.merge(self._delta[key])
+                merged[key] = sketch
+        # Swap in a new dict so readers never see a half-built table
+        self._tables = {key: (s.count, s.cdf_table()) for key, s in merged.items()}
+
+
+def _normalize_category(category: Optional[str]) -> str:
+    return (category or ALL_CATEGORIES).strip().lower() or ALL_CATEGORIES
+
+
+def _lock_file(f):
+    try:
+        import fcntl
+        fcntl.flock(f, fcntl.LOCK_EX)
+    except ImportError:
+        pass
+
+
+def _unlock_file(f):
+    try:
+        import fcntl
+        fcntl.flock(f, fcntl.LOCK_UN)
+    except ImportError:
+        pass
+
+
+_distribution = None
+
+
+def get_score_distribution() -> ScoreDistribution:
+    """Process-wide distribution; flushed once more at interpreter exit."""
+    global _distribution
+    if _distribution is None:
+        _distribution = ScoreDistribution()
+        atexit.register(_distribution.flush)
+    return _distribution
@@ -3,88 +3,79 @@ Visibility Scorer (Mode 2)
 Calculates Resume-Job Description Relevance Score using Semantic Similarity and TF-IDF.
 """
 
-import numpy as np
-from pathlib import Path
-import joblib
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import logging
 
+from app.services.ml.relevance_engine import get_relevance_engine
+from app.services.ml.score_distribution import get_score_distribution
+
 logger = logging.getLogger(__name__)
 
+# We give more weight to Semantic (meaning) than Keywords (exact match).
+# If the TF-IDF vectorizer is unavailable the engine falls back to semantic only.
+SCORER_WEIGHTS = {"semantic": 0.7, "tfidf": 0.3}
+
+
 class VisibilityScorer:
     """
     Calculates how well a resume matches a job description.
     Uses a hybrid approach:
     1. Semantic Similarity (Sentence Transformers) - Captures meaning
     2. TF-IDF Similarity (sklearn) - Captures keyword overlap
+    Both are components of the shared RelevanceEngine.
     """
     
     def __init__(self):
+        self.engine = None
         self.semantic_model = None
         self.tfidf_vectorizer = None
+        self.distribution = get_score_distribution()
         self._load_models()
         
     def _load_models(self):
-        """Load models from disk."""
+        """Load (or reuse) the shared engine models."""
         try:
-            models_dir = Path(__file__).parent.parent.parent.parent / "data" / "models"
-            
-            # Load Semantic Model (download if not cached)
-            # We use a small, fast model
-            self.semantic_model = SentenceTransformer('all-MiniLM-L6-v2')
-            
-            # Load TF-IDF Vectorizer (if available)
-            tfidf_path = models_dir / "tfidf_vectorizer.joblib"
-            if tfidf_path.exists():
-                self.tfidf_vectorizer = joblib.load(tfidf_path)
-            else:
-                logger.warning("TF-IDF Vectorizer not found. Using Semantic Score only.")
-                
+            self.engine = get_relevance_engine()
+            self.semantic_model = self.engine.semantic_model
+            self.tfidf_vectorizer = self.engine.get_component("tfidf").vectorizer
         except Exception as e:
             logger.error(f"Error loading VisibilityScorer models: {e}")
             # Fallback to None (will handle in predict)
             
-    def predict(self, resume_text: str, jd_text: str) -> dict:
+    def predict(self, resume_text: str, jd_text: str, category: str = None, record: bool = True) -> dict:
         """
         Calculate Relevance Score (0-100).
         
+        Args:
+            resume_text: Resume plain text
+            jd_text: Job description text
+            category: Role category used to pick the percentile population
+            record: Feed the score into the empirical distribution (off for warmup)
+        
         Returns:
             dict: {
                 'score': float,
                 'semantic_score': float,
                 'keyword_score': float,
-                'details': dict
+                'percentile': float or None,
+                'breakdown': dict,
+                'missing_keywords': list
             }
         """
         if not resume_text or not jd_text:
             return {'score': 0.0, 'error': 'Empty text'}
+        if not self.engine:
+            return {'score': 0.0, 'error': 'Models not loaded'}
             
-        # 1. Semantic Score
-        semantic_score = 0.0
-        if self.semantic_model:
-            embeddings = self.semantic_model.encode([resume_text, jd_text])
-            # Cosine similarity between the two embeddings
-            # embeddings[0] is resume, embeddings[1] is JD
-            semantic_score = float(cosine_similarity([embeddings[0]], [embeddings[1]])[0][0])
-            # Normalize -1 to 1 -> 0 to 1 (though usually it's 0-1 for text)
-            semantic_score = max(0.0, semantic_score)
-            
-        # 2. Keyword Score (TF-IDF)
-        keyword_score = 0.0
-        if self.tfidf_vectorizer:
-            try:
-                tfidf_matrix = self.tfidf_vectorizer.transform([resume_text, jd_text])
-                keyword_score = float(cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0])
-            except Exception as e:
-                logger.warning(f"TF-IDF calculation failed: {e}")
-                keyword_score = semantic_score # Fallback
-        else:
+        result = self.engine.score(resume_text, jd_text, SCORER_WEIGHTS, keywords_from=("gazetteer",))
+        breakdown = result["breakdown"]
+        
+        semantic_score = breakdown.get("semantic") or 0.0
+        keyword_score = breakdown.get("tfidf")
+        if keyword_score is None:
             keyword_score = semantic_score # Fallback
             
-        # 3. Hybrid Score
-        # We give more weight to Semantic (meaning) than Keywords (exact match)
-        raw_score = (semantic_score * 0.7) + (keyword_score * 0.3)
+        # Hybrid score on a 0-1 scale
+        raw_score = result["score"] / 100
         
         # Scale to 0-100 with a "User Happiness" curve
         # Raw similarity of 0.3 should be ~60
@@ -93,15 +84,18 @@ class VisibilityScorer:
         final_score_100 = min(100.0, (raw_score * 120) + 20)
         final_score_100 = round(final_score_100, 1)
         
-        # 4. Missing Keywords Analysis
-        missing_keywords = self._extract_missing_keywords(resume_text, jd_text)
-
+        percentile = self.distribution.percentile("relevance", final_score_100, category)
+        if record:
+            self.distribution.record("relevance", final_score_100, category)
+        
         return {
             'score': final_score_100,
-            'semantic_score': round(semantic_score * 100, 1),
-            'keyword_score': round(keyword_score * 100, 1),
+            'semantic_score': round(semantic_score, 1),
+            'keyword_score': round(keyword_score, 1),
             'level': self._get_level(final_score_100),
-            'missing_keywords': missing_keywords
+            'percentile': percentile,
+            'breakdown': breakdown,
+            'missing_keywords': result["missing_keywords"]["gazetteer"][:10] # Top 10 missing
         }
         
     def _get_level(self, score):
@@ -109,35 +103,3 @@ class VisibilityScorer:
         if score >= 60: return "GOOD_MATCH"
         if score >= 40: return "MODERATE_MATCH"
         return "LOW_MATCH"
-
-    def _extract_missing_keywords(self, resume_text: str, jd_text: str) -> list:
-        """
-        Identify keywords present in JD but missing in Resume.
-        Uses a predefined list of high-value tech keywords.
-        """
-        # Common tech keywords (Sync with NER extractor for consistency)
-        common_keywords = {
-            "Python", "Java", "JavaScript", "TypeScript", "React", "Angular", "Vue", "Node.js", "Django", "Flask",
-            "FastAPI", "Spring Boot", "SQL", "PostgreSQL", "MySQL", "MongoDB", "Redis", "Docker", "Kubernetes",
-            "AWS", "Azure", "GCP", "Git", "CI/CD", "Jenkins", "Terraform", "Linux", "C++", "C#", ".NET",
-            "Go", "Rust", "Swift", "Kotlin", "Flutter", "React Native", "HTML", "CSS", "SASS", "GraphQL",
-            "REST API", "Microservices", "Machine Learning", "Deep Learning", "NLP", "TensorFlow", "PyTorch",
-            "Pandas", "NumPy", "Scikit-learn", "Data Analysis", "Agile", "Scrum", "Jira", "Tableau", "Power BI",
-            "Hadoop", "Spark", "Kafka", "Elasticsearch", "Cybersecurity", "Blockchain", "IoT", "DevOps"
-        }
-        
-        resume_lower = resume_text.lower()
-        jd_lower = jd_text.lower()
-        
-        missing = []
-        import re
-        
-        for keyword in common_keywords:
-            pattern = r'\b' + re.escape(keyword.lower()) + r'\b'
-            # If keyword is in JD...
-            if re.search(pattern, jd_lower):
-                # ...but NOT in Resume
-                if not re.search(pattern, resume_lower):
-                    missing.append(keyword)
-                    
-        return missing[:10] # Return top 10 missing keywords
@@ -0,0 +1,863 @@
+"""
+Shared plumbing for LLM clients (Gemini, OpenAI).
+
+Providers implement one-attempt `_generate` / `_generate_async` plus the prompt
+builders; this base adds the persistent response cache (structured responses are only
+cached once they parse and validate), retry with jittered
+exponential backoff (honouring Retry-After), JSON parsing and the per-method
+result handling, in both a blocking and an asyncio flavour. The async path
+never blocks the event loop and propagates cancellation (asyncio.CancelledError
+is not retried).
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import contextvars
+import concurrent.futures
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.core.llm_cache import get_llm_cache, fingerprint
+from app.core.llm_recording import get_recorder
+from app.core.llm_usage import record_call, record_retry, record_cache_hit, check_budget, check_budget_async
+from app.core.rate_limiter import retry_after_seconds
+from app.services.rewrite.jd_compactor import compact_job_description
+from app.core.metrics import metrics
+from app.services.rewrite.structured_output import (
+    repair_json, validate, field_schema, describe_schema, JSONRepairError,
+    experience_schema, CONTENT_SCHEMA, BRUTAL_REVIEW_SCHEMA, CHUNK_REVIEW_SCHEMA, REVIEW_MERGE_SCHEMA
+)
+from app.services.rewrite import chunked_review
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "30"))
+
+BRUTAL_REVIEW_FIELDS = ["plain_text", "marked_up_resume", "changes", "company_expectations", "harsh_review"]
+
+# Provider JSON modes for structured calls; off for models that reject them
+JSON_MODE = os.getenv("LLM_JSON_MODE", "1") == "1"
+# Follow-up requests for fields still missing/invalid after repair (0 disables)
+STRUCTURED_REASKS = int(os.getenv("LLM_STRUCTURED_REASKS", "1"))
+
+# Output budget for the one-shot multi-section rewrite
+BATCH_MAX_TOKENS = int(os.getenv("REWRITE_BATCH_MAX_TOKENS", "8192"))
+
+BATCH_REWRITE_PROMPT_HEADER = """You are an expert ATS optimization specialist. Rewrite every resume section in the input to maximize ATS score while maintaining authenticity.
+
+SHARED CONTEXT:
+- "job_description_snippet" and "target_keywords" apply to every section.
+- Only integrate keywords that are relevant to the actual work performed; skip any that don't fit naturally.
+- Never invent employers, titles, degrees, tools or achievements.
+
+PER-SECTION RULES:
+- "experience": rewrite each bullet with a strong action verb, quantified impact where the original supports it, 1-2 lines each. Return EXACTLY "required_bullet_count" bullets, in the original order.
+- "summary": 3-4 lines leading with the strongest qualification for the role, keywords woven in naturally.
+- "skills": group logically (e.g. "Languages:", "Frameworks:", "Tools:"), expand abbreviations, prioritize skills matching the job.
+
+RESPONSE FORMAT (JSON, one entry per input section id):
+{
+  "sections": {
+    "<id>": {"bullets": ["..."], "explanation": "1-3 short lines"},
+    "<id>": {"content": "...", "explanation": "1-3 short lines"}
+  }
+}
+Use "bullets" for experience sections and "content" for summary and skills. Return ONLY the JSON.
+"""
+
+
+def backoff_delay(attempt: int, error: Exception) -> float:
+    """Retry-After when the server sent one, else exponential backoff with equal jitter."""
+    hinted = retry_after_seconds(error)
+    if hinted is not None:
+        return min(hinted, RETRY_MAX_DELAY)
+    ceiling = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def usage_counts(response) -> Optional[Tuple[int, int, int]]:
+    """
+    (prompt, cached prompt, completion) token counts from a provider response.
+
+    Reads OpenAI's `usage` (prompt_tokens_details.cached_tokens) and Gemini's
+    `usage_metadata` (cached_content_token_count); None when neither is present.
+    """
+    usage = getattr(response, "usage", None)
+    if usage is not None and getattr(usage, "prompt_tokens", None) is not None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        return (
+            usage.prompt_tokens or 0,
+            getattr(details, "cached_tokens", 0) or 0,
+            getattr(usage, "completion_tokens", 0) or 0
+        )
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None and getattr(usage, "prompt_token_count", None) is not None:
+        return (
+            usage.prompt_token_count or 0,
+            getattr(usage, "cached_content_token_count", 0) or 0,
+            getattr(usage, "candidates_token_count", 0) or 0
+        )
+    return None
+
+
+def record_usage(provider: str, model: str, response, started: float):
+    """
+    Count prompt, cached-prompt and completion tokens for one live call.
+
+    Latency is split by whether any of the prompt was served from the
+    provider's prefix cache, so the benefit of the static-prefix prompt
+    layout shows up directly on /metrics.
+    """
+    counts = usage_counts(response)
+    latency_ms = (time.monotonic() - started) * 1000
+    # Per-request totals and cost (app.core.llm_usage), also for calls without usage data
+    record_call(provider, model, latency_ms, *(counts or ()))
+    if counts is None:
+        return
+    prompt_tokens, cached_tokens, completion_tokens = counts
+    labels = {"provider": provider, "model": model}
+    metrics.inc("llm_prompt_tokens", prompt_tokens, **labels)
+    metrics.inc("llm_cached_prompt_tokens", cached_tokens, **labels)
+    metrics.inc("llm_completion_tokens", completion_tokens, **labels)
+    if prompt_tokens:
+        metrics.observe("llm_prompt_cache_hit_ratio", cached_tokens / prompt_tokens, **labels)
+    metrics.observe("llm_call_latency_ms", latency_ms, cached="yes" if cached_tokens else "no", **labels)
+
+
+class BaseLLMClient:
+    """
+    Provider-agnostic client surface used by ResumeRewriter, GenerativeFeedback
+    and the rewrite endpoints. Every public method has an `_async` twin.
+    """
+
+    provider_name = "llm"
+
+    # -- Provider hooks -------------------------------------------------------
+
+    def _generate(
+        self,
+        prompt: str,
+        system: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False
+    ) -> str:
+        """
+        Single blocking completion attempt. Raises on failure or empty output.
+        json_mode asks the provider to constrain output to a JSON object.
+        """
+        raise NotImplementedError
+
+    async def _generate_async(
+        self,
+        prompt: str,
+        system: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False
+    ) -> str:
+        """Single non-blocking completion attempt. Raises on failure or empty output."""
+        raise NotImplementedError
+
+    def _experience_prompt(self, entry: Dict[str, Any], job_description: str, target_keywords: List[str]) -> str:
+        raise NotImplementedError
+
+    def _summary_prompt(self, summary_text: str, job_description: str, target_keywords: List[str]) -> str:
+        raise NotImplementedError
+
+    def _skills_prompt(self, skills_text: str, job_description: str, target_keywords: List[str]) -> str:
+        raise NotImplementedError
+
+    def _brutal_review_request(self, original_resume_text: str, job_description: str) -> Dict[str, Any]:
+        """Prompt plus generation options ({"prompt", "system", "temperature", "max_tokens"})."""
+        raise NotImplementedError
+
+    def _compact_jd(self, job_description: str) -> str:
+        """Boilerplate-free canonical JD, shared (via its hash cache) by every prompt of a request."""
+        return compact_job_description(job_description).text
+
+    # -- Cache + retry --------------------------------------------------------
+
+    def _cache_lookup_key(self, prompt: str, options: Dict[str, Any]):
+        """(cache, key) for this request, or (None, None) when caching is off."""
+        cache = get_llm_cache()
+        if cache is None:
+            return None, None
+        temperature = options.get("temperature")
+        if temperature is None:
+            temperature = getattr(self, "temperature", None)
+        key = fingerprint(
+            self.provider_name,
+            getattr(self, "model_name", ""),
+            temperature,
+            prompt,
+            system=options.get("system"),
+            max_tokens=options.get("max_tokens"),
+            json_mode=options.get("json_mode") or None
+        )
+        return cache, key
+
+    def _cache_store(self, prompt: str, text: str, options: Dict[str, Any]):
+        """Cache a response once its caller has validated it (blocking)."""
+        cache, key = self._cache_lookup_key(prompt, options)
+        if cache:
+            cache.set(key, text, self.provider_name, self.model_name)
+
+    def _cache_discard(self, prompt: str, options: Dict[str, Any]):
+        """Drop a cached response that failed validation, so retries call the model again (blocking)."""
+        cache, key = self._cache_lookup_key(prompt, options)
+        if cache:
+            cache.delete(key)
+
+    def _record(self, prompt: str, text: str, started: float, options: Dict[str, Any]):
+        """Append a live completion to LLM_RECORD_PATH for offline replay."""
+        recorder = get_recorder()
+        if recorder is not None:
+            recorder.record(
+                prompt, text, (time.monotonic() - started) * 1000,
+                self.provider_name, getattr(self, "model_name", ""), **options
+            )
+
+    def _record_usage(self, response, started: float):
+        """Token and prefix-cache accounting for a raw provider response."""
+        record_usage(self.provider_name, getattr(self, "model_name", ""), response, started)
+
+    def _call_gemini(self, prompt: str, max_retries: int = 3, cache_response: bool = True, **options) -> str:
+        """
+        Call the provider with retry logic (blocking).
+        Named _call_gemini for compatibility with existing code.
+
+        Args:
+            prompt: Prompt to send
+            max_retries: Maximum number of attempts
+            cache_response: Store the response in the cache (off when the caller validates first)
+            **options: system, temperature, max_tokens, json_mode overrides
+
+        Returns:
+            Response text
+        """
+        cache, key = self._cache_lookup_key(prompt, options)
+        if cache:
+            cached = cache.get(key, self.provider_name)
+            if cached is not None:
+                record_cache_hit()
+                return cached
+        check_budget()
+        
+        for attempt in range(max_retries):
+            try:
+                started = time.monotonic()
+                text = self._generate(prompt, **options)
+                logger.info(f"{self.provider_name} API call successful (attempt {attempt + 1})")
+                self._record(prompt, text, started, options)
+                if cache and cache_response:
+                    cache.set(key, text, self.provider_name, self.model_name)
+                return text
+            except Exception as e:
+                logger.error(f"{self.provider_name} API call failed (attempt {attempt + 1}/{max_retries}): {e}")
+                if attempt >= max_retries - 1:
+                    raise
+                wait_time = backoff_delay(attempt, e)
+                logger.info(f"Retrying in {wait_time:.1f} seconds...")
+                record_retry(self.provider_name)
+                time.sleep(wait_time)
+
+        raise RuntimeError(f"Failed to call {self.provider_name} API after all retries")
+
+    async def _call_gemini_async(self, prompt: str, max_retries: int = 3, cache_response: bool = True, **options) -> str:
+        """
+        Call the provider with retry logic without blocking the event loop.
+        Cancelling the awaiting task cancels the in-flight request and any backoff sleep.
+
+        Args:
+            prompt: Prompt to send
+            max_retries: Maximum number of attempts
+            cache_response: Store the response in the cache (off when the caller validates first)
+            **options: system, temperature, max_tokens, json_mode overrides
+
+        Returns:
+            Response text
+        """
+        cache, key = self._cache_lookup_key(prompt, options)
+        if cache:
+            cached = await asyncio.to_thread(cache.get, key, self.provider_name)
+            if cached is not None:
+                record_cache_hit()
+                return cached
+        await check_budget_async()
+        
+        for attempt in range(max_retries):
+            try:
+                started = time.monotonic()
+                text = await self._generate_async(prompt, **options)
+                logger.info(f"{self.provider_name} API call successful (attempt {attempt + 1})")
+                self._record(prompt, text, started, options)
+                if cache and cache_response:
+                    await asyncio.to_thread(cache.set, key, text, self.provider_name, self.model_name)
+                return text
+            except Exception as e:
+                logger.error(f"{self.provider_name} API call failed (attempt {attempt + 1}/{max_retries}): {e}")
+                if attempt >= max_retries - 1:
+                    raise
+                wait_time = backoff_delay(attempt, e)
+                logger.info(f"Retrying in {wait_time:.1f} seconds...")
+                record_retry(self.provider_name)
+                await asyncio.sleep(wait_time)
+
+        raise RuntimeError(f"Failed to call {self.provider_name} API after all retries")
+
+    # -- Structured output ----------------------------------------------------
+
+    def generate_json(
+        self,
+        prompt: str,
+        schema: Dict[str, Any],
+        label: str = "json",
+        max_retries: int = 3,
+        **options
+    ) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """
+        Call the model for a JSON object matching `schema`.
+
+        Uses the provider's JSON mode, repairs malformed output, and re-asks
+        only for the fields that are still missing or invalid, merging them in.
+
+        Args:
+            prompt: Prompt to send
+            schema: JSON-Schema subset the object must satisfy
+            label: Method name for logs and metrics
+            **options: system, temperature, max_tokens overrides
+
+        Returns:
+            (object, remaining problems by field); callers apply their own
+            defaults for whatever is still listed
+        """
+        options.setdefault("json_mode", JSON_MODE)
+        # Cache only validated responses: a truncated completion must not be replayed on retry
+        response_text = self._call_gemini(prompt, max_retries, cache_response=False, **options)
+        data, problems = self._check_structured(response_text, schema, label)
+        self._settle_cache(prompt, response_text, problems, options)
+        for _ in range(STRUCTURED_REASKS if problems else 0):
+            fields = self._reask_fields(schema, problems)
+            reask_prompt = self._reask_prompt(prompt, schema, fields, problems)
+            response_text = self._call_gemini(reask_prompt, max_retries, cache_response=False, **options)
+            data, problems = self._merge_reask(data, response_text, schema, fields, label)
+            self._settle_cache(reask_prompt, response_text, problems, options)
+            if not problems:
+                break
+        if problems:
+            metrics.inc("llm_schema_failures", label=label)
+        return data, problems
+
+    async def generate_json_async(
+        self,
+        prompt: str,
+        schema: Dict[str, Any],
+        label: str = "json",
+        max_retries: int = 3,
+        **options
+    ) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        options.setdefault("json_mode", JSON_MODE)
+        response_text = await self._call_gemini_async(prompt, max_retries, cache_response=False, **options)
+        data, problems = self._check_structured(response_text, schema, label)
+        await asyncio.to_thread(self._settle_cache, prompt, response_text, problems, options)
+        for _ in range(STRUCTURED_REASKS if problems else 0):
+            fields = self._reask_fields(schema, problems)
+            reask_prompt = self._reask_prompt(prompt, schema, fields, problems)
+            response_text = await self._call_gemini_async(reask_prompt, max_retries, cache_response=False, **options)
+            data, problems = self._merge_reask(data, response_text, schema, fields, label)
+            await asyncio.to_thread(self._settle_cache, reask_prompt, response_text, problems, options)
+            if not problems:
+                break
+        if problems:
+            metrics.inc("llm_schema_failures", label=label)
+        return data, problems
+
+    def _settle_cache(self, prompt: str, response_text: str, problems: Dict[str, str], options: Dict[str, Any]):
+        if problems:
+            self._cache_discard(prompt, options)
+        else:
+            self._cache_store(prompt, response_text, options)
+
+    def _check_structured(self, response_text: str, schema: Dict[str, Any], label: str):
+        try:
+            data = self._parse_json_response(response_text)
+        except JSONRepairError as e:
+            logger.warning(f"{self.provider_name} {label} response is not JSON: {e}")
+            data = {}
+        problems = validate(data, schema)
+        if problems:
+            logger.warning(f"{self.provider_name} {label} response failed validation: {problems}")
+        return data, problems
+
+    def _reask_fields(self, schema: Dict[str, Any], problems: Dict[str, str]) -> List[str]:
+        fields = [field for field in problems if field]
+        # Nothing usable came back: every required field is missing
+        return fields or list(schema.get("required", []))
+
+    def _reask_prompt(self, prompt: str, schema: Dict[str, Any], fields: List[str], problems: Dict[str, str]) -> str:
+        issues = "; ".join(f"{field or 'response'}: {reason}" for field, reason in problems.items())
+        return (
+            f"{prompt}\n\n"
+            f"FOLLOW-UP: An earlier response to this request had problems ({issues}). "
+            f"The other fields were received. Return ONLY a JSON object with the fields "
+            f"{', '.join(fields)}, matching this schema:\n{describe_schema(field_schema(schema, fields))}"
+        )
+
+    def _merge_reask(self, data: Dict[str, Any], response_text: str, schema: Dict[str, Any], fields: List[str], label: str):
+        metrics.inc("llm_structured_reasks", label=label)
+        try:
+            patch = self._parse_json_response(response_text)
+        except JSONRepairError as e:
+            logger.warning(f"{self.provider_name} {label} re-ask response is not JSON: {e}")
+            patch = {}
+        merged = dict(data)
+        merged.update({field: patch[field] for field in fields if field in patch})
+        return merged, validate(merged, schema)
+
+    # -- Section rewrites -----------------------------------------------------
+
+    def rewrite_experience_entry(
+        self,
+        entry: Dict[str, Any],
+        job_description: str,
+        target_keywords: List[str]
+    ) -> Dict[str, Any]:
+        """
+        Rewrite a single experience entry.
+
+        Args:
+            entry: Experience entry with company, title, dates, bullets
+            job_description: Target job description
+            target_keywords: Keywords to integrate
+
+        Returns:
+            Dictionary with rewritten bullets and explanation
+        """
+        prompt = self._experience_prompt(entry, self._compact_jd(job_description), target_keywords)
+        schema = experience_schema(len(entry.get("bullets", [])))
+        return self._finish_experience(*self.generate_json(prompt, schema, "experience"), entry)
+
+    async def rewrite_experience_entry_async(
+        self,
+        entry: Dict[str, Any],
+        job_description: str,
+        target_keywords: List[str]
+    ) -> Dict[str, Any]:
+        prompt = self._experience_prompt(entry, self._compact_jd(job_description), target_keywords)
+        schema = experience_schema(len(entry.get("bullets", [])))
+        return self._finish_experience(*await self.generate_json_async(prompt, schema, "experience"), entry)
+
+    def rewrite_summary(
+        self,
+        summary_text: str,
+        job_description: str,
+        target_keywords: List[str]
+    ) -> Dict[str, Any]:
+        """
+        Rewrite summary section.
+
+        Args:
+            summary_text: Original summary
+            job_description: Target job description
+            target_keywords: Keywords to integrate
+
+        Returns:
+            Dictionary with rewritten content and explanation
+        """
+        prompt = self._summary_prompt(summary_text, self._compact_jd(job_description), target_keywords)
+        return self._finish_content(*self.generate_json(prompt, CONTENT_SCHEMA, "summary"), summary_text, "summary")
+
+    async def rewrite_summary_async(
+        self,
+        summary_text: str,
+        job_description: str,
+        target_keywords: List[str]
+    ) -> Dict[str, Any]:
+        prompt = self._summary_prompt(summary_text, self._compact_jd(job_description), target_keywords)
+        return self._finish_content(*await self.generate_json_async(prompt, CONTENT_SCHEMA, "summary"), summary_text, "summary")
+
+    def rewrite_skills(
+        self,
+        skills_text: str,
+        job_description: str,
+        target_keywords: List[str]
+    ) -> Dict[str, Any]:
+        """
+        Rewrite skills section.
+
+        Args:
+            skills_text: Original skills
+            job_description: Target job description
+            target_keywords: Keywords to integrate
+
+        Returns:
+            Dictionary with rewritten content and explanation
+        """
+        prompt = self._skills_prompt(skills_text, self._compact_jd(job_description), target_keywords)
+        return self._finish_content(*self.generate_json(prompt, CONTENT_SCHEMA, "skills"), skills_text, "skills")
+
+    async def rewrite_skills_async(
+        self,
+        skills_text: str,
+        job_description: str,
+        target_keywords: List[str]
+    ) -> Dict[str, Any]:
+        prompt = self._skills_prompt(skills_text, self._compact_jd(job_description), target_keywords)
+        return self._finish_content(*await self.generate_json_async(prompt, CONTENT_SCHEMA, "skills"), skills_text, "skills")
+
+    def rewrite_with_brutal_review(
+        self,
+        original_resume_text: str,
+        job_description: str
+    ) -> Dict[str, Any]:
+        """
+        Comprehensive resume rewrite with brutal hiring manager review.
+
+        Args:
+            original_resume_text: Full original resume as plain text
+            job_description: Target job description
+
+        Returns:
+            Dictionary with marked-up resume, changes, company expectations, and harsh review
+        """
+        if chunked_review.should_chunk(original_resume_text):
+            return self._chunked_brutal_review(original_resume_text, job_description)
+        request = self._brutal_review_request(original_resume_text, self._compact_jd(job_description))
+        try:
+            result, problems = self.generate_json(request.pop("prompt"), BRUTAL_REVIEW_SCHEMA, "brutal_review", **request)
+            return self._finish_brutal_review(result, problems)
+        except Exception as e:
+            logger.error(f"Failed to generate brutal review: {e}")
+            return self._brutal_review_fallback(original_resume_text, e)
+
+    async def rewrite_with_brutal_review_async(
+        self,
+        original_resume_text: str,
+        job_description: str
+    ) -> Dict[str, Any]:
+        if chunked_review.should_chunk(original_resume_text):
+            return await self._chunked_brutal_review_async(original_resume_text, job_description)
+        request = self._brutal_review_request(original_resume_text, self._compact_jd(job_description))
+        try:
+            result, problems = await self.generate_json_async(
+                request.pop("prompt"), BRUTAL_REVIEW_SCHEMA, "brutal_review", **request
+            )
+            return self._finish_brutal_review(result, problems)
+        except Exception as e:
+            logger.error(f"Failed to generate brutal review: {e}")
+            return self._brutal_review_fallback(original_resume_text, e)
+
+    def _chunked_brutal_review(self, original_resume_text: str, job_description: str) -> Dict[str, Any]:
+        """
+        Map-reduce brutal review: each part of the resume is reviewed and
+        rewritten in a parallel call, then one small call merges the findings
+        into the verdict and company expectations (see chunked_review).
+        """
+        job_description = self._compact_jd(job_description)
+        chunks = chunked_review.split_resume(original_resume_text)
+        outline = chunked_review.resume_outline(chunks)
+        logger.info(f"Chunked brutal review: {len(chunks)} parts of {[len(c) for c in chunks]} chars")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+            # Each part runs in a copy of this context, so it is accounted to the current request
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._review_chunk, chunk, i, outline, job_description)
+                for i, chunk in enumerate(chunks)
+            ]
+            chunk_results = [future.result() for future in futures]
+        merged = self._merge_chunk_reviews(chunk_results, outline, job_description)
+        return chunked_review.assemble(chunks, chunk_results, merged)
+
+    async def _chunked_brutal_review_async(self, original_resume_text: str, job_description: str) -> Dict[str, Any]:
+        job_description = self._compact_jd(job_description)
+        chunks = chunked_review.split_resume(original_resume_text)
+        outline = chunked_review.resume_outline(chunks)
+        logger.info(f"Chunked brutal review: {len(chunks)} parts of {[len(c) for c in chunks]} chars")
+        chunk_results = await asyncio.gather(*(
+            self._review_chunk_async(chunk, i, outline, job_description) for i, chunk in enumerate(chunks)
+        ))
+        merged = await self._merge_chunk_reviews_async(chunk_results, outline, job_description)
+        return chunked_review.assemble(chunks, chunk_results, merged)
+
+    def _review_chunk(self, chunk: str, index: int, outline: List[str], job_description: str) -> Optional[Dict[str, Any]]:
+        """One part's review, or None when it failed (the part then keeps its original text)."""
+        try:
+            result, problems = self.generate_json(
+                chunked_review.chunk_prompt(chunk, index, outline, job_description), CHUNK_REVIEW_SCHEMA,
+                "brutal_review_chunk", max_tokens=chunked_review.chunk_max_tokens(chunk)
+            )
+            return self._finish_chunk_review(result, problems, index)
+        except Exception as e:
+            logger.error(f"Brutal review of part {index + 1} failed: {e}")
+            return None
+
+    async def _review_chunk_async(self, chunk: str, index: int, outline: List[str], job_description: str) -> Optional[Dict[str, Any]]:
+        try:
+            result, problems = await self.generate_json_async(
+                chunked_review.chunk_prompt(chunk, index, outline, job_description), CHUNK_REVIEW_SCHEMA,
+                "brutal_review_chunk", max_tokens=chunked_review.chunk_max_tokens(chunk)
+            )
+            return self._finish_chunk_review(result, problems, index)
+        except Exception as e:
+            logger.error(f"Brutal review of part {index + 1} failed: {e}")
+            return None
+
+    def _merge_chunk_reviews(self, chunk_results, outline: List[str], job_description: str) -> Optional[Dict[str, Any]]:
+        """Overall verdict from the per-part findings, or None (assemble then aggregates them)."""
+        if not any(chunk_results):
+            return None
+        try:
+            result, problems = self.generate_json(
+                chunked_review.merge_prompt(chunk_results, outline, job_description), REVIEW_MERGE_SCHEMA,
+                "brutal_review_merge", max_tokens=chunked_review.BRUTAL_MERGE_MAX_TOKENS
+            )
+            return self._finish_brutal_review(result, problems, REVIEW_MERGE_SCHEMA["required"])
+        except Exception as e:
+            logger.error(f"Brutal review merge failed: {e}")
+            return None
+
+    async def _merge_chunk_reviews_async(self, chunk_results, outline: List[str], job_description: str) -> Optional[Dict[str, Any]]:
+        if not any(chunk_results):
+            return None
+        try:
+            result, problems = await self.generate_json_async(
+                chunked_review.merge_prompt(chunk_results, outline, job_description), REVIEW_MERGE_SCHEMA,
+                "brutal_review_merge", max_tokens=chunked_review.BRUTAL_MERGE_MAX_TOKENS
+            )
+            return self._finish_brutal_review(result, problems, REVIEW_MERGE_SCHEMA["required"])
+        except Exception as e:
+            logger.error(f"Brutal review merge failed: {e}")
+            return None
+
+    def _finish_chunk_review(self, result: Dict[str, Any], problems: Dict[str, str], index: int) -> Optional[Dict[str, Any]]:
+        # Without rewritten text the part is unusable; missing findings are just empty
+        if any(field in problems for field in ("", "plain_text", "marked_up_resume")):
+            logger.warning(f"Brutal review of part {index + 1} unusable: {problems}")
+            return None
+        for field in ("changes", "strengths", "weaknesses", "missing_or_weak_skills", "risk_flags"):
+            if not isinstance(result.get(field), list):
+                result[field] = []
+        return result
+
+    # -- Batched rewrite ------------------------------------------------------
+
+    def rewrite_sections_batch(
+        self,
+        sections: List[Dict[str, Any]],
+        job_description: str,
+        target_keywords: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Rewrite several sections in one round trip.
+
+        Args:
+            sections: Items {"id", "kind": experience|summary|skills, "entry" | "text"}
+            job_description: Target job description (sent once)
+            target_keywords: Keywords to integrate (sent once)
+
+        Returns:
+            id -> validated result for the sections that came back usable;
+            callers fall back to the per-section methods for missing ids
+        """
+        prompt = self._batch_prompt(sections, self._compact_jd(job_description), target_keywords)
+        options = {"max_tokens": BATCH_MAX_TOKENS, "json_mode": JSON_MODE}
+        response_text = self._call_gemini(prompt, cache_response=False, **options)
+        valid = self._finish_batch(response_text, sections)
+        self._settle_cache(prompt, response_text, {} if len(valid) == len(sections) else {"sections": "incomplete"}, options)
+        return valid
+
+    async def rewrite_sections_batch_async(
+        self,
+        sections: List[Dict[str, Any]],
+        job_description: str,
+        target_keywords: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        prompt = self._batch_prompt(sections, self._compact_jd(job_description), target_keywords)
+        options = {"max_tokens": BATCH_MAX_TOKENS, "json_mode": JSON_MODE}
+        response_text = await self._call_gemini_async(prompt, cache_response=False, **options)
+        valid = self._finish_batch(response_text, sections)
+        await asyncio.to_thread(
+            self._settle_cache, prompt, response_text, {} if len(valid) == len(sections) else {"sections": "incomplete"}, options
+        )
+        return valid
+
+    def _batch_prompt(
+        self,
+        sections: List[Dict[str, Any]],
+        job_description: str,
+        target_keywords: List[str]
+    ) -> str:
+        payload_sections = []
+        for item in sections:
+            if item["kind"] == "experience":
+                entry = item["entry"]
+                payload_sections.append({
+                    "id": item["id"],
+                    "kind": "experience",
+                    "company": entry.get("company", "Unknown Company"),
+                    "title": entry.get("title", "Unknown Title"),
+                    "start": entry.get("start", ""),
+                    "end": entry.get("end", "Present"),
+                    "bullets": entry.get("bullets", []),
+                    "required_bullet_count": len(entry.get("bullets", []))
+                })
+            else:
+                payload_sections.append({"id": item["id"], "kind": item["kind"], "original": item.get("text", "")})
+
+        payload = {
+            "job_description_snippet": job_description[:1600],
+            "target_keywords": target_keywords[:10],
+            "sections": payload_sections
+        }
+        return f"{BATCH_REWRITE_PROMPT_HEADER}\n\nINPUT (JSON):\n{json.dumps(payload, indent=2)}\n\nPlease provide your response in valid JSON format."
+
+    def _finish_batch(self, response_text: str, sections: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        try:
+            parsed = self._parse_json_response(response_text)
+        except JSONRepairError as e:
+            logger.warning(f"Batched rewrite response is not JSON: {e}")
+            return {}
+        returned = parsed.get("sections")
+        if not isinstance(returned, dict):
+            logger.warning("Batched rewrite returned no sections object")
+            return {}
+
+        valid = {}
+        for item in sections:
+            result = returned.get(item["id"])
+            if not isinstance(result, dict):
+                logger.warning(f"Batched rewrite missing section {item['id']}")
+                continue
+            if item["kind"] == "experience":
+                bullets = result.get("bullets")
+                expected = len(item["entry"].get("bullets", []))
+                if not isinstance(bullets, list) or len(bullets) != expected or not all(isinstance(b, str) and b.strip() for b in bullets):
+                    logger.warning(f"Batched rewrite section {item['id']} failed validation (bullets)")
+                    continue
+            else:
+                content = result.get("content")
+                if not isinstance(content, str) or not content.strip():
+                    logger.warning(f"Batched rewrite section {item['id']} failed validation (content)")
+                    continue
+            result.setdefault("explanation", "Rewritten")
+            valid[item["id"]] = result
+        return valid
+
+    # -- Result handling ------------------------------------------------------
+
+    def _finish_experience(self, result: Dict[str, Any], problems: Dict[str, str], entry: Dict[str, Any]) -> Dict[str, Any]:
+        original = entry.get("bullets", [])
+        bullets = result.get("bullets")
+        if not isinstance(bullets, list) or not bullets:
+            # Nothing usable: keep the original bullets rather than guessing
+            return {
+                "bullets": original,
+                "explanation": f"Failed to parse AI response: {problems.get('bullets') or problems.get('', 'no bullets')}"
+            }
+
+        if "bullets" in problems:
+            logger.warning(f"Bullet validation failed after re-ask ({problems['bullets']}); padding from original")
+            # Keep usable rewritten bullets in place, original ones elsewhere, exact count
+            bullets = [
+                b if isinstance(b, str) and b.strip() else original[i]
+                for i, b in enumerate(bullets[:len(original)])
+            ]
+            bullets.extend(original[len(bullets):])
+        result["bullets"] = bullets
+        result.setdefault("explanation", "Rewritten")
+        return result
+
+    def _finish_content(self, result: Dict[str, Any], problems: Dict[str, str], original: str, label: str) -> Dict[str, Any]:
+        if "content" in problems or "" in problems:
+            logger.error(f"Unusable {label} response: {problems}")
+            return {
+                "content": original,
+                "explanation": f"Failed to parse AI response: {problems.get('content') or problems.get('')}"
+            }
+        result.setdefault("explanation", "Rewritten")
+        return result
+
+    def _finish_brutal_review(
+        self,
+        result: Dict[str, Any],
+        problems: Dict[str, str],
+        fields: List[str] = BRUTAL_REVIEW_FIELDS
+    ) -> Dict[str, Any]:
+        if not result:
+            raise ValueError(f"Unusable brutal review response: {problems}")
+
+        # Fill whatever is still missing or invalid after the re-ask
+        for field in fields:
+            if field not in result or field in problems and not isinstance(result[field], type(self._get_default_value(field))):
+                logger.warning(f"Missing field in brutal review response: {field}")
+                result[field] = self._get_default_value(field)
+
+        return result
+
+    def _brutal_review_fallback(self, original_resume_text: str, error: Exception) -> Dict[str, Any]:
+        return {
+            "plain_text": original_resume_text,
+            "marked_up_resume": original_resume_text,
+            "changes": [],
+            "company_expectations": {
+                "role_summary": "Unable to analyze",
+                "what_the_company_cares_about": [],
+                "ideal_candidate_snapshot": []
+            },
+            "harsh_review": {
+                "overall_verdict": "Unable to generate review due to error",
+                "strengths": [],
+                "weaknesses": [],
+                "missing_or_weak_skills": [],
+                "risk_flags": [],
+                "would_I_interview_you": "maybe",
+                "rationale": f"Error: {str(error)}",
+                "top_3_actions": []
+            }
+        }
+
+    def _get_default_value(self, field: str) -> Any:
+        """Get default value for missing field."""
+        defaults = {
+            "plain_text": "",
+            "marked_up_resume": "",
+            "changes": [],
+            "company_expectations": {
+                "role_summary": "",
+                "what_the_company_cares_about": [],
+                "ideal_candidate_snapshot": []
+            },
+            "harsh_review": {
+                "overall_verdict": "",
+                "strengths": [],
+                "weaknesses": [],
+                "missing_or_weak_skills": [],
+                "risk_flags": [],
+                "would_I_interview_you": "maybe",
+                "rationale": "",
+                "top_3_actions": []
+            }
+        }
+        return defaults.get(field, None)
+
+    def _parse_json_response(self, text: str) -> Dict[str, Any]:
+        """
+        Parse a JSON object from the model, repairing fences, trailing commas
+        and truncation.
+
+        Args:
+            text: Response text
+
+        Returns:
+            Parsed JSON dictionary
+
+        Raises:
+            JSONRepairError: no JSON object could be recovered
+        """
+        result = repair_json(text)
+        if not isinstance(result, dict):
+            raise JSONRepairError(f"Expected a JSON object, got {type(result).__name__}")
+        return result
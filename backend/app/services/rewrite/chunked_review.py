@@ -0,0 +1,260 @@
+"""
+Map-reduce brutal review for long resumes.
+
+A single brutal-review call has to echo the whole rewritten resume twice
+(plain and marked up) plus the review, so long resumes run into the output
+token limit, come back truncated and fail validation. In chunked mode the
+resume is split at its section headings into a few parts that are reviewed
+and rewritten in parallel (map), then one small call turns the per-part
+findings into the overall verdict and company expectations (reduce). Wall
+time follows the slowest part plus the merge instead of the total length.
+
+This module holds the splitting, prompts and assembly; the calls themselves
+are made by BaseLLMClient.rewrite_with_brutal_review(_async).
+"""
+
+import os
+import json
+import re
+import math
+import logging
+from typing import Dict, Any, List, Optional
+
+from app.services.ingestion.layout_schema_extractor import LayoutSchemaExtractor
+
+logger = logging.getLogger(__name__)
+
+# auto: chunk resumes longer than BRUTAL_CHUNK_THRESHOLD_CHARS | single | chunked
+BRUTAL_REVIEW_MODE = os.getenv("BRUTAL_REVIEW_MODE", "auto").lower()
+BRUTAL_CHUNK_THRESHOLD_CHARS = int(os.getenv("BRUTAL_CHUNK_THRESHOLD_CHARS", "5000"))
+BRUTAL_CHUNK_MAX_CHARS = int(os.getenv("BRUTAL_CHUNK_MAX_CHARS", "2500"))
+BRUTAL_MAX_CHUNKS = int(os.getenv("BRUTAL_MAX_CHUNKS", "6"))
+BRUTAL_MERGE_MAX_TOKENS = int(os.getenv("BRUTAL_MERGE_MAX_TOKENS", "2048"))
+
+# Findings passed to the merge call per list, across all parts
+_MAX_FINDINGS = 12
+
+_SECTION_PATTERNS = LayoutSchemaExtractor().section_patterns
+
+CHUNK_REVIEW_PROMPT_HEADER = """You are an expert hiring manager and ATS specialist reviewing ONE PART of a candidate's resume for a specific role. Other parts are reviewed separately; the outline below shows where this part fits.
+
+Rewrite this part to better match the job description WITHOUT inventing fake experience, companies or tools, and note what it shows about the candidate.
+- Keep this part's format: same headings, order, bullet style, date formats and line structure.
+- Rewrite only this part. Do not add sections or content from other parts.
+- Be direct and blunt about weaknesses, but never insulting.
+
+RESPONSE FORMAT (JSON):
+{
+  "plain_text": "This part rewritten, without tags, in the original format",
+  "marked_up_resume": "This part with <ADD>, <DEL>, <REWRITE> tags showing changes",
+  "changes": [{"type": "add|remove|rewrite", "content": "Text changed", "reason": "Why", "signal_to_company": "What this signals"}],
+  "strengths": ["Specific strength shown in this part"],
+  "weaknesses": ["Specific weakness in this part"],
+  "missing_or_weak_skills": [{"skill": "Skill", "why_it_matters": "Business impact", "how_to_build_it": "Specific courses, projects, certifications"}],
+  "risk_flags": ["Red flag a hiring manager would notice"]
+}
+Return ONLY the JSON."""
+
+MERGE_REVIEW_PROMPT_HEADER = """You are an expert hiring manager. Each part of a candidate's resume has already been reviewed separately; the findings are below. Combine them into one brutally honest overall review for the role.
+- Deduplicate and rank: keep the findings that matter most for this job.
+- "top_3_actions" must be SPECIFIC: exact courses with platform names, concrete project ideas, certifications, communities, and time estimates.
+- Never invent experience the findings do not mention.
+
+RESPONSE FORMAT (JSON):
+{
+  "company_expectations": {
+    "role_summary": "1 sentence summary of what they really want",
+    "what_the_company_cares_about": ["value 1", "value 2"],
+    "ideal_candidate_snapshot": ["trait 1", "trait 2"]
+  },
+  "harsh_review": {
+    "overall_verdict": "Brutal 1-sentence summary",
+    "strengths": ["strength 1"],
+    "weaknesses": ["weakness 1"],
+    "missing_or_weak_skills": [{"skill": "Skill", "why_it_matters": "...", "how_to_build_it": "...", "success_story": "..."}],
+    "risk_flags": ["flag 1"],
+    "would_I_interview_you": "yes|no|maybe",
+    "rationale": "Why yes/no/maybe",
+    "top_3_actions": [{"action": "...", "how_to_do_it": "...", "resources": ["..."], "time_estimate": "...", "what_helped_others": "..."}]
+  }
+}
+Return ONLY the JSON."""
+
+
+def should_chunk(resume_text: str) -> bool:
+    if BRUTAL_REVIEW_MODE == "single":
+        return False
+    if BRUTAL_REVIEW_MODE == "chunked":
+        return True
+    return len(resume_text or "") > BRUTAL_CHUNK_THRESHOLD_CHARS
+
+
+def _is_heading(line: str) -> bool:
+    """Same heuristic as LayoutSchemaExtractor: a short upper/title-case line naming a section."""
+    if len(line) >= 50 or not (line.isupper() or line.istitle()):
+        return False
+    lower = line.lower()
+    return any(re.search(pattern, lower) for pattern in _SECTION_PATTERNS.values())
+
+
+def _split_long(block: str, max_chars: int) -> List[str]:
+    """Split an oversized section at blank lines (entry boundaries), else at line boundaries."""
+    pieces, current = [], ""
+    units = block.split("\n\n") if "\n\n" in block else block.split("\n")
+    joiner = "\n\n" if "\n\n" in block else "\n"
+    for unit in units:
+        if current and len(current) + len(joiner) + len(unit) > max_chars:
+            pieces.append(current)
+            current = unit
+        else:
+            current = f"{current}{joiner}{unit}" if current else unit
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_resume(text: str, max_chars: int = BRUTAL_CHUNK_MAX_CHARS, max_chunks: int = BRUTAL_MAX_CHUNKS) -> List[str]:
+    """
+    Split resume text into at most max_chunks parts at section headings.
+
+    Adjacent sections are packed together up to max_chars; the header block
+    before the first heading stays with the first section. The parts
+    concatenate (joined by blank lines) back to the original content.
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+    # Never more parts than allowed: widen the budget instead
+    max_chars = max(max_chars, math.ceil(len(text) / max_chunks))
+
+    sections, current = [], []
+    for line in text.split("\n"):
+        if _is_heading(line.strip()) and any(l.strip() for l in current):
+            sections.append("\n".join(current).strip("\n"))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("\n".join(current).strip("\n"))
+    # Contact/header block is too small to review on its own
+    if len(sections) > 1 and len(sections[0]) < 300:
+        sections[1] = f"{sections[0]}\n\n{sections[1]}"
+        sections.pop(0)
+
+    chunks: List[str] = []
+    for section in sections:
+        for piece in _split_long(section, max_chars) if len(section) > max_chars else [section]:
+            if chunks and len(chunks[-1]) + 2 + len(piece) <= max_chars:
+                chunks[-1] = f"{chunks[-1]}\n\n{piece}"
+            else:
+                chunks.append(piece)
+
+    while len(chunks) > max_chunks:
+        # Merge the smallest adjacent pair
+        i = min(range(len(chunks) - 1), key=lambda k: len(chunks[k]) + len(chunks[k + 1]))
+        chunks[i:i + 2] = [f"{chunks[i]}\n\n{chunks[i + 1]}"]
+    return chunks
+
+
+def resume_outline(chunks: List[str]) -> List[str]:
+    """First line of each part, so every part knows where it sits."""
+    return [chunk.strip().split("\n")[0][:80] for chunk in chunks]
+
+
+def chunk_prompt(chunk: str, index: int, outline: List[str], job_description: str) -> str:
+    outline_text = "\n".join(
+        f"{i + 1}. {line}{'   <- THIS PART' if i == index else ''}" for i, line in enumerate(outline)
+    )
+    return (
+        f"{CHUNK_REVIEW_PROMPT_HEADER}\n\n"
+        f"JOB DESCRIPTION:\n{job_description}\n\n"
+        f"RESUME OUTLINE:\n{outline_text}\n\n"
+        f"RESUME PART ({index + 1} of {len(outline)}):\n{chunk}\nEND OF PART"
+    )
+
+
+def chunk_max_tokens(chunk: str) -> int:
+    """Room for the part twice (plain + marked up, ~4 chars/token, some growth) plus the findings."""
+    return min(4096, max(1024, int(len(chunk) / 4 * 2.5) + 768))
+
+
+def _take(results: List[Dict[str, Any]], field: str) -> List[Any]:
+    items, seen = [], set()
+    for result in results:
+        for item in result.get(field) or []:
+            key = json.dumps(item, sort_keys=True).lower()
+            if key not in seen:
+                seen.add(key)
+                items.append(item)
+    return items[:_MAX_FINDINGS]
+
+
+def merge_prompt(chunk_results: List[Optional[Dict[str, Any]]], outline: List[str], job_description: str) -> str:
+    reviewed = [r for r in chunk_results if r]
+    findings = {
+        "resume_outline": outline,
+        "parts_reviewed": f"{len(reviewed)} of {len(outline)}",
+        "strengths": _take(reviewed, "strengths"),
+        "weaknesses": _take(reviewed, "weaknesses"),
+        "missing_or_weak_skills": _take(reviewed, "missing_or_weak_skills"),
+        "risk_flags": _take(reviewed, "risk_flags"),
+        "changes_made": sum(len(r.get("changes") or []) for r in reviewed)
+    }
+    return (
+        f"{MERGE_REVIEW_PROMPT_HEADER}\n\n"
+        f"JOB DESCRIPTION:\n{job_description}\n\n"
+        f"SECTION FINDINGS (JSON):\n{json.dumps(findings, indent=2)}"
+    )
+
+
+def assemble(
+    chunks: List[str],
+    chunk_results: List[Optional[Dict[str, Any]]],
+    merged: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Brutal-review result in the single-call shape.
+
+    Parts whose call failed keep their original text. Without a usable merge
+    the harsh review is built from the per-part findings.
+    """
+    plain, marked, changes = [], [], []
+    for chunk, result in zip(chunks, chunk_results):
+        if result:
+            plain.append(result.get("plain_text") or chunk)
+            marked.append(result.get("marked_up_resume") or chunk)
+            changes.extend(result.get("changes") or [])
+        else:
+            plain.append(chunk)
+            marked.append(chunk)
+
+    reviewed = [r for r in chunk_results if r]
+    aggregated = {
+        "strengths": _take(reviewed, "strengths"),
+        "weaknesses": _take(reviewed, "weaknesses"),
+        "missing_or_weak_skills": _take(reviewed, "missing_or_weak_skills"),
+        "risk_flags": _take(reviewed, "risk_flags")
+    }
+    merged = merged or {}
+    harsh_review = merged.get("harsh_review") or {
+        "overall_verdict": "",
+        "would_I_interview_you": "maybe",
+        "rationale": "",
+        "top_3_actions": []
+    }
+    for field, items in aggregated.items():
+        if not harsh_review.get(field):
+            harsh_review[field] = items
+
+    return {
+        "plain_text": "\n\n".join(plain),
+        "marked_up_resume": "\n\n".join(marked),
+        "changes": changes,
+        "company_expectations": merged.get("company_expectations") or {
+            "role_summary": "",
+            "what_the_company_cares_about": [],
+            "ideal_candidate_snapshot": []
+        },
+        "harsh_review": harsh_review,
+        "review_mode": "chunked",
+        "chunks": {"total": len(chunks), "reviewed": len(reviewed)}
+    }
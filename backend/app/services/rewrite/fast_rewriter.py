@@ -0,0 +1,422 @@
+"""
+Fast Rewriter
+Deterministic, local resume rewrite: no LLM call, finishes in milliseconds.
+
+Covers the fixes that do not need a language model:
+- Skills: merges JD keywords the resume can back up (mentioned elsewhere in
+  the resume, or implied by a listed tool, e.g. SQL by PostgreSQL) into
+  grouped, standard categories; never adds skills without evidence (and
+  names like Go, R or Swift only count when used as skills).
+- Experience: normalises bullet markers/whitespace and dates ("Jan 2020").
+- Headings: standard ATS section names (see
+  ResumeRewriter.generate_optimization_prompt).
+
+Results come back in the same shape as ResumeRewriter, so the pipeline,
+streaming and delta report work unchanged; the LLM rewrite stays available
+as the opt-in upgrade (mode="llm").
+"""
+
+import re
+import time
+import logging
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+from app.core.metrics import metrics
+from app.services.ml.relevance_engine import GAZETTEER_KEYWORDS
+from app.services.rewrite.rewriter import ResumeRewriter
+
+logger = logging.getLogger(__name__)
+
+# Standard category headers, in output order
+SKILL_CATEGORIES = {
+    "Languages": [
+        "Python", "Java", "JavaScript", "TypeScript", "Go", "Rust", "Swift", "Kotlin", "C++", "C#",
+        "C", "Ruby", "PHP", "Scala", "R", "SQL", "HTML", "CSS", "SASS", "Bash"
+    ],
+    "Frameworks & Libraries": [
+        "React", "Angular", "Vue", "Node.js", "Express", "Next.js", "Django", "Flask", "FastAPI",
+        "Spring Boot", ".NET", "Flutter", "React Native", "GraphQL"
+    ],
+    "Data & ML": [
+        "Machine Learning", "Deep Learning", "NLP", "TensorFlow", "PyTorch", "Pandas", "NumPy",
+        "Scikit-learn", "Data Analysis", "Tableau", "Power BI", "Hadoop", "Spark", "Kafka"
+    ],
+    "Databases": ["PostgreSQL", "MySQL", "SQLite", "MongoDB", "Redis", "DynamoDB", "Elasticsearch"],
+    "Cloud & DevOps": [
+        "AWS", "Azure", "GCP", "Docker", "Kubernetes", "Terraform", "Jenkins", "GitHub Actions",
+        "CI/CD", "Linux", "DevOps", "Microservices"
+    ],
+    "Tools & Practices": ["Git", "Jira", "REST API", "Agile", "Scrum", "Cybersecurity", "Blockchain", "IoT"],
+}
+OTHER_CATEGORY = "Other"
+
+# Lowercase spellings -> canonical skill
+SKILL_ALIASES = {
+    "js": "JavaScript", "es6": "JavaScript", "ts": "TypeScript", "golang": "Go", "py": "Python",
+    "python3": "Python", "c plus plus": "C++", "cpp": "C++", "csharp": "C#", "shell": "Bash",
+    "reactjs": "React", "react.js": "React", "vuejs": "Vue", "vue.js": "Vue", "angularjs": "Angular",
+    "node": "Node.js", "nodejs": "Node.js", "express.js": "Express", "nextjs": "Next.js",
+    "spring": "Spring Boot", "dotnet": ".NET", "asp.net": ".NET",
+    "ml": "Machine Learning", "dl": "Deep Learning", "natural language processing": "NLP",
+    "sklearn": "Scikit-learn", "scikit learn": "Scikit-learn", "powerbi": "Power BI",
+    "apache spark": "Spark", "pyspark": "Spark", "apache kafka": "Kafka",
+    "postgres": "PostgreSQL", "psql": "PostgreSQL", "mongo": "MongoDB", "elastic": "Elasticsearch",
+    "amazon web services": "AWS", "google cloud": "GCP", "google cloud platform": "GCP",
+    "microsoft azure": "Azure", "k8s": "Kubernetes", "ci cd": "CI/CD", "ci-cd": "CI/CD", "cicd": "CI/CD",
+    "rest": "REST API", "restful": "REST API", "rest apis": "REST API", "restful api": "REST API",
+    "restful apis": "REST API", "github": "Git", "gitlab": "Git",
+}
+
+# Skill -> skills whose presence backs it up (a PostgreSQL user knows SQL)
+IMPLIED_BY = {
+    "SQL": ["PostgreSQL", "MySQL", "SQLite"],
+    "JavaScript": ["TypeScript", "React", "Angular", "Vue", "Node.js", "Express", "Next.js"],
+    "Python": ["Django", "Flask", "FastAPI", "Pandas", "NumPy", "PyTorch", "TensorFlow", "Scikit-learn"],
+    "HTML": ["React", "Angular", "Vue"],
+    "CSS": ["SASS"],
+    "Node.js": ["Express", "Next.js"],
+    "Machine Learning": ["TensorFlow", "PyTorch", "Scikit-learn", "Deep Learning"],
+    "Deep Learning": ["TensorFlow", "PyTorch"],
+    "Data Analysis": ["Pandas", "Tableau", "Power BI"],
+    "REST API": ["FastAPI", "Flask", "Django", "Express", "Spring Boot"],
+    "Docker": ["Kubernetes"],
+    "CI/CD": ["Jenkins", "GitHub Actions"],
+    "DevOps": ["Docker", "Kubernetes", "Terraform", "Jenkins", "CI/CD"],
+    "Agile": ["Scrum"],
+}
+
+# Standard ATS section headings
+STANDARD_HEADINGS = {
+    "SUMMARY": "SUMMARY",
+    "EXPERIENCE": "WORK EXPERIENCE",
+    "EDUCATION": "EDUCATION",
+    "SKILLS": "SKILLS",
+    "PROJECTS": "PROJECTS",
+    "CERTIFICATIONS": "CERTIFICATIONS",
+}
+
+# Skill names that are also everyday words or letters ("go-to-market", "R&D",
+# "grade C", "Swift turnaround", "Rest of the day"): only the skill's own
+# spelling counts, and only as a list item, an acronym or next to a tech cue
+AMBIGUOUS_FORMS = {
+    "go": "Go", "r": "R", "c": "C", "swift": "Swift", "spark": "Spark", "express": "Express",
+    "react": "React", "rust": "Rust", "ruby": "Ruby", "flask": "Flask", "flutter": "Flutter",
+    "rest": "REST", "node": "Node", "spring": "Spring", "shell": "Shell", "elastic": "Elastic",
+}
+_CUES_BEFORE = {"in", "using", "with", "via"}
+_CUES_AFTER = {
+    "programming", "language", "code", "developer", "developers", "engineer", "engineering", "skills",
+    "experience", "services", "microservices", "api", "apis", "app", "apps", "application",
+    "applications", "sdk", "framework", "library", "libraries", "scripts", "scripting", "jobs",
+    "cluster", "clusters", "streaming", "stack", "backend", "frontend", "components", "ecosystem",
+}
+_ITEM_SEPARATORS = r"[,;|/()\n•·◦▪:]|\s(?:and|or|&)\s"
+
+_CATEGORY_OF = {skill: category for category, skills in SKILL_CATEGORIES.items() for skill in skills}
+_CANONICAL = {skill.lower(): skill for skill in list(_CATEGORY_OF) + sorted(GAZETTEER_KEYWORDS)}
+_CANONICAL.update(SKILL_ALIASES)
+_SURFACE_FORMS: Dict[str, List[str]] = {}
+for _form, _skill in _CANONICAL.items():
+    _SURFACE_FORMS.setdefault(_skill, []).append(_form)
+
+BULLET_MARKERS = "•-*○▪►–—·◦"
+_MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+_MONTH_NAMES = {m.lower(): m for m in _MONTHS}
+_MONTH_NAMES.update({
+    "january": "Jan", "february": "Feb", "march": "Mar", "april": "Apr", "june": "Jun",
+    "july": "Jul", "august": "Aug", "sept": "Sep", "september": "Sep", "october": "Oct",
+    "november": "Nov", "december": "Dec"
+})
+_PRESENT = {"present", "current", "now", "today", "till date", "to date", "ongoing"}
+
+
+def _term_pattern(term: str) -> re.Pattern:
+    # Word boundaries that also respect C++, C#, .NET and Node.js
+    return re.compile(r"(?<![\w+#.])" + re.escape(term) + r"(?![\w+#]|\.\w)")
+
+
+_PATTERNS = {form: _term_pattern(form) for form in _CANONICAL if form not in AMBIGUOUS_FORMS}
+# Case-sensitive; not glued to "&", "-" or "/" ("R&D", "Go-to-market")
+_AMBIGUOUS_PATTERNS = {
+    form: re.compile(r"(?<![\w+#.&/-])" + re.escape(spelling) + r"(?![\w+#&]|[.'/-]\w)")
+    for form, spelling in AMBIGUOUS_FORMS.items()
+}
+
+
+def _used_as_skill(text: str, start: int, end: int) -> bool:
+    word = text[start:end]
+    if len(word) > 1 and word.isupper():
+        return True
+    before = re.split(_ITEM_SEPARATORS, text[:start])[-1].strip()
+    after = re.split(_ITEM_SEPARATORS, text[end:])[0].strip().rstrip(".")
+    if not before and not after:
+        return True
+    previous = re.search(r"(\w+)\s+$", text[:start])
+    following = re.match(r"\s+(\w+)", text[end:])
+    return bool(previous and previous.group(1).lower() in _CUES_BEFORE
+                or following and following.group(1).lower() in _CUES_AFTER)
+
+
+def _search(text: str, text_lower: str, form: str) -> Optional[int]:
+    """Position of the first mention of a surface form, or None."""
+    if form in _AMBIGUOUS_PATTERNS:
+        for match in _AMBIGUOUS_PATTERNS[form].finditer(text):
+            if _used_as_skill(text, match.start(), match.end()):
+                return match.start()
+        return None
+    match = _PATTERNS[form].search(text_lower)
+    return match.start() if match else None
+
+
+def canonical_skill(text: str) -> Optional[str]:
+    """Canonical name of a known skill, or None."""
+    return _CANONICAL.get(re.sub(r"\s+", " ", text.strip().lower()))
+
+
+def find_skills(text: str) -> List[str]:
+    """Known skills mentioned anywhere in text, in first-seen order."""
+    text = text or ""
+    lower = text.lower()
+    found = [(position, _CANONICAL[form]) for form in _CANONICAL
+             for position in [_search(text, lower, form)] if position is not None]
+    return list(dict.fromkeys(skill for _, skill in sorted(found)))
+
+
+def mentions(text: str, skill: str) -> bool:
+    lower = text.lower()
+    return any(_search(text, lower, form) is not None for form in _SURFACE_FORMS.get(skill, []))
+
+
+def normalize_date(value: str) -> str:
+    """'January 2020', '01/2020', '2020-01' -> 'Jan 2020'; 'current' -> 'Present'."""
+    text = (value or "").strip()
+    lower = text.lower().rstrip(".")
+    if not text:
+        return text
+    if lower in _PRESENT:
+        return "Present"
+    match = re.fullmatch(r"([a-z]+)\.?,?\s*'?(\d{4}|\d{2})", lower)
+    if match and match.group(1) in _MONTH_NAMES:
+        year = match.group(2)
+        return f"{_MONTH_NAMES[match.group(1)]} {year if len(year) == 4 else '20' + year}"
+    match = re.fullmatch(r"(\d{1,2})[/.-](\d{4})", lower) or re.fullmatch(r"(\d{4})[/.-](\d{1,2})", lower)
+    if match:
+        first, second = match.groups()
+        month, year = (int(first), second) if len(second) == 4 else (int(second), first)
+        if 1 <= month <= 12:
+            return f"{_MONTHS[month - 1]} {year}"
+    return text
+
+
+def normalize_bullet(text: str) -> str:
+    """Strip markers/numbering and stray whitespace, capitalise the first letter."""
+    text = re.sub(r"\s+", " ", (text or "")).strip()
+    text = re.sub(r"^(?:[" + re.escape(BULLET_MARKERS) + r"]+|\d+[.)])\s*", "", text).strip()
+    text = text.rstrip(";,").strip()
+    return text[:1].upper() + text[1:] if text else text
+
+
+def _split_items(line: str) -> List[str]:
+    """Comma/semicolon/pipe/bullet separated items; parentheses become items of their own."""
+    line = re.sub(r"[()]", ",", line)
+    items = (item.strip().rstrip(".").strip() for item in re.split(r"[,;|•·◦▪]|\s+[-–—/]\s+", line))
+    return [item for item in items if item]
+
+
+def parse_skills(skills_text: str) -> List[str]:
+    """Skill items of a free-form skills section, category labels removed."""
+    items: List[str] = []
+    for line in (skills_text or "").split("\n"):
+        line = line.strip().lstrip(BULLET_MARKERS).strip()
+        if not line:
+            continue
+        # "Languages: a, b | Tools: c" -> drop the category labels
+        line = re.sub(r"(^|[|;])\s*[\w&/+#. -]{1,40}:(?!//)", r"\1", line)
+        for item in _split_items(line):
+            if len(item.split()) > 4:
+                # Prose ("Proficient in Python and SQL ..."): keep the skills it names
+                items.extend(find_skills(item))
+            else:
+                items.append(item)
+    return items
+
+
+class FastRewriter(ResumeRewriter):
+    """ResumeRewriter without an AI client: every section is rewritten locally."""
+
+    def __init__(self):
+        self.ai_client = None
+        self.has_gemini = False
+        self._jd_vocabulary: Dict[str, List[str]] = {}
+
+    def rewrite_skills(
+        self,
+        skills_text: str,
+        job_description: str,
+        target_keywords: List[str],
+        evidence_text: str = ""
+    ) -> Dict[str, Any]:
+        """
+        Grouped, keyword-merged skills section.
+
+        Args:
+            skills_text: Original skills section
+            job_description: Target job description (its known skills are candidates too)
+            target_keywords: Missing keywords, e.g. from VisibilityRanker
+            evidence_text: The rest of the resume; candidates must appear in it
+                (or be implied by a listed skill) to be added
+
+        Returns:
+            {"content", "explanation", "added", "unsupported"}
+        """
+        existing: List[str] = []
+        seen = set()
+        for item in parse_skills(skills_text):
+            skill = canonical_skill(item) or item
+            if skill.lower() not in seen:
+                seen.add(skill.lower())
+                existing.append(skill)
+
+        have = set(existing) | set(find_skills(evidence_text))
+        candidates = [canonical_skill(k) for k in target_keywords or []] + self._jd_skills(job_description)
+        added, unsupported = [], []
+        for skill in dict.fromkeys(c for c in candidates if c):
+            if skill.lower() in seen:
+                continue
+            backers = [s for s in IMPLIED_BY.get(skill, []) if s in have]
+            if mentions(evidence_text or "", skill) or backers:
+                added.append(skill)
+                seen.add(skill.lower())
+            else:
+                unsupported.append(skill)
+
+        grouped: Dict[str, List[str]] = {category: [] for category in list(SKILL_CATEGORIES) + [OTHER_CATEGORY]}
+        for skill in existing + added:
+            grouped[_CATEGORY_OF.get(skill, OTHER_CATEGORY)].append(skill)
+        content = "\n".join(f"{category}: {', '.join(skills)}" for category, skills in grouped.items() if skills)
+
+        explanation = [f"✓ Grouped {len(existing) + len(added)} skills into standard categories"]
+        if added:
+            explanation.append(f"✓ Added {', '.join(added[:6])} (backed by your experience)")
+        if unsupported:
+            explanation.append(f"✓ Not added, no evidence: {', '.join(unsupported[:4])}")
+        return {
+            "content": content or (skills_text or "").strip(),
+            "explanation": "\n".join(explanation),
+            "added": added,
+            "unsupported": unsupported
+        }
+
+    def _jd_skills(self, job_description: str) -> List[str]:
+        """Known skills the JD asks for (cached: every section of a request shares the JD)."""
+        key = job_description or ""
+        if key not in self._jd_vocabulary:
+            if len(self._jd_vocabulary) > 64:
+                self._jd_vocabulary.clear()
+            self._jd_vocabulary[key] = find_skills(key)
+        return self._jd_vocabulary[key]
+
+    def rewrite_experience_entry(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalised bullets and dates for one experience entry."""
+        # One output bullet per input bullet, so bullet counts stay comparable
+        bullets = [normalize_bullet(b) if isinstance(b, str) else b for b in entry.get("bullets", [])]
+        changed = sum(1 for old, new in zip(entry.get("bullets", []), bullets) if old != new)
+        result = {
+            "bullets": bullets,
+            "explanation": f"✓ Normalised {changed} bullet(s) and dates" if changed else "✓ Dates normalised"
+        }
+        for key in ("start", "end"):
+            if isinstance(entry.get(key), str):
+                result[key] = normalize_date(entry[key])
+        return result
+
+    def rewrite_summary(self, summary_text: str) -> Dict[str, Any]:
+        content = re.sub(r"[ \t]+", " ", re.sub(r"\s*\n\s*", " ", summary_text or "")).strip()
+        return {"content": content, "explanation": "✓ Whitespace tidied (use the AI rewrite to rephrase)"}
+
+    @staticmethod
+    def evidence_text(layout_schema: Dict[str, Any]) -> str:
+        """Everything in the resume except its skills section."""
+        parts = []
+        for section in layout_schema.get("sections", []):
+            if section.get("type") == "SKILLS":
+                continue
+            for entry in section.get("entries", []):
+                parts.extend(str(v) for k, v in entry.items() if isinstance(v, str))
+                parts.extend(str(b) for b in entry.get("bullets", []) + entry.get("details", []))
+            if isinstance(section.get("raw"), str):
+                parts.append(section["raw"])
+        return "\n".join(parts)
+
+    def rewrite_full_resume(
+        self,
+        layout_schema: Dict[str, Any],
+        job_description: str,
+        target_keywords: List[str]
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        evidence = self.evidence_text(layout_schema)
+        results: Dict[Tuple[int, Optional[int]], Any] = {}
+        for idx, section in enumerate(layout_schema.get("sections", [])):
+            section_type = section.get("type")
+            if section_type == "EXPERIENCE":
+                for entry_idx, entry in enumerate(section.get("entries", [])):
+                    results[(idx, entry_idx)] = self.rewrite_experience_entry(entry)
+            elif section_type == "SUMMARY":
+                results[(idx, None)] = self.rewrite_summary(section.get("raw", ""))
+            elif section_type == "SKILLS":
+                results[(idx, None)] = self.rewrite_skills(
+                    section.get("raw", ""), job_description, target_keywords, evidence
+                )
+
+        rewritten_schema, explanations, changes = self._assemble_rewrite(layout_schema, results)
+        # Dates and headings are not covered by _assemble_rewrite
+        for idx, section in enumerate(rewritten_schema["sections"]):
+            section = rewritten_schema["sections"][idx] = dict(section)
+            if section.get("type") in STANDARD_HEADINGS:
+                section["heading"] = STANDARD_HEADINGS[section["type"]]
+            if section.get("type") == "EXPERIENCE":
+                section["entries"] = [
+                    {**entry, **{k: v for k, v in results[(idx, i)].items() if k in ("start", "end")}}
+                    for i, entry in enumerate(section.get("entries", []))
+                ]
+
+        delta_report = self._generate_delta_report(layout_schema, rewritten_schema, changes, target_keywords)
+        delta_report["rewrite_mode"] = "fast"
+        elapsed = time.perf_counter() - started
+        metrics.observe("fast_rewrite_seconds", elapsed)
+        logger.info(f"Fast rewrite finished in {elapsed * 1000:.1f} ms ({len(changes)} changes)")
+        return {
+            "rewritten_schema": rewritten_schema,
+            "explanations": explanations,
+            "delta_report": delta_report,
+            "_results": results
+        }
+
+    async def rewrite_full_resume_async(
+        self,
+        layout_schema: Dict[str, Any],
+        job_description: str,
+        target_keywords: List[str],
+        concurrency: Optional[int] = None,
+        call_timeout: Optional[float] = None,
+        on_section: Optional[Callable[[Tuple[int, Optional[int]], Any], None]] = None,
+        _blocking_client: bool = False
+    ) -> Dict[str, Any]:
+        """Same contract as ResumeRewriter.rewrite_full_resume_async; runs inline (milliseconds)."""
+        result = self.rewrite_full_resume(layout_schema, job_description, target_keywords)
+        results = result.pop("_results")
+        if on_section:
+            for key, section_result in results.items():
+                on_section(key, section_result)
+        return result
+
+
+_fast_rewriter = None
+
+
+def get_fast_rewriter() -> FastRewriter:
+    global _fast_rewriter
+    if _fast_rewriter is None:
+        _fast_rewriter = FastRewriter()
+    return _fast_rewriter
@@ -5,7 +5,10 @@ import os
 import json
 import time
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+from app.core.rate_limiter import get_rate_limiter
+from .base_client import BaseLLMClient
 
 logger = logging.getLogger(__name__)
 
@@ -75,7 +78,101 @@ RESPONSE FORMAT (JSON):
 """
 
 
-class GeminiClient:
+BRUTAL_REVIEW_PROMPT_HEADER = """You are an expert hiring manager and ATS specialist reviewing resumes for a specific role.
+
+You have two jobs:
+1) Rewrite the candidate's resume to better match the job description WITHOUT inventing fake experience.
+2) Give a brutally honest, hiring-manager style review of how well this candidate fits the role.
+
+Personality:
+- Direct, blunt, and time-constrained, like a senior hiring manager.
+- You don't sugar-coat weak points.
+- You never insult the candidate, but you clearly call out weaknesses, missing skills, and risk flags.
+- You respect truthfulness: never add experience, companies, or tools that were not clearly implied in the original resume.
+
+CRITICAL INSTRUCTIONS:
+
+1. FORMAT PRESERVATION:
+   - MAINTAIN the exact same resume format, structure, and layout as the original
+   - Keep the same section order, headings, and visual structure
+   - Only modify the CONTENT, not the FORMAT
+   - Preserve bullet point styles, date formats, and spacing
+
+2. ACTIONABLE GUIDANCE:
+   - For "missing_or_weak_skills", provide SPECIFIC, ACTIONABLE advice
+   - Include exact course names, platforms (Coursera, Udemy, LinkedIn Learning, etc.)
+   - Mention specific certifications that would help
+   - Reference real-world examples and success stories
+   - Provide concrete project ideas they can build
+
+3. TOP 3 ACTIONS - MAKE THEM PERFECT GUIDES:
+   - Don't just say "Take courses on X" - specify WHICH courses (with platform names)
+   - Don't just say "Build projects" - suggest SPECIFIC project ideas
+   - Include time estimates (e.g., "Complete the 4-week Google Data Analytics Certificate")
+   - Mention communities, forums, or resources to join
+   - Reference what has worked for others in similar situations
+
+Generate the brutal review and rewrite in this JSON format:
+{
+  "plain_text": "Full rewritten resume text WITHOUT tags, MAINTAINING THE EXACT SAME FORMAT as the original",
+  "marked_up_resume": "Full text with <ADD>, <DEL>, <REWRITE> tags showing changes",
+  "changes": [
+    {
+      "type": "add|remove|rewrite",
+      "content": "Text changed",
+      "reason": "Why you changed it",
+      "signal_to_company": "What this change signals to the hiring manager"
+    }
+  ],
+  "company_expectations": {
+    "role_summary": "1 sentence summary of what they really want",
+    "what_the_company_cares_about": ["value 1", "value 2"],
+    "ideal_candidate_snapshot": ["trait 1", "trait 2"]
+  },
+  "harsh_review": {
+    "overall_verdict": "Brutal 1-sentence summary",
+    "strengths": ["strength 1", "strength 2"],
+    "weaknesses": ["weakness 1", "weakness 2"],
+    "missing_or_weak_skills": [
+      {
+        "skill": "Skill Name",
+        "why_it_matters": "Explain business impact and why this role needs it",
+        "how_to_build_it": "SPECIFIC steps: 'Complete [Course Name] on [Platform] (X weeks, $Y). Build [Specific Project Idea]. Join [Community/Forum]. Get certified in [Certification Name].'",
+        "success_story": "Example: 'Many candidates improved this by doing X, which led to Y'"
+      }
+    ],
+    "risk_flags": ["flag 1", "flag 2"],
+    "would_I_interview_you": "yes|no|maybe",
+    "rationale": "Why yes/no/maybe",
+    "top_3_actions": [
+      {
+        "action": "Specific, actionable step",
+        "how_to_do_it": "DETAILED guide: exact courses (with platform), specific projects to build, certifications to get, communities to join, time commitment",
+        "resources": ["Specific resource 1 with platform/link", "Specific resource 2", "Specific resource 3"],
+        "time_estimate": "e.g., '4-6 weeks' or '2-3 months'",
+        "what_helped_others": "Real example of how this helped someone transition or improve"
+      }
+    ]
+  }
+}
+
+EXAMPLES OF GOOD vs BAD GUIDANCE:
+
+❌ BAD: "Take courses on business analytics"
+✅ GOOD: "Complete 'Google Data Analytics Professional Certificate' on Coursera (6 months, $39/mo). Also take 'Business Analytics Specialization' by Wharton on Coursera. Build a portfolio project analyzing real business data (e.g., retail sales trends, customer churn analysis)."
+
+❌ BAD: "Pursue internships focused on business analysis"
+✅ GOOD: "Apply for Business Analyst internships at companies like Deloitte, PwC, or tech startups. Use platforms like LinkedIn, Handshake, and WayUp. Tailor your resume to highlight any data analysis, Excel modeling, or stakeholder communication experience. Many candidates successfully transitioned by starting with 3-month contract roles."
+
+❌ BAD: "Engage in projects that require business insights"
+✅ GOOD: "Build 3 portfolio projects: (1) Customer segmentation analysis using Python/Excel, (2) Sales forecasting dashboard in Tableau/Power BI, (3) A/B test analysis for a hypothetical product feature. Share on GitHub and LinkedIn. Join r/BusinessAnalysis and Kaggle competitions."
+
+Return ONLY the JSON. No markdown, no code blocks, no extra text."""
+
+
+class GeminiClient(BaseLLMClient):
+    provider_name = "Gemini"
+
     def __init__(self):
         """Initialize Gemini client configuration."""
         self.api_key = os.getenv("GEMINI_API_KEY")
@@ -131,407 +228,159 @@ class GeminiClient:
         logger.info(f"Initialized Gemini client with model: {self.model_name}, temperature: {self.temperature}")
         return self.model
     
-    def rewrite_experience_entry(
+    def _experience_prompt(
         self,
         entry: Dict[str, Any],
         job_description: str,
         target_keywords: List[str]
-    ) -> Dict[str, Any]:
-        """
-        Rewrite a single experience entry.
-        
-        Args:
-            entry: Experience entry with company, title, dates, bullets
-            job_description: Target job description
-            target_keywords: Keywords to integrate
-            
-        Returns:
-            Dictionary with rewritten bullets and explanation
-        """
+    ) -> str:
         # Build input JSON
+        # Request-wide fields first: every section of one request then shares the cached prefix
         required = {
+            "job_description_snippet": job_description[:1600],  # Limit JD length
+            "target_keywords": target_keywords[:10],  # Top 10 keywords
             "company": entry.get("company", "Unknown Company"),
             "title": entry.get("title", "Unknown Title"),
             "start": entry.get("start", ""),
             "end": entry.get("end", "Present"),
             "bullets": entry.get("bullets", []),
-            "job_description_snippet": job_description[:1600],  # Limit JD length
-            "target_keywords": target_keywords[:10],  # Top 10 keywords
             "required_bullet_count": len(entry.get("bullets", []))
         }
         
-        # Build prompt
-        prompt = f"{EXPERIENCE_PROMPT_HEADER}\n\nINPUT (JSON):\n{json.dumps(required, indent=2)}\n\nPlease provide your response in valid JSON format."
-        
-        # Call Gemini
-        response_text = self._call_gemini(prompt)
-        
-        # Parse response
-        try:
-            result = self._parse_json_response(response_text)
-            
-            # Validate bullet count
-            if len(result.get("bullets", [])) != required["required_bullet_count"]:
-                logger.warning(f"Bullet count mismatch. Expected {required['required_bullet_count']}, got {len(result.get('bullets', []))}")
-                # Pad or trim
-                bullets = result.get("bullets", [])
-                if len(bullets) < required["required_bullet_count"]:
-                    bullets.extend(entry["bullets"][len(bullets):])
-                else:
-                    bullets = bullets[:required["required_bullet_count"]]
-                result["bullets"] = bullets
-            
-            return result
-        except Exception as e:
-            logger.error(f"Failed to parse Gemini response: {e}")
-            # Fallback: return original
-            return {
-                "bullets": entry.get("bullets", []),
-                "explanation": f"Failed to parse AI response: {str(e)}"
-            }
+        return f"{EXPERIENCE_PROMPT_HEADER}\n\nINPUT (JSON):\n{json.dumps(required, indent=2)}\n\nPlease provide your response in valid JSON format."
     
-    def rewrite_summary(
+    def _summary_prompt(
         self,
         summary_text: str,
         job_description: str,
         target_keywords: List[str]
-    ) -> Dict[str, Any]:
-        """
-        Rewrite summary section.
-        
-        Args:
-            summary_text: Original summary
-            job_description: Target job description
-            target_keywords: Keywords to integrate
-            
-        Returns:
-            Dictionary with rewritten content and explanation
-        """
+    ) -> str:
         required = {
-            "original_summary": summary_text,
             "job_description_snippet": job_description[:1600],
-            "target_keywords": target_keywords[:10]
+            "target_keywords": target_keywords[:10],
+            "original_summary": summary_text
         }
         
-        prompt = f"{SUMMARY_PROMPT_HEADER}\n\nINPUT (JSON):\n{json.dumps(required, indent=2)}\n\nPlease provide your response in valid JSON format."
-        
-        response_text = self._call_gemini(prompt)
-        
-        try:
-            return self._parse_json_response(response_text)
-        except Exception as e:
-            logger.error(f"Failed to parse summary response: {e}")
-            return {
-                "content": summary_text,
-                "explanation": f"Failed to parse AI response: {str(e)}"
-            }
+        return f"{SUMMARY_PROMPT_HEADER}\n\nINPUT (JSON):\n{json.dumps(required, indent=2)}\n\nPlease provide your response in valid JSON format."
     
-    def rewrite_skills(
+    def _skills_prompt(
         self,
         skills_text: str,
         job_description: str,
         target_keywords: List[str]
-    ) -> Dict[str, Any]:
-        """
-        Rewrite skills section.
-        
-        Args:
-            skills_text: Original skills
-            job_description: Target job description
-            target_keywords: Keywords to integrate
-            
-        Returns:
-            Dictionary with rewritten content and explanation
-        """
+    ) -> str:
         required = {
-            "original_skills": skills_text,
             "job_description_snippet": job_description[:1600],
-            "target_keywords": target_keywords[:10]
+            "target_keywords": target_keywords[:10],
+            "original_skills": skills_text
         }
         
-        prompt = f"{SKILLS_PROMPT_HEADER}\n\nINPUT (JSON):\n{json.dumps(required, indent=2)}\n\nPlease provide your response in valid JSON format."
-        
-        response_text = self._call_gemini(prompt)
-        
-        try:
-            return self._parse_json_response(response_text)
-        except Exception as e:
-            logger.error(f"Failed to parse skills response: {e}")
-            return {
-                "content": skills_text,
-                "explanation": f"Failed to parse AI response: {str(e)}"
-            }
+        return f"{SKILLS_PROMPT_HEADER}\n\nINPUT (JSON):\n{json.dumps(required, indent=2)}\n\nPlease provide your response in valid JSON format."
     
-    def rewrite_with_brutal_review(
+    def _brutal_review_request(
         self,
         original_resume_text: str,
         job_description: str
     ) -> Dict[str, Any]:
-        """
-        Comprehensive resume rewrite with brutal hiring manager review.
-        
-        Args:
-            original_resume_text: Full original resume as plain text
-            job_description: Target job description
-            
-        Returns:
-            Dictionary with marked-up resume, changes, company expectations, and harsh review
-        """
-        prompt = f"""You are an expert hiring manager and ATS specialist reviewing resumes for a specific role.
-
-You have two jobs:
-1) Rewrite the candidate's resume to better match the job description WITHOUT inventing fake experience.
-2) Give a brutally honest, hiring-manager style review of how well this candidate fits the role.
-
-Personality:
-- Direct, blunt, and time-constrained, like a senior hiring manager.
-- You don't sugar-coat weak points.
-- You never insult the candidate, but you clearly call out weaknesses, missing skills, and risk flags.
-- You respect truthfulness: never add experience, companies, or tools that were not clearly implied in the original resume.
-
-RESUME CONTENT:
-{original_resume_text}
-
-JOB DESCRIPTION:
-{job_description}
-
-CRITICAL INSTRUCTIONS:
-
-1. FORMAT PRESERVATION:
-   - MAINTAIN the exact same resume format, structure, and layout as the original
-   - Keep the same section order, headings, and visual structure
-   - Only modify the CONTENT, not the FORMAT
-   - Preserve bullet point styles, date formats, and spacing
-
-2. ACTIONABLE GUIDANCE:
-   - For "missing_or_weak_skills", provide SPECIFIC, ACTIONABLE advice
-   - Include exact course names, platforms (Coursera, Udemy, LinkedIn Learning, etc.)
-   - Mention specific certifications that would help
-   - Reference real-world examples and success stories
-   - Provide concrete project ideas they can build
-
-3. TOP 3 ACTIONS - MAKE THEM PERFECT GUIDES:
-   - Don't just say "Take courses on X" - specify WHICH courses (with platform names)
-   - Don't just say "Build projects" - suggest SPECIFIC project ideas
-   - Include time estimates (e.g., "Complete the 4-week Google Data Analytics Certificate")
-   - Mention communities, forums, or resources to join
-   - Reference what has worked for others in similar situations
-
-Generate the brutal review and rewrite in this JSON format:
-{{
-  "plain_text": "Full rewritten resume text WITHOUT tags, MAINTAINING THE EXACT SAME FORMAT as the original",
-  "marked_up_resume": "Full text with <ADD>, <DEL>, <REWRITE> tags showing changes",
-  "changes": [
-    {{
-      "type": "add|remove|rewrite",
-      "content": "Text changed",
-      "reason": "Why you changed it",
-      "signal_to_company": "What this change signals to the hiring manager"
-    }}
-  ],
-  "company_expectations": {{
-    "role_summary": "1 sentence summary of what they really want",
-    "what_the_company_cares_about": ["value 1", "value 2"],
-    "ideal_candidate_snapshot": ["trait 1", "trait 2"]
-  }},
-  "harsh_review": {{
-    "overall_verdict": "Brutal 1-sentence summary",
-    "strengths": ["strength 1", "strength 2"],
-    "weaknesses": ["weakness 1", "weakness 2"],
-    "missing_or_weak_skills": [
-      {{
-        "skill": "Skill Name",
-        "why_it_matters": "Explain business impact and why this role needs it",
-        "how_to_build_it": "SPECIFIC steps: 'Complete [Course Name] on [Platform] (X weeks, $Y). Build [Specific Project Idea]. Join [Community/Forum]. Get certified in [Certification Name].'",
-        "success_story": "Example: 'Many candidates improved this by doing X, which led to Y'"
-      }}
-    ],
-    "risk_flags": ["flag 1", "flag 2"],
-    "would_I_interview_you": "yes|no|maybe",
-    "rationale": "Why yes/no/maybe",
-    "top_3_actions": [
-      {{
-        "action": "Specific, actionable step",
-        "how_to_do_it": "DETAILED guide: exact courses (with platform), specific projects to build, certifications to get, communities to join, time commitment",
-        "resources": ["Specific resource 1 with platform/link", "Specific resource 2", "Specific resource 3"],
-        "time_estimate": "e.g., '4-6 weeks' or '2-3 months'",
-        "what_helped_others": "Real example of how this helped someone transition or improve"
-      }}
-    ]
-  }}
-}}
-
-EXAMPLES OF GOOD vs BAD GUIDANCE:
-
-❌ BAD: "Take courses on business analytics"
-✅ GOOD: "Complete 'Google Data Analytics Professional Certificate' on Coursera (6 months, $39/mo). Also take 'Business Analytics Specialization' by Wharton on Coursera. Build a portfolio project analyzing real business data (e.g., retail sales trends, customer churn analysis)."
-
-❌ BAD: "Pursue internships focused on business analysis"
-✅ GOOD: "Apply for Business Analyst internships at companies like Deloitte, PwC, or tech startups. Use platforms like LinkedIn, Handshake, and WayUp. Tailor your resume to highlight any data analysis, Excel modeling, or stakeholder communication experience. Many candidates successfully transitioned by starting with 3-month contract roles."
-
-❌ BAD: "Engage in projects that require business insights"
-✅ GOOD: "Build 3 portfolio projects: (1) Customer segmentation analysis using Python/Excel, (2) Sales forecasting dashboard in Tableau/Power BI, (3) A/B test analysis for a hypothetical product feature. Share on GitHub and LinkedIn. Join r/BusinessAnalysis and Kaggle competitions."
-
-Return ONLY the JSON. No markdown, no code blocks, no extra text."""
+        # Static instructions first so the provider can reuse the cached prefix
+        prompt = (
+            f"{BRUTAL_REVIEW_PROMPT_HEADER}\n\n"
+            f"RESUME CONTENT:\n{original_resume_text}\n\n"
+            f"JOB DESCRIPTION:\n{job_description}\n\n"
+            "Return ONLY the JSON."
+        )
         
-        try:
-            response_text = self._call_gemini(prompt, max_retries=3)
-            result = self._parse_json_response(response_text)
-            
-            # Validate required fields
-            required_fields = ["plain_text", "marked_up_resume", "changes", "company_expectations", "harsh_review"]
-            for field in required_fields:
-                if field not in result:
-                    logger.warning(f"Missing field in brutal review response: {field}")
-                    result[field] = self._get_default_value(field)
-            
-            return result
-            
-        except Exception as e:
-            logger.error(f"Failed to generate brutal review: {e}")
-            return {
-                "plain_text": original_resume_text,
-                "marked_up_resume": original_resume_text,
-                "changes": [],
-                "company_expectations": {
-                    "role_summary": "Unable to analyze",
-                    "what_the_company_cares_about": [],
-                    "ideal_candidate_snapshot": []
-                },
-                "harsh_review": {
-                    "overall_verdict": "Unable to generate review due to error",
-                    "strengths": [],
-                    "weaknesses": [],
-                    "missing_or_weak_skills": [],
-                    "risk_flags": [],
-                    "would_I_interview_you": "maybe",
-                    "rationale": f"Error: {str(e)}",
-                    "top_3_actions": []
-                }
-            }
+        return {"prompt": prompt}
     
-    def _get_default_value(self, field: str) -> Any:
-        """Get default value for missing field."""
-        defaults = {
-            "plain_text": "",
-            "marked_up_resume": "",
-            "changes": [],
-            "company_expectations": {
-                "role_summary": "",
-                "what_the_company_cares_about": [],
-                "ideal_candidate_snapshot": []
-            },
-            "harsh_review": {
-                "overall_verdict": "",
-                "strengths": [],
-                "weaknesses": [],
-                "missing_or_weak_skills": [],
-                "risk_flags": [],
-                "would_I_interview_you": "maybe",
-                "rationale": "",
-                "top_3_actions": []
-            }
-        }
-        return defaults.get(field, None)
+    def _request_args(
+        self,
+        prompt: str,
+        system: Optional[str],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+        json_mode: bool = False
+    ):
+        """Fold per-call options into the prompt and a generation_config override."""
+        if system:
+            prompt = f"{system}\n\n{prompt}"
+        overrides = {}
+        if temperature is not None:
+            overrides["temperature"] = temperature
+        if max_tokens is not None:
+            overrides["max_output_tokens"] = max_tokens
+        if json_mode:
+            overrides["response_mime_type"] = "application/json"
+        return prompt, (overrides or None)
+    
+    def _generate(
+        self,
+        prompt: str,
+        system: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False
+    ) -> str:
+        prompt, generation_config = self._request_args(prompt, system, temperature, max_tokens, json_mode)
+        started = time.monotonic()
+        with get_rate_limiter(self.provider_name, self.model_name).slot(max_tokens):
+            response = self._get_model().generate_content(prompt, generation_config=generation_config)
+        self._record_usage(response, started)
+        return self._extract_text(response)
     
-    def _call_gemini(self, prompt: str, max_retries: int = 3) -> str:
+    async def _generate_async(
+        self,
+        prompt: str,
+        system: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False
+    ) -> str:
+        prompt, generation_config = self._request_args(prompt, system, temperature, max_tokens, json_mode)
+        started = time.monotonic()
+        async with get_rate_limiter(self.provider_name, self.model_name).slot_async(max_tokens):
+            response = await self._get_model().generate_content_async(prompt, generation_config=generation_config)
+        self._record_usage(response, started)
+        return self._extract_text(response)
+    
+    def _extract_text(self, response) -> str:
         """
-        Call Gemini API with retry logic.
+        Pull the text out of a Gemini response, surfacing blocks as errors.
         
         Args:
-            prompt: Prompt to send
-            max_retries: Maximum number of retries
+            response: GenerateContentResponse
             
         Returns:
             Response text
         """
-        for attempt in range(max_retries):
-            try:
-                model = self._get_model()
-                response = model.generate_content(prompt)
-                
-                # Check for safety blocks or empty response
-                if not response.candidates:
-                    logger.warning("No candidates returned from Gemini")
-                    raise ValueError("Empty response from Gemini - no candidates")
-                
-                candidate = response.candidates[0]
-                
-                # Check finish reason
-                if hasattr(candidate, 'finish_reason'):
-                    finish_reason = candidate.finish_reason
-                    # finish_reason: 0=UNSPECIFIED, 1=STOP, 2=MAX_TOKENS, 3=SAFETY, 4=RECITATION, 5=OTHER
-                    if finish_reason == 3:  # SAFETY
-                        logger.warning("Response blocked by safety filters")
-                        raise ValueError("Response blocked by safety filters")
-                    elif finish_reason == 4:  # RECITATION
-                        logger.warning("Response blocked due to recitation")
-                        raise ValueError("Response blocked due to recitation")
-                
-                # Try to get text
-                try:
-                    text = response.text
-                    if not text:
-                        raise ValueError("Empty text in response")
-                    logger.info(f"Gemini API call successful (attempt {attempt + 1})")
-                    return text
-                except (ValueError, AttributeError) as e:
-                    # Try to extract from parts directly
-                    if candidate.content and candidate.content.parts:
-                        text = "".join(part.text for part in candidate.content.parts if hasattr(part, 'text'))
-                        if text:
-                            logger.info(f"Gemini API call successful via parts (attempt {attempt + 1})")
-                            return text
-                    raise ValueError(f"Could not extract text from response: {e}")
-                
-            except Exception as e:
-                logger.error(f"Gemini API call failed (attempt {attempt + 1}/{max_retries}): {e}")
-                
-                if attempt < max_retries - 1:
-                    # Exponential backoff
-                    wait_time = 2 ** attempt
-                    logger.info(f"Retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)
-                else:
-                    raise
+        # Check for safety blocks or empty response
+        if not response.candidates:
+            logger.warning("No candidates returned from Gemini")
+            raise ValueError("Empty response from Gemini - no candidates")
         
-        raise RuntimeError("Failed to call Gemini API after all retries")
-    
-    def _parse_json_response(self, text: str) -> Dict[str, Any]:
-        """
-        Parse JSON response from Gemini.
-        
-        Args:
-            text: Response text
-            
-        Returns:
-            Parsed JSON dictionary
-        """
-        # Try to extract JSON from markdown code blocks
-        if "```json" in text:
-            start = text.find("```json") + 7
-            end = text.find("```", start)
-            text = text[start:end].strip()
-        elif "```" in text:
-            start = text.find("```") + 3
-            end = text.find("```", start)
-            text = text[start:end].strip()
+        candidate = response.candidates[0]
         
-        # Remove any leading/trailing whitespace
-        text = text.strip()
+        # Check finish reason
+        if hasattr(candidate, 'finish_reason'):
+            finish_reason = candidate.finish_reason
+            # finish_reason: 0=UNSPECIFIED, 1=STOP, 2=MAX_TOKENS, 3=SAFETY, 4=RECITATION, 5=OTHER
+            if finish_reason == 3:  # SAFETY
+                logger.warning("Response blocked by safety filters")
+                raise ValueError("Response blocked by safety filters")
+            elif finish_reason == 4:  # RECITATION
+                logger.warning("Response blocked due to recitation")
+                raise ValueError("Response blocked due to recitation")
         
-        # Parse JSON
+        # Try to get text
         try:
-            return json.loads(text)
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error: {e}")
-            logger.error(f"Response text: {text[:500]}")
-            
-            # Fallback: try to extract bullets from plain text
-            lines = text.split('\n')
-            bullets = [line.strip('- •*').strip() for line in lines if line.strip() and not line.strip().startswith('{')]
-            
-            return {
-                "bullets": bullets if bullets else ["Failed to parse response"],
-                "explanation": "Parsed from plain text due to JSON error"
-            }
+            text = response.text
+            if not text:
+                raise ValueError("Empty text in response")
+            return text
+        except (ValueError, AttributeError) as e:
+            # Try to extract from parts directly
+            if candidate.content and candidate.content.parts:
+                text = "".join(part.text for part in candidate.content.parts if hasattr(part, 'text'))
+                if text:
+                    logger.info("Gemini response text recovered via parts")
+                    return text
+            raise ValueError(f"Could not extract text from response: {e}")
@@ -0,0 +1,234 @@
+"""
+Job description compaction for LLM prompts.
+
+Pasted job descriptions carry benefits, EEO statements, company boilerplate
+and application instructions that cost prompt tokens without helping a
+rewrite. The compactor drops that text and re-emits what is left in one
+canonical form (title, responsibilities, requirements, preferred), with
+requirements prioritised when the result has to be trimmed to fit.
+
+Results are cached by a hash of the raw text, so every prompt built for the
+same request (each section rewrite, the batch call, the brutal review)
+shares one compaction. Token counts before and after are reported through
+app.core.metrics.
+"""
+
+import os
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+JD_COMPACTION_ENABLED = os.getenv("JD_COMPACTION_ENABLED", "1") == "1"
+# Same budget the prompts used to cut the raw JD at
+JD_COMPACT_MAX_CHARS = int(os.getenv("JD_COMPACT_MAX_CHARS", "1600"))
+_CACHE_SIZE = 256
+
+# Headings whose whole section is dropped; the whole heading must match, so
+# titles and work items that merely mention these words ("Privacy Engineer",
+# "Legal And Compliance Tooling", "Compensation Analyst") are kept
+_DROP_HEADINGS = re.compile(
+    r"^(benefits?|perks?|perks (and|&) benefits|benefits (and|&) perks|what we offer|we offer|"
+    r"compensation( (and|&) benefits)?|salary( range)?|pay range|pay transparency|"
+    r"equal (employment )?opportunity( employer)?|eeo( statement)?|"
+    r"diversity(,| &| and) inclusion|diversity, equity,? (and|&) inclusion|"
+    r"about (us|the company|the team|[\w&.-]+ inc\.?)|who we are|our (culture|mission|story|values)|"
+    r"life at [\w .&-]+|why (join|work)( (us|at|with) [\w .&-]+| us)?|how to apply|application process|"
+    r"privacy (notice|policy)|accommodations?|disclaimer|legal (notice|disclaimer))\s*:?$",
+    re.IGNORECASE
+)
+_RESPONSIBILITY_HEADINGS = re.compile(
+    r"responsibilit|what you('ll| will)? do|duties|the role|role overview|about the (role|job|position)|"
+    r"day[- ]to[- ]day|in this role|your impact|the opportunity",
+    re.IGNORECASE
+)
+_PREFERRED_HEADINGS = re.compile(r"\b(preferred|nice[- ]to[- ]have|bonus|plus(es)?|desired)\b", re.IGNORECASE)
+_REQUIREMENT_HEADINGS = re.compile(
+    r"requirement|qualification|must[- ]have|what you('ll| will)? bring|you have|you bring|skills|"
+    r"experience|who you are|what we('re| are) looking for|minimum|competenc",
+    re.IGNORECASE
+)
+
+# Sentences dropped wherever they appear
+_BOILERPLATE = re.compile(
+    r"equal (employment )?opportunit|without regard to|race, (color|colour)|sexual orientation|gender identity|"
+    r"national origin|veteran status|protected (veteran|characteristic|class)|reasonable accommodation|"
+    r"e-verify|background check|401\s*\(?k\)?|health(,| and)? dental|dental|vision insurance|"
+    r"paid time off|\bpto\b|parental leave|stock options|equity package|salary range|base pay|"
+    r"pay range|per (hour|year|annum)|\$\s?\d{2,3}[,\d]*|apply (now|today)|click apply|"
+    r"recruiting agencies|unsolicited resumes|privacy (notice|policy)",
+    re.IGNORECASE
+)
+
+_BULLET_CHARS = '•-*○▪►–—·● '
+
+
+def count_tokens(text: str) -> int:
+    """Prompt tokens: tiktoken when installed, otherwise the ~4 chars/token estimate."""
+    if not text:
+        return 0
+    try:
+        import tiktoken
+        return len(tiktoken.get_encoding("cl100k_base").encode(text))
+    except ImportError:
+        return (len(text) + 3) // 4
+
+
+class CompactJobDescription:
+    def __init__(self, text: str, digest: str, tokens_before: int, tokens_after: int):
+        self.text = text
+        self.digest = digest
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "hash": self.digest,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "tokens_saved": self.tokens_before - self.tokens_after
+        }
+
+
+class JDCompactor:
+    def __init__(self, max_chars: int = JD_COMPACT_MAX_CHARS, cache_size: int = _CACHE_SIZE):
+        self.max_chars = max_chars
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, CompactJobDescription]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compact(self, job_description: str) -> CompactJobDescription:
+        """Compact form of a job description (cached by content hash)."""
+        job_description = job_description or ""
+        digest = hashlib.sha256(job_description.encode("utf-8")).hexdigest()
+        with self._lock:
+            cached = self._cache.get(digest)
+            if cached is not None:
+                self._cache.move_to_end(digest)
+                metrics.inc("jd_compaction_cache_hits")
+                return cached
+
+        text = self._compact_text(job_description) if JD_COMPACTION_ENABLED else job_description[:self.max_chars]
+        result = CompactJobDescription(text, digest, count_tokens(job_description), count_tokens(text))
+        metrics.inc("jd_compactions")
+        metrics.observe("jd_tokens_before", result.tokens_before)
+        metrics.observe("jd_tokens_after", result.tokens_after)
+        logger.info(f"Compacted job description {digest[:12]}: {result.tokens_before} -> {result.tokens_after} tokens")
+
+        with self._lock:
+            self._cache[digest] = result
+            # Compacting the compact form is a no-op, so callers can pass either
+            self._cache[hashlib.sha256(text.encode("utf-8")).hexdigest()] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _compact_text(self, job_description: str) -> str:
+        title = None
+        sections: Dict[str, List[str]] = {"summary": [], "responsibilities": [], "requirements": [], "preferred": []}
+        current: Optional[str] = "summary"
+        seen = set()
+
+        for raw_line in job_description.split('\n'):
+            stripped = raw_line.strip()
+            line = stripped.lstrip(_BULLET_CHARS).strip()
+            if not line:
+                continue
+
+            # The first short line of a posting is almost always the job title,
+            # even when it reads like a heading ("Privacy Engineer")
+            if title is None and not sections["summary"] and current == "summary" and len(line.split()) <= 8 \
+                    and not line.endswith(('.', ':')) and not _DROP_HEADINGS.match(line):
+                title = line
+                continue
+
+            # Bulleted lines are content even when they look like a heading
+            heading = self._heading_kind(line) if line == stripped else None
+            if heading is not None:
+                current = None if heading == "drop" else heading
+                continue
+            if current is None:
+                continue
+
+            for sentence in re.split(r'(?<=[.!?;])\s+', line):
+                sentence = sentence.strip()
+                if len(sentence) < 2 or _BOILERPLATE.search(sentence):
+                    continue
+                key = re.sub(r'\W+', ' ', sentence.lower()).strip()
+                if key in seen:
+                    continue
+                seen.add(key)
+                sections[current].append(sentence)
+
+        # No headings at all: everything that survived is one list of details
+        if not any(sections[k] for k in ("responsibilities", "requirements", "preferred")):
+            sections["requirements"], sections["summary"] = sections["summary"], []
+        # A short intro is enough context; the rest is usually company pitch
+        sections["summary"] = sections["summary"][:2]
+
+        return self._render(title, self._fit(sections, title))
+
+    def _heading_kind(self, line: str) -> Optional[str]:
+        """Section a heading line opens ("drop" for boilerplate), or None for content."""
+        words = line.rstrip(':').split()
+        is_heading = (line.endswith(':') and len(words) <= 8) or \
+            (len(words) <= 5 and not re.search(r'[.,;!?]$', line) and (line.isupper() or line.istitle()))
+        if not is_heading:
+            return None
+        if _DROP_HEADINGS.match(line):
+            return "drop"
+        if _PREFERRED_HEADINGS.search(line):
+            return "preferred"
+        if _RESPONSIBILITY_HEADINGS.search(line):
+            return "responsibilities"
+        if _REQUIREMENT_HEADINGS.search(line):
+            return "requirements"
+        # Unrecognised headings ("Our Stack", "Team") keep their content as requirements-adjacent detail
+        return "requirements" if line.endswith(':') else None
+
+    def _fit(self, sections: Dict[str, List[str]], title: Optional[str]) -> Dict[str, List[str]]:
+        """Keep items in priority order until the character budget is used up."""
+        budget = self.max_chars - (len(title) + 8 if title else 0)
+        kept = {name: [] for name in sections}
+        for name in ("requirements", "responsibilities", "preferred", "summary"):
+            for item in sections[name]:
+                cost = len(item) + 3
+                if cost > budget:
+                    continue
+                kept[name].append(item)
+                budget -= cost
+        return kept
+
+    def _render(self, title: Optional[str], sections: Dict[str, List[str]]) -> str:
+        lines = []
+        if title:
+            lines.append(f"Title: {title}")
+        if sections["summary"]:
+            lines.append("Summary: " + " ".join(sections["summary"]))
+        for name, label in (("responsibilities", "Responsibilities"),
+                            ("requirements", "Requirements"),
+                            ("preferred", "Preferred")):
+            if sections[name]:
+                lines.append(f"{label}:")
+                lines.extend(f"- {item}" for item in sections[name])
+        return "\n".join(lines)
+
+
+_compactor = None
+
+
+def get_jd_compactor() -> JDCompactor:
+    global _compactor
+    if _compactor is None:
+        _compactor = JDCompactor()
+    return _compactor
+
+
+def compact_job_description(job_description: str) -> CompactJobDescription:
+    return get_jd_compactor().compact(job_description)
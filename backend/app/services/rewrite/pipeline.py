@@ -0,0 +1,431 @@
+"""
+Full-resume rewrite pipeline.
+
+Runs parse -> analysis -> scoring -> rewrite -> DOCX rebuild -> PDF conversion
+-> re-scoring as an async generator of progress events, so /rewrite/full can
+return the final result, /rewrite/full/stream can forward every event over
+SSE as it happens and background jobs can persist progress. Blocking stages
+run in the threadpool; rewritten sections are emitted one by one as their LLM
+calls complete. The DOCX and PDF are built in memory and stored once, in the
+background, as final artifacts (app.core.artifacts); re-scoring works from
+the rewritten schema instead of re-parsing the DOCX.
+
+Rewrite modes: "llm" (provider rewrite) or "fast" (FastRewriter: local,
+deterministic, milliseconds). REWRITE_DEFAULT_MODE picks the default; fast is
+also used when no AI client is configured or the user's LLM budget is in
+downgrade mode.
+
+PDF output: PDF_RENDERER=native (default) renders the rewritten schema
+straight to PDF in process (SchemaPDFRenderer, milliseconds);
+=libreoffice converts the rebuilt DOCX instead. Native falls back to
+LibreOffice, and LibreOffice to the DOCX alone.
+"""
+
+import os
+
+import time
+import asyncio
+import tempfile
+import logging
+from pathlib import Path
+from typing import Dict, Any, AsyncIterator, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.artifacts import artifact_store
+from app.core.llm_usage import budget_downgraded, current_usage
+
+logger = logging.getLogger(__name__)
+
+DOCX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+REWRITE_MODES = ("llm", "fast")
+DEFAULT_REWRITE_MODE = os.getenv("REWRITE_DEFAULT_MODE", "llm").lower()
+# native | libreoffice
+PDF_RENDERER = os.getenv("PDF_RENDERER", "native").lower()
+
+
+class RewritePipelineError(Exception):
+    """Input problem reported to the client (HTTP 400 / SSE error event)."""
+
+    # Retrying will not help (see app.core.jobs)
+    permanent = True
+
+
+def pipeline_event(name: str, **data) -> Dict[str, Any]:
+    return {"event": name, "data": data}
+
+
+class RewritePipeline:
+    def __init__(
+        self,
+        pdf_parser,
+        docx_parser,
+        comprehensive_analyzer,
+        schema_extractor,
+        visibility_ranker,
+        feature_extractor,
+        friendliness_classifier,
+        rewriter,
+        docx_rebuilder,
+        pdf_exporter,
+        fast_rewriter=None,
+        pdf_renderer=None
+    ):
+        self.pdf_parser = pdf_parser
+        self.docx_parser = docx_parser
+        self.comprehensive_analyzer = comprehensive_analyzer
+        self.schema_extractor = schema_extractor
+        self.visibility_ranker = visibility_ranker
+        self.feature_extractor = feature_extractor
+        self.friendliness_classifier = friendliness_classifier
+        self.rewriter = rewriter
+        self.docx_rebuilder = docx_rebuilder
+        self.pdf_exporter = pdf_exporter
+        self.fast_rewriter = fast_rewriter
+        self.pdf_renderer = pdf_renderer
+
+    async def run(
+        self, file_bytes: bytes, filename: str, job_description: str, mode: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Run to completion and return the final result."""
+        return await collect(self.events(file_bytes, filename, job_description, mode=mode))
+
+    async def run_brutal_review(self, file_bytes: bytes, filename: str, job_description: str) -> Dict[str, Any]:
+        return await collect(self.brutal_review_events(file_bytes, filename, job_description))
+
+    async def _stage(self, checkpoint: Optional[Dict[str, Any]], name: str, fn, *args):
+        """
+        Run one blocking stage in the threadpool, or reuse its checkpointed output.
+
+        Background jobs pass a checkpoint dict that is persisted after every
+        stage, so a retried job resumes at the stage that failed.
+        """
+        if checkpoint is not None and name in checkpoint:
+            return checkpoint[name]
+        result = await run_in_threadpool(fn, *args)
+        if checkpoint is not None:
+            checkpoint[name] = result
+        return result
+
+    def _rewriter_for(self, mode: Optional[str]):
+        """(rewriter, mode) for the requested mode, falling back to fast without an LLM."""
+        mode = (mode or DEFAULT_REWRITE_MODE).lower()
+        if mode not in REWRITE_MODES:
+            raise RewritePipelineError(f"Unknown rewrite mode '{mode}'. Use one of: {', '.join(REWRITE_MODES)}")
+        if mode == "llm" and self.rewriter is not None and not budget_downgraded():
+            return self.rewriter, mode
+        if self.fast_rewriter is None:
+            raise RuntimeError("AI rewriting service not available")
+        if mode == "llm":
+            logger.info("LLM rewrite unavailable for this request, using fast rewrite")
+        return self.fast_rewriter, "fast"
+
+    def _convert_with_libreoffice(self, docx_bytes: bytes) -> bytes:
+        with tempfile.TemporaryDirectory() as tmp:
+            docx_path = Path(tmp) / "rewritten_resume.docx"
+            docx_path.write_bytes(docx_bytes)
+            return Path(self.pdf_exporter.convert_docx_to_pdf(str(docx_path), tmp)).read_bytes()
+
+    def _parser_for(self, filename: str):
+        if filename.endswith('.pdf'):
+            return self.pdf_parser
+        if filename.endswith('.docx'):
+            return self.docx_parser
+        raise RewritePipelineError("Unsupported file type. Please upload PDF or DOCX.")
+
+    def _parse(self, file_bytes: bytes, filename: str) -> Dict[str, Any]:
+        parsing_result = self._parser_for(filename).parse(file_bytes)
+        if not parsing_result.get("raw_text", ""):
+            raise RewritePipelineError("Could not extract text from resume")
+        return parsing_result
+
+    async def events(
+        self,
+        file_bytes: bytes,
+        filename: str,
+        job_description: str,
+        checkpoint: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield progress events; the last one is "complete" with the full result.
+
+        Events:
+            stage: {stage, status: started|done, elapsed_ms}
+            scores_before: {score, friendliness, missing_keywords, percentile, analysis}
+            section: {section_index, entry_index, section_type, ...rewritten fields}
+            complete: same body as POST /rewrite/full
+
+        Args:
+            checkpoint: Per-stage outputs from an earlier attempt; completed
+                stages are skipped and new outputs are added in place
+            mode: "llm" or "fast" (default REWRITE_DEFAULT_MODE)
+        """
+        started = time.perf_counter()
+        rewriter, mode = self._rewriter_for(mode)
+
+        def stage(name: str, status: str) -> Dict[str, Any]:
+            return pipeline_event("stage", stage=name, status=status,
+                                  elapsed_ms=round((time.perf_counter() - started) * 1000))
+
+        # Parse file
+        logger.info(f"Parsing resume: {filename}")
+        self._parser_for(filename)
+        yield stage("parsing", "started")
+        parsing_result = await self._stage(checkpoint, "parsing", self._parse, file_bytes, filename)
+        text = parsing_result.get("raw_text", "")
+        yield stage("parsing", "done")
+
+        # Comprehensive analysis and layout schema
+        def analyze():
+            return {
+                "comprehensive_analysis": self.comprehensive_analyzer.analyze_comprehensive(text, job_description),
+                "layout_schema": self.schema_extractor.extract_from_parsed_data(parsing_result, filename)
+            }
+
+        yield stage("analysis", "started")
+        analysis = await self._stage(checkpoint, "analysis", analyze)
+        layout_schema = analysis["layout_schema"]
+        yield stage("analysis", "done")
+
+        # Score original resume
+        def score():
+            return {
+                "visibility": self.visibility_ranker.rank(text, job_description),
+                "friendliness": self.friendliness_classifier.predict(
+                    self.feature_extractor.extract_features(parsing_result)
+                )
+            }
+
+        logger.info("Scoring original resume")
+        yield stage("scoring", "started")
+        scores_before = await self._stage(checkpoint, "scoring", score)
+        visibility_before = scores_before["visibility"]
+        friendliness_before = scores_before["friendliness"]
+        yield stage("scoring", "done")
+        yield pipeline_event(
+            "scores_before",
+            score=visibility_before.get("score", 0),
+            friendliness=friendliness_before.get("score", 0),
+            missing_keywords=visibility_before.get("missing_keywords", []),
+            percentile=visibility_before.get("percentile"),
+            analysis=analysis["comprehensive_analysis"]
+        )
+
+        # Rewrite, streaming each section as it lands
+        logger.info(f"Rewriting resume ({mode})")
+        yield stage("rewriting", "started")
+        if checkpoint is not None and "rewriting" in checkpoint:
+            rewrite_result = checkpoint["rewriting"]
+        else:
+            target_keywords = visibility_before.get("missing_keywords", [])
+            sections_out: "asyncio.Queue" = asyncio.Queue()
+
+            def on_section(key, result):
+                sections_out.put_nowait(_section_event(layout_schema, key, result))
+
+            rewrite_task = asyncio.create_task(rewriter.rewrite_full_resume_async(
+                layout_schema=layout_schema,
+                job_description=job_description,
+                target_keywords=target_keywords,
+                on_section=on_section
+            ))
+            try:
+                while not rewrite_task.done() or not sections_out.empty():
+                    getter = asyncio.ensure_future(sections_out.get())
+                    await asyncio.wait({getter, rewrite_task}, return_when=asyncio.FIRST_COMPLETED)
+                    if getter.done():
+                        yield getter.result()
+                    else:
+                        getter.cancel()
+                rewrite_result = rewrite_task.result()
+            finally:
+                # Client went away or job cancelled mid-rewrite: stop issuing LLM calls
+                if not rewrite_task.done():
+                    rewrite_task.cancel()
+            if checkpoint is not None:
+                checkpoint["rewriting"] = rewrite_result
+        yield stage("rewriting", "done")
+
+        rewritten_schema = rewrite_result["rewritten_schema"]
+        delta_report = rewrite_result["delta_report"]
+        explanations = rewrite_result["explanations"]
+
+        # Rebuild DOCX in memory; the DOCX and PDF are stored once, as final artifacts
+        # (content-addressed, see app.core.artifacts), in the background while re-scoring runs
+        usage = current_usage()
+        owner = usage.user if usage else None
+
+        def store_later(data: bytes, content_type: str, filename: str) -> "asyncio.Task":
+            return asyncio.ensure_future(run_in_threadpool(artifact_store.put, data, content_type, filename, owner))
+
+        logger.info("Rebuilding DOCX from schema")
+        yield stage("rebuilding", "started")
+        docx_info = pdf_info = docx_stored = pdf_stored = None
+        if checkpoint is not None and isinstance(checkpoint.get("rebuilding"), dict) and "converting" in checkpoint:
+            docx_info = await run_in_threadpool(artifact_store.get, checkpoint["rebuilding"]["digest"])
+        if docx_info is not None:
+            docx_size = docx_info["size"]
+        else:
+            docx_bytes = await run_in_threadpool(self.docx_rebuilder.render_to_bytes, rewritten_schema)
+            docx_size = len(docx_bytes)
+            docx_stored = store_later(docx_bytes, DOCX_CONTENT_TYPE, "rewritten_resume.docx")
+        yield stage("rebuilding", "done")
+
+        # Convert to PDF
+        async def convert() -> Optional["asyncio.Task"]:
+            if self.pdf_renderer is not None and PDF_RENDERER == "native":
+                try:
+                    pdf_bytes = await run_in_threadpool(self.pdf_renderer.render, rewritten_schema)
+                    return store_later(pdf_bytes, "application/pdf", "rewritten_resume.pdf")
+                except Exception as e:
+                    logger.warning(f"Native PDF rendering failed: {e}. Falling back to LibreOffice.")
+            try:
+                pdf_bytes = await run_in_threadpool(self._convert_with_libreoffice, docx_bytes)
+                return store_later(pdf_bytes, "application/pdf", "rewritten_resume.pdf")
+            except Exception as e:
+                logger.warning(f"PDF conversion failed: {e}. Using DOCX only.")
+                return None
+
+        logger.info("Converting to PDF")
+        yield stage("converting", "started")
+        if docx_info is not None:
+            if checkpoint["converting"]:
+                pdf_info = await run_in_threadpool(artifact_store.get, checkpoint["converting"]["digest"])
+        else:
+            pdf_stored = await convert()
+        yield stage("converting", "done")
+
+        # Re-score rewritten resume from the schema: same text DOCXParser would
+        # extract from the rebuilt file, and the rebuilder writes no text boxes
+        # or headers/footers
+        logger.info("Scoring rewritten resume")
+        yield stage("rescoring", "started")
+        rewritten_text = self.docx_rebuilder.schema_to_text(rewritten_schema)
+        rewritten_docx_result = {
+            "raw_text": rewritten_text,
+            "floating_object_count": 0,
+            "has_header_footer_content": False,
+            "file_size_bytes": docx_size
+        }
+        visibility_after = await run_in_threadpool(
+            self.visibility_ranker.rank, rewritten_text, job_description, None, False
+        )
+        rewritten_features = await run_in_threadpool(self.feature_extractor.extract_features, rewritten_docx_result)
+        friendliness_after = self.friendliness_classifier.predict(rewritten_features)
+        if docx_stored is not None:
+            docx_info = await docx_stored
+        if pdf_stored is not None:
+            pdf_info = await pdf_stored
+        if checkpoint is not None:
+            # Only once the files are stored, so a retried job can reuse them
+            checkpoint["rebuilding"] = docx_info
+            checkpoint["converting"] = pdf_info
+        yield stage("rescoring", "done")
+
+        response = {
+            "before_score": visibility_before.get("score", 0),
+            "after_score": visibility_after.get("score", 0),
+            "before_friendliness": friendliness_before.get("score", 0),
+            "after_friendliness": friendliness_after.get("score", 0),
+            "file_url": f"http://localhost:8000{(pdf_info or docx_info)['url']}", # Full URL for local dev
+            "docx_url": f"http://localhost:8000{docx_info['url']}",
+            "docx_path": docx_info["path"],
+            "pdf_path": pdf_info["path"] if pdf_info else None,
+            "original_text": text,  # Add original text for comparison
+            "rewritten_text": rewritten_text,  # Add rewritten text for comparison
+            "delta_report": {
+                **delta_report,
+                "score_improvement": visibility_after.get("score", 0) - visibility_before.get("score", 0),
+                "friendliness_improvement": friendliness_after.get("score", 0) - friendliness_before.get("score", 0),
+                "keywords_before": len(visibility_before.get("missing_keywords", [])),
+                "keywords_after": len(visibility_after.get("missing_keywords", [])),
+            },
+            "explanations": explanations
+        }
+
+        logger.info(f"Rewrite complete. Score: {visibility_before.get('score', 0)} → {visibility_after.get('score', 0)}")
+        yield pipeline_event("complete", **response)
+
+    async def brutal_review_events(
+        self,
+        file_bytes: bytes,
+        filename: str,
+        job_description: str,
+        checkpoint: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Parse -> brutal hiring-manager review; "complete" carries the /rewrite/brutal body."""
+        started = time.perf_counter()
+
+        def stage(name: str, status: str) -> Dict[str, Any]:
+            return pipeline_event("stage", stage=name, status=status,
+                                  elapsed_ms=round((time.perf_counter() - started) * 1000))
+
+        logger.info(f"Parsing resume for brutal review: {filename}")
+        self._parser_for(filename)
+        yield stage("parsing", "started")
+        parsing_result = await self._stage(checkpoint, "parsing", self._parse, file_bytes, filename)
+        original_text = parsing_result.get("raw_text", "")
+        yield stage("parsing", "done")
+
+        if self.rewriter is None:
+            raise RuntimeError("AI rewriting service not available")
+        logger.info("Generating brutal review")
+        yield stage("reviewing", "started")
+        if checkpoint is not None and "reviewing" in checkpoint:
+            brutal_result = checkpoint["reviewing"]
+        else:
+            brutal_result = await self.rewriter.ai_client.rewrite_with_brutal_review_async(
+                original_resume_text=original_text,
+                job_description=job_description
+            )
+            if checkpoint is not None:
+                checkpoint["reviewing"] = brutal_result
+        yield stage("reviewing", "done")
+
+        yield pipeline_event(
+            "complete",
+            plain_text=brutal_result.get("plain_text", ""),
+            marked_up_resume=brutal_result.get("marked_up_resume", ""),
+            changes=brutal_result.get("changes", []),
+            company_expectations=brutal_result.get("company_expectations", {}),
+            harsh_review=brutal_result.get("harsh_review", {}),
+            original_text=original_text
+        )
+
+
+async def collect(events: AsyncIterator[Dict[str, Any]]) -> Dict[str, Any]:
+    """Drain an event stream and return the "complete" payload."""
+    result = None
+    async for event in events:
+        if event["event"] == "complete":
+            result = event["data"]
+    return result
+
+
+def _section_event(layout_schema: Dict[str, Any], key, result) -> Dict[str, Any]:
+    """One rewritten (or failed) unit as a "section" event."""
+    section_idx, entry_idx = key
+    section = layout_schema.get("sections", [])[section_idx]
+    data = {
+        "section_index": section_idx,
+        "entry_index": entry_idx,
+        "section_type": section.get("type")
+    }
+    if isinstance(result, BaseException):
+        data["error"] = str(result) or type(result).__name__
+    elif entry_idx is not None:
+        entry = section.get("entries", [])[entry_idx]
+        data.update({
+            "company": entry.get("company", "Unknown"),
+            "original": entry.get("bullets", []),
+            "rewritten": result.get("bullets", entry.get("bullets", [])),
+            "explanation": result.get("explanation", "")
+        })
+    else:
+        data.update({
+            "original": section.get("raw", ""),
+            "rewritten": result.get("content", section.get("raw", "")),
+            "explanation": result.get("explanation", "")
+        })
+    return pipeline_event("section", **data)
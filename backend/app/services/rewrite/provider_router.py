@@ -0,0 +1,361 @@
+"""
+Provider router: hedged requests and failover across LLM providers.
+
+ProviderRouter is a BaseLLMClient whose transport (_generate/_generate_async)
+fans out over several provider clients instead of calling one API:
+
+- Every completion goes to the preferred healthy provider first. If it has
+  not answered within that provider's rolling p95 latency for this kind of
+  call, a hedged duplicate goes to the next provider; the first valid answer
+  wins and the other request is cancelled (async) or ignored (blocking).
+- A provider that errors is failed over to the next one immediately.
+- Each provider has a circuit breaker that opens on a sustained error rate,
+  skips the provider for a cooldown, then lets one trial call through.
+
+Prompts are built by the primary provider's prompt builders, so caching,
+JSON repair and schema re-asks in BaseLLMClient apply unchanged. Providers
+are any BaseLLMClient instances, so local fakes can be routed in tests.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+import concurrent.futures
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+from app.core.metrics import metrics
+from app.services.rewrite.base_client import BaseLLMClient
+from app.services.rewrite.structured_output import repair_json, JSONRepairError
+
+logger = logging.getLogger(__name__)
+
+ROUTER_ENABLED = os.getenv("LLM_ROUTER_ENABLED", "1") == "1"
+HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "1") == "1"
+# Hedge delay is the rolling p95, clamped to this range; the default applies until enough samples exist
+HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0"))
+HEDGE_MAX_DELAY = float(os.getenv("LLM_HEDGE_MAX_DELAY", "60"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "20"))
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))
+BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderHealth:
+    """Rolling latency, error rate and circuit breaker for one provider."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        # Latency is tracked per call class: batch and brutal-review calls are far longer than section calls
+        self._latencies: Dict[Any, deque] = {}
+        self._outcomes: deque = deque(maxlen=BREAKER_WINDOW)
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def hedge_delay(self, call_class: Any) -> float:
+        with self._lock:
+            samples = sorted(self._latencies.get(call_class, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+        return min(HEDGE_MAX_DELAY, max(HEDGE_MIN_DELAY, p95))
+
+    def available(self) -> bool:
+        """Whether a call could be sent now, without claiming anything."""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self._opened_at >= BREAKER_COOLDOWN
+            return self.state == CLOSED or not self._trial_in_flight
+
+    def allow(self) -> bool:
+        """Whether a call may be sent now (claims the half-open trial slot)."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= BREAKER_COOLDOWN:
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self, call_class: Any, latency: float):
+        with self._lock:
+            self._latencies.setdefault(call_class, deque(maxlen=LATENCY_WINDOW)).append(latency)
+            self._outcomes.append(True)
+            if self.state != CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+                self.state = CLOSED
+                self._outcomes.clear()
+                self._outcomes.append(True)
+                metrics.set_gauge("llm_breaker_open", 0, provider=self.name)
+        metrics.observe("llm_provider_seconds", latency, provider=self.name)
+
+    def record_failure(self):
+        with self._lock:
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            tripped = self.state == HALF_OPEN or (
+                len(self._outcomes) >= BREAKER_MIN_CALLS and failures / len(self._outcomes) >= BREAKER_ERROR_RATE
+            )
+            if tripped and self.state != OPEN:
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                logger.warning(f"Circuit for {self.name} opened ({failures}/{len(self._outcomes)} recent calls failed)")
+                metrics.inc("llm_breaker_opened", provider=self.name)
+                metrics.set_gauge("llm_breaker_open", 1, provider=self.name)
+        metrics.inc("llm_provider_errors", provider=self.name)
+
+    def release(self):
+        """Give back an unused half-open trial slot (call cancelled before finishing)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            outcomes = list(self._outcomes)
+        return {
+            "state": self.state,
+            "recent_calls": len(outcomes),
+            "error_rate": round(outcomes.count(False) / len(outcomes), 3) if outcomes else 0.0
+        }
+
+
+class ProviderRouter(BaseLLMClient):
+    provider_name = "router"
+
+    def __init__(self, providers: List[BaseLLMClient], hedging: bool = HEDGING_ENABLED):
+        """
+        Args:
+            providers: Clients in order of preference; prompts come from the first
+            hedging: Send hedged duplicates when the preferred provider is slow
+        """
+        if not providers:
+            raise ValueError("ProviderRouter needs at least one provider")
+        self.providers = providers
+        self.primary = providers[0]
+        self.hedging = hedging and len(providers) > 1
+        self.health = {p.provider_name: ProviderHealth(p.provider_name) for p in providers}
+        self.model_name = "+".join(f"{p.provider_name}:{getattr(p, 'model_name', '')}" for p in providers)
+        self.temperature = getattr(self.primary, "temperature", None)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=4 * len(providers), thread_name_prefix="llm-router"
+        )
+        logger.info(f"Provider router over {[p.provider_name for p in providers]}, hedging={'on' if self.hedging else 'off'}")
+
+    # Prompts are built by the primary provider
+    def _experience_prompt(self, entry, job_description, target_keywords):
+        return self.primary._experience_prompt(entry, job_description, target_keywords)
+
+    def _summary_prompt(self, summary_text, job_description, target_keywords):
+        return self.primary._summary_prompt(summary_text, job_description, target_keywords)
+
+    def _skills_prompt(self, skills_text, job_description, target_keywords):
+        return self.primary._skills_prompt(skills_text, job_description, target_keywords)
+
+    def _brutal_review_request(self, original_resume_text, job_description):
+        return self.primary._brutal_review_request(original_resume_text, job_description)
+
+    def status(self) -> Dict[str, Any]:
+        return {name: health.snapshot() for name, health in self.health.items()}
+
+    def _candidates(self) -> List[BaseLLMClient]:
+        """Providers whose breaker would admit a call, in preference order."""
+        available = [p for p in self.providers if self.health[p.provider_name].available()]
+        # Everything open: trying the preferred provider beats failing outright
+        return available or [self.primary]
+
+    def _next_provider(self, candidates: List[BaseLLMClient], first: bool) -> Optional[BaseLLMClient]:
+        """Pop the next candidate whose breaker admits the call."""
+        while candidates:
+            provider = candidates.pop(0)
+            health = self.health[provider.provider_name]
+            if health.allow() or (first and not candidates and not health.available()):
+                return provider
+        return None
+
+    def _attempt(self, provider: BaseLLMClient, call_class: Any, args: Dict[str, Any]) -> str:
+        health = self.health[provider.provider_name]
+        started = time.perf_counter()
+        try:
+            text = provider._generate(**args)
+            self._check_valid(text, args)
+        except Exception:
+            health.record_failure()
+            raise
+        health.record_success(call_class, time.perf_counter() - started)
+        return text
+
+    async def _attempt_async(self, provider: BaseLLMClient, call_class: Any, args: Dict[str, Any]) -> str:
+        health = self.health[provider.provider_name]
+        started = time.perf_counter()
+        try:
+            text = await provider._generate_async(**args)
+            self._check_valid(text, args)
+        except asyncio.CancelledError:
+            health.release()
+            raise
+        except Exception:
+            health.record_failure()
+            raise
+        health.record_success(call_class, time.perf_counter() - started)
+        return text
+
+    def _check_valid(self, text: str, args: Dict[str, Any]):
+        if not text or not text.strip():
+            raise ValueError("Empty response")
+        if args.get("json_mode"):
+            # Garbage from one provider should lose to the other, not win the race
+            try:
+                repair_json(text)
+            except JSONRepairError as e:
+                raise ValueError(f"Invalid JSON response: {e}")
+
+    def _generate(
+        self,
+        prompt: str,
+        system: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False
+    ) -> str:
+        args = {"prompt": prompt, "system": system, "temperature": temperature,
+                "max_tokens": max_tokens, "json_mode": json_mode}
+        candidates = self._candidates()
+        pending: Dict[concurrent.futures.Future, str] = {}
+        last_error: Optional[Exception] = None
+
+        def launch(first: bool = False):
+            provider = self._next_provider(candidates, first)
+            if provider is not None:
+                # Run in a copy of the caller's context so the call is accounted to its request
+                future = self._executor.submit(contextvars.copy_context().run, self._attempt, provider, max_tokens, args)
+                pending[future] = provider.provider_name
+
+        launch(first=True)
+        if not pending:
+            raise RuntimeError("No LLM provider available")
+        primary_name = next(iter(pending.values()))
+        hedge_at = time.monotonic() + self.health[primary_name].hedge_delay(max_tokens)
+        while pending:
+            timeout = max(0.0, hedge_at - time.monotonic()) if self.hedging and candidates else None
+            done, _ = concurrent.futures.wait(pending, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+            if not done:
+                # Slower than p95: hedge with the next provider, keep the first one running
+                metrics.inc("llm_hedged_requests", provider=primary_name)
+                launch()
+                continue
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    text = future.result()
+                except Exception as e:
+                    last_error = e
+                    logger.warning(f"{name} call failed: {e}")
+                    continue
+                self._record_winner(name, primary_name)
+                return text
+            if candidates and not pending:
+                metrics.inc("llm_failovers", provider=name)
+                launch()
+        raise last_error or RuntimeError("No LLM provider available")
+
+    async def _generate_async(
+        self,
+        prompt: str,
+        system: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False
+    ) -> str:
+        args = {"prompt": prompt, "system": system, "temperature": temperature,
+                "max_tokens": max_tokens, "json_mode": json_mode}
+        candidates = self._candidates()
+        pending: Dict[asyncio.Task, str] = {}
+        last_error: Optional[Exception] = None
+
+        def launch(first: bool = False):
+            provider = self._next_provider(candidates, first)
+            if provider is not None:
+                pending[asyncio.ensure_future(self._attempt_async(provider, max_tokens, args))] = provider.provider_name
+
+        launch(first=True)
+        if not pending:
+            raise RuntimeError("No LLM provider available")
+        primary_name = next(iter(pending.values()))
+        hedge_at = time.monotonic() + self.health[primary_name].hedge_delay(max_tokens)
+        try:
+            while pending:
+                timeout = max(0.0, hedge_at - time.monotonic()) if self.hedging and candidates else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    metrics.inc("llm_hedged_requests", provider=primary_name)
+                    launch()
+                    continue
+                for task in done:
+                    name = pending.pop(task)
+                    try:
+                        text = task.result()
+                    except Exception as e:
+                        last_error = e
+                        logger.warning(f"{name} call failed: {e}")
+                        continue
+                    self._record_winner(name, primary_name)
+                    return text
+                if candidates and not pending:
+                    metrics.inc("llm_failovers", provider=name)
+                    launch()
+        finally:
+            # The losing (or abandoned) request is cancelled in flight
+            for task in pending:
+                task.cancel()
+        raise last_error or RuntimeError("No LLM provider available")
+
+    def _record_winner(self, name: str, primary_name: str):
+        metrics.inc("llm_router_wins", provider=name)
+        if name != primary_name:
+            logger.info(f"Answer served by {name} instead of {primary_name}")
+
+
+def create_ai_client() -> BaseLLMClient:
+    """
+    AI client for AI_PROVIDER; with LLM_ROUTER_ENABLED and the other provider
+    configured too, a ProviderRouter preferring AI_PROVIDER. AI_PROVIDER=replay
+    serves recorded responses instead (see replay_client).
+
+    Raises:
+        Exception: the preferred provider could not be initialised
+    """
+    from .gemini_client import GeminiClient
+    from .openai_client import OpenAIClient
+
+    ai_provider = os.getenv("AI_PROVIDER", "gemini").lower()
+    if ai_provider == "replay":
+        # Offline benchmarking: one deterministic provider, nothing to fail over to
+        from .replay_client import get_replay_client
+        return get_replay_client()
+    order = [OpenAIClient, GeminiClient] if ai_provider == "openai" else [GeminiClient, OpenAIClient]
+
+    primary = order[0]()
+    if not ROUTER_ENABLED:
+        return primary
+    try:
+        secondary = order[1]()
+    except Exception as e:
+        logger.info(f"No failover provider ({e}); using {primary.provider_name} only")
+        return primary
+    return ProviderRouter([primary, secondary])
@@ -0,0 +1,327 @@
+"""
+Record/replay LLM provider for deterministic offline benchmarking.
+
+ReplayClient has the same surface as GeminiClient and OpenAIClient but never
+touches the network: completions come from a JSONL file captured with
+LLM_RECORD_PATH (see app.core.llm_recording), and prompts that were never
+recorded get a synthesized, schema-valid answer built from the prompt's own
+input. Each call sleeps for a latency drawn from a configurable distribution
+and fails at a configurable rate, so end-to-end throughput and tail latency
+of the rewrite, feedback and GitHub paths can be measured and compared
+between changes without quota, cost or provider variance.
+
+Select it with AI_PROVIDER=replay. All randomness comes from one seeded
+generator (LLM_REPLAY_SEED), so a single-worker run is repeatable.
+"""
+
+import os
+import re
+import json
+import time
+import math
+import random
+import asyncio
+import logging
+import threading
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional
+
+from app.core.llm_recording import load_recordings, recording_key
+from app.core.metrics import metrics
+from app.core.rate_limiter import get_rate_limiter
+from .base_client import BaseLLMClient
+
+logger = logging.getLogger(__name__)
+
+REPLAY_PATH = os.getenv("LLM_REPLAY_PATH", "")
+# What to do with a prompt that has no recording: synthesize | error
+REPLAY_MISS = os.getenv("LLM_REPLAY_MISS", "synthesize").lower()
+# Which provider's prompt templates to build: gemini | openai
+REPLAY_PROMPT_STYLE = os.getenv("LLM_REPLAY_PROMPT_STYLE", "gemini").lower()
+# recorded | fixed:<ms> | uniform:<lo_ms>,<hi_ms> | lognormal:<median_ms>,<p99_ms>
+REPLAY_LATENCY = os.getenv("LLM_REPLAY_LATENCY", "recorded")
+REPLAY_LATENCY_SCALE = float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "1"))
+# Used for "recorded" when the prompt was synthesized rather than replayed
+REPLAY_MISS_LATENCY = os.getenv("LLM_REPLAY_MISS_LATENCY", "lognormal:1500,6000")
+REPLAY_ERROR_RATE = float(os.getenv("LLM_REPLAY_ERROR_RATE", "0"))
+REPLAY_RATE_LIMIT_RATE = float(os.getenv("LLM_REPLAY_RATE_LIMIT_RATE", "0"))
+REPLAY_SEED = int(os.getenv("LLM_REPLAY_SEED", "0"))
+
+# z-score of the 99th percentile of a standard normal
+_Z99 = 2.326
+
+
+class ReplayProviderError(Exception):
+    """Synthetic provider failure shaped like an SDK HTTP error (status code, response headers)."""
+
+    def __init__(self, message: str, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        # backoff_delay honours Retry-After from error.response.headers
+        self.response = SimpleNamespace(status_code=status_code, headers=headers)
+
+
+class LatencyModel:
+    """Parsed LLM_REPLAY_LATENCY spec; sample() returns seconds."""
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        kind, _, args = spec.partition(":")
+        self.kind = kind.strip().lower()
+        values = [float(v) for v in args.split(",") if v.strip()]
+        if self.kind == "recorded":
+            self.values = []
+        elif self.kind == "fixed" and len(values) == 1:
+            self.values = values
+        elif self.kind == "uniform" and len(values) == 2:
+            self.values = values
+        elif self.kind == "lognormal" and len(values) == 2 and values[1] >= values[0] > 0:
+            median, p99 = values
+            self.values = [math.log(median), math.log(p99 / median) / _Z99]
+        else:
+            raise ValueError(f"Invalid latency spec: {spec!r}")
+
+    def sample(self, rng: random.Random, recorded_ms: Optional[float] = None) -> Optional[float]:
+        """Seconds to wait, or None for "recorded" without a recorded value."""
+        if self.kind == "recorded":
+            return recorded_ms / 1000 if recorded_ms is not None else None
+        if self.kind == "fixed":
+            return self.values[0] / 1000
+        if self.kind == "uniform":
+            return rng.uniform(*self.values) / 1000
+        return rng.lognormvariate(*self.values) / 1000
+
+
+class ReplayClient(BaseLLMClient):
+    provider_name = "Replay"
+
+    def __init__(
+        self,
+        path: str = REPLAY_PATH,
+        latency: str = REPLAY_LATENCY,
+        error_rate: float = REPLAY_ERROR_RATE,
+        rate_limit_rate: float = REPLAY_RATE_LIMIT_RATE,
+        seed: int = REPLAY_SEED
+    ):
+        """
+        Raises:
+            ValueError: invalid latency spec or prompt style
+            FileNotFoundError: LLM_REPLAY_PATH points at a missing file
+        """
+        if REPLAY_PROMPT_STYLE == "openai":
+            from .openai_client import OpenAIClient as prompt_style
+        elif REPLAY_PROMPT_STYLE == "gemini":
+            from .gemini_client import GeminiClient as prompt_style
+        else:
+            raise ValueError(f"Unknown LLM_REPLAY_PROMPT_STYLE: {REPLAY_PROMPT_STYLE}")
+        self._prompt_style = prompt_style
+
+        self.recordings = load_recordings(path) if path else {}
+        self.latency = LatencyModel(latency)
+        self.miss_latency = LatencyModel(REPLAY_MISS_LATENCY)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.model_name = f"replay:{os.path.basename(path) if path else 'synthetic'}"
+        self.temperature = 0.0
+        self._rng = random.Random(seed)
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        logger.info(
+            f"Initialized replay client: {sum(len(v) for v in self.recordings.values())} recordings, "
+            f"latency {latency}, error rate {error_rate}, rate-limit rate {rate_limit_rate}, seed {seed}"
+        )
+
+    # -- Prompt builders: the selected provider's templates, unchanged ---------
+
+    def _experience_prompt(self, entry: Dict[str, Any], job_description: str, target_keywords: List[str]) -> str:
+        return self._prompt_style._experience_prompt(self, entry, job_description, target_keywords)
+
+    def _summary_prompt(self, summary_text: str, job_description: str, target_keywords: List[str]) -> str:
+        return self._prompt_style._summary_prompt(self, summary_text, job_description, target_keywords)
+
+    def _skills_prompt(self, skills_text: str, job_description: str, target_keywords: List[str]) -> str:
+        return self._prompt_style._skills_prompt(self, skills_text, job_description, target_keywords)
+
+    def _brutal_review_request(self, original_resume_text: str, job_description: str) -> Dict[str, Any]:
+        return self._prompt_style._brutal_review_request(self, original_resume_text, job_description)
+
+    # -- Replay is its own cache and must not record itself -------------------
+
+    def _cache_lookup_key(self, prompt: str, options: Dict[str, Any]):
+        return None, None
+
+    def _record(self, prompt: str, text: str, started: float, options: Dict[str, Any]):
+        pass
+
+    # -- Provider hooks -------------------------------------------------------
+
+    def _plan(self, prompt: str, system: Optional[str], json_mode: bool):
+        """Draw the outcome of one call: (delay seconds, response text or exception)."""
+        key = recording_key(prompt, system, json_mode)
+        with self._lock:
+            entries = self.recordings.get(key)
+            roll = self._rng.random()
+            if entries:
+                # Cycle through repeated recordings of the same prompt in file order
+                index = self._cursor.get(key, 0)
+                self._cursor[key] = index + 1
+                entry = entries[index % len(entries)]
+                delay = self.latency.sample(self._rng, entry.get("latency_ms"))
+                if delay is None:
+                    delay = self.miss_latency.sample(self._rng)
+                response = entry["response"]
+            else:
+                delay = self.latency.sample(self._rng)
+                if delay is None:
+                    delay = self.miss_latency.sample(self._rng)
+                response = None
+
+        delay *= REPLAY_LATENCY_SCALE
+        if roll < self.rate_limit_rate:
+            metrics.inc("llm_replay_errors", kind="rate_limit")
+            return delay, ReplayProviderError("Replay: synthetic 429 Too Many Requests", 429, retry_after=1.0)
+        if roll < self.rate_limit_rate + self.error_rate:
+            metrics.inc("llm_replay_errors", kind="server")
+            return delay, ReplayProviderError("Replay: synthetic 503 Service Unavailable", 503)
+
+        if response is not None:
+            metrics.inc("llm_replay_hits")
+            return delay, response
+        metrics.inc("llm_replay_misses")
+        if REPLAY_MISS == "error":
+            return delay, KeyError(f"Replay: no recording for prompt {key[:12]}")
+        return delay, json.dumps(synthesize_response(prompt))
+
+    def _generate(
+        self,
+        prompt: str,
+        system: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False
+    ) -> str:
+        started = time.monotonic()
+        with get_rate_limiter(self.provider_name, self.model_name).slot(max_tokens):
+            delay, outcome = self._plan(prompt, system, json_mode)
+            time.sleep(delay)
+            if isinstance(outcome, Exception):
+                raise outcome
+        # Calls and latency only: recordings carry no token counts
+        self._record_usage(None, started)
+        return outcome
+
+    async def _generate_async(
+        self,
+        prompt: str,
+        system: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False
+    ) -> str:
+        started = time.monotonic()
+        async with get_rate_limiter(self.provider_name, self.model_name).slot_async(max_tokens):
+            delay, outcome = self._plan(prompt, system, json_mode)
+            await asyncio.sleep(delay)
+            if isinstance(outcome, Exception):
+                raise outcome
+        self._record_usage(None, started)
+        return outcome
+
+
+_replay_client = None
+
+
+def get_replay_client() -> ReplayClient:
+    """Process-wide replay client, so every path draws from one seeded stream."""
+    global _replay_client
+    if _replay_client is None:
+        _replay_client = ReplayClient()
+    return _replay_client
+
+
+# -- Synthesized responses ----------------------------------------------------
+
+_INPUT_JSON = re.compile(r"INPUT \(JSON\):\n(\{.*?\n\})(?:\n|$)", re.DOTALL)
+_RESUME_CONTENT = re.compile(r"RESUME CONTENT:\n(.*?)\n\s*JOB DESCRIPTION:", re.DOTALL)
+_RESUME_PART = re.compile(r"RESUME PART \(\d+ of \d+\):\n(.*)\nEND OF PART", re.DOTALL)
+
+
+def _echo_section(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Identity rewrite of one prompt input: the original text, which is always valid."""
+    if "bullets" in payload:
+        return {"bullets": list(payload["bullets"]), "explanation": "replay: original bullets"}
+    original = payload.get("original") or payload.get("original_summary") or payload.get("original_skills") or ""
+    return {"content": original or "-", "explanation": "replay: original content"}
+
+
+def _neutral_review() -> Dict[str, Any]:
+    return {
+        "company_expectations": {
+            "role_summary": "replay",
+            "what_the_company_cares_about": [],
+            "ideal_candidate_snapshot": []
+        },
+        "harsh_review": {
+            "overall_verdict": "replay",
+            "strengths": [],
+            "weaknesses": [],
+            "missing_or_weak_skills": [],
+            "risk_flags": [],
+            "would_I_interview_you": "maybe",
+            "rationale": "replay",
+            "top_3_actions": []
+        }
+    }
+
+
+def synthesize_response(prompt: str) -> Dict[str, Any]:
+    """
+    Schema-valid answer for an unrecorded prompt, derived from the prompt itself.
+
+    Section rewrites echo their input, the brutal review echoes the resume,
+    and insights/GitHub analyses get neutral placeholder values.
+    """
+    match = _INPUT_JSON.search(prompt)
+    if match:
+        try:
+            payload = json.loads(match.group(1))
+        except json.JSONDecodeError:
+            payload = {}
+        if "sections" in payload:
+            return {"sections": {s["id"]: _echo_section(s) for s in payload["sections"]}}
+        return _echo_section(payload)
+
+    part = _RESUME_PART.search(prompt)
+    if part:
+        text = part.group(1).strip() or "-"
+        return {"plain_text": text, "marked_up_resume": text, "changes": [], "strengths": [], "weaknesses": []}
+
+    resume = _RESUME_CONTENT.search(prompt)
+    if resume:
+        text = resume.group(1).strip() or "-"
+        return {
+            "plain_text": text,
+            "marked_up_resume": text,
+            "changes": [],
+            **_neutral_review()
+        }
+
+    if "SECTION FINDINGS (JSON):" in prompt:
+        return _neutral_review()
+
+    if '"executive_summary"' in prompt:
+        return {"executive_summary": "replay", "strengths": [], "gaps": [], "tactical_actions": []}
+
+    if '"relevance_score"' in prompt:
+        return {
+            "relevance_score": 50,
+            "interview_worthy": False,
+            "first_impression": "replay",
+            "strengths": [],
+            "red_flags": [],
+            "suggested_resume_bullets": [],
+            "interview_questions": [],
+            "improvement_advice": []
+        }
+    return {}
@@ -4,11 +4,23 @@ Orchestrates full resume rewrites using AI (Gemini or OpenAI) with layout schema
 """
 
 import os
-from typing import Dict, Any, List, Optional
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple, Callable
 import logging
 
+from app.core.metrics import metrics
+from app.services.rewrite.jd_compactor import compact_job_description
+
 logger = logging.getLogger(__name__)
 
+# Max concurrent section rewrites per resume, and seconds allowed per LLM call
+REWRITE_CONCURRENCY = int(os.getenv("REWRITE_CONCURRENCY", "4"))
+REWRITE_CALL_TIMEOUT = float(os.getenv("REWRITE_CALL_TIMEOUT", "60"))
+# "batch": one structured call for all sections, per-section calls only for
+# sections that fail validation. "parallel": one call per section.
+REWRITE_MODE = os.getenv("REWRITE_MODE", "batch").lower()
+REWRITE_BATCH_TIMEOUT = float(os.getenv("REWRITE_BATCH_TIMEOUT", "120"))
+
 
 class ResumeRewriter:
     def __init__(self):
@@ -24,14 +36,10 @@ class ResumeRewriter:
         logger.info(f"Initializing ResumeRewriter with AI_PROVIDER={ai_provider}")
         
         try:
-            if ai_provider == "openai":
-                from .openai_client import OpenAIClient
-                self.ai_client = OpenAIClient()
-                logger.info("ResumeRewriter initialized with OpenAI")
-            else:
-                from .gemini_client import GeminiClient
-                self.ai_client = GeminiClient()
-                logger.info("ResumeRewriter initialized with Gemini")
+            # Preferred provider, routed with hedging/failover when both are configured
+            from .provider_router import create_ai_client
+            self.ai_client = create_ai_client()
+            logger.info(f"ResumeRewriter initialized with {self.ai_client.provider_name}")
             
             self.has_gemini = True  # Keep for compatibility
         except Exception as e:
@@ -48,138 +56,253 @@ class ResumeRewriter:
     ) -> Dict[str, Any]:
         """
         Rewrite entire resume using layout schema.
+        Blocking wrapper around rewrite_full_resume_async for sync callers.
         
         Args:
             layout_schema: Structured resume schema
             job_description: Target job description
             target_keywords: Keywords to integrate
             
+        Returns:
+            Rewritten schema and delta report
+        """
+        # Blocking client methods in threads: async SDK clients are bound to one event loop
+        return asyncio.run(self.rewrite_full_resume_async(
+            layout_schema, job_description, target_keywords, _blocking_client=True
+        ))
+    
+    async def rewrite_full_resume_async(
+        self,
+        layout_schema: Dict[str, Any],
+        job_description: str,
+        target_keywords: List[str],
+        concurrency: Optional[int] = None,
+        call_timeout: Optional[float] = None,
+        on_section: Optional[Callable[[Tuple[int, Optional[int]], Any], None]] = None,
+        _blocking_client: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Rewrite entire resume, fanning section rewrites out concurrently.
+        
+        Every experience entry, the summary and the skills section is one
+        independent LLM call. Calls run at most `concurrency` at a time and each
+        is bounded by `call_timeout`; a failed or timed-out call keeps the
+        original content without holding up the rest. Sections, explanations
+        and changes are assembled in document order regardless of completion order.
+        
+        Args:
+            layout_schema: Structured resume schema
+            job_description: Target job description
+            target_keywords: Keywords to integrate
+            concurrency: Max in-flight LLM calls (default REWRITE_CONCURRENCY)
+            call_timeout: Seconds per LLM call (default REWRITE_CALL_TIMEOUT)
+            on_section: Called with ((section_idx, entry_idx), result or exception)
+                as each unit completes, for streaming partial results
+            
         Returns:
             Rewritten schema and delta report
         """
         if not self.has_gemini:
             raise RuntimeError("Gemini client not available")
         
+        semaphore = asyncio.Semaphore(concurrency or REWRITE_CONCURRENCY)
+        timeout = call_timeout or REWRITE_CALL_TIMEOUT
+        
+        # Compact the JD once; every prompt below embeds this form
+        compact_jd = compact_job_description(job_description)
+        job_description = compact_jd.text
+        
+        async def call(method, *args):
+            async with semaphore:
+                if _blocking_client:
+                    # The worker thread is not interrupted on timeout, but its result is dropped
+                    pending = asyncio.to_thread(getattr(self.ai_client, method), *args)
+                else:
+                    # Native async client: a timeout cancels the in-flight request
+                    pending = getattr(self.ai_client, f"{method}_async")(*args)
+                try:
+                    return await asyncio.wait_for(pending, timeout=timeout)
+                except asyncio.TimeoutError:
+                    raise asyncio.TimeoutError(f"timed out after {timeout:g}s")
+        
+        # One job per rewritable unit, keyed by position in the document
+        jobs = []
+        for idx, section in enumerate(layout_schema.get("sections", [])):
+            section_type = section.get("type")
+            logger.info(f"Processing section {idx}: {section_type}")
+            
+            if section_type == "EXPERIENCE":
+                for entry_idx, entry in enumerate(section.get("entries", [])):
+                    jobs.append(((idx, entry_idx), "rewrite_experience_entry", entry,
+                                 {"kind": "experience", "entry": entry}))
+            elif section_type == "SUMMARY":
+                jobs.append(((idx, None), "rewrite_summary", section.get("raw", ""),
+                             {"kind": "summary", "text": section.get("raw", "")}))
+            elif section_type == "SKILLS":
+                jobs.append(((idx, None), "rewrite_skills", section.get("raw", ""),
+                             {"kind": "skills", "text": section.get("raw", "")}))
+        
+        results = {}
+        if REWRITE_MODE == "batch" and len(jobs) > 1:
+            results = await self._rewrite_batch(jobs, job_description, target_keywords, _blocking_client)
+        
+        # Per-section calls for everything the batch did not return valid
+        pending = [job for job in jobs if job[0] not in results]
+        if results and pending:
+            metrics.inc("rewrite_batch_fallback_sections", len(pending))
+            logger.info(f"Falling back to per-section rewrites for {len(pending)} of {len(jobs)} sections")
+        
+        if on_section:
+            for key, result in results.items():
+                on_section(key, result)
+        
+        async def run(key, method, arg):
+            try:
+                outcome = await call(method, arg, job_description, target_keywords)
+            except Exception as e:
+                # One failing call must not cancel its siblings
+                outcome = e
+            if on_section:
+                on_section(key, outcome)
+            return outcome
+        
+        outcomes = await asyncio.gather(*(run(key, method, arg) for key, method, arg, _ in pending))
+        results.update({job[0]: outcome for job, outcome in zip(pending, outcomes)})
+        
+        rewritten_schema, explanations, changes = self._assemble_rewrite(layout_schema, results)
+        
+        # Generate delta report
+        delta_report = self._generate_delta_report(
+            layout_schema,
+            rewritten_schema,
+            changes,
+            target_keywords
+        )
+        delta_report["jd_tokens"] = compact_jd.to_dict()
+        
+        return {
+            "rewritten_schema": rewritten_schema,
+            "explanations": explanations,
+            "delta_report": delta_report
+        }
+    
+    async def _rewrite_batch(
+        self,
+        jobs: List[Tuple],
+        job_description: str,
+        target_keywords: List[str],
+        blocking_client: bool
+    ) -> Dict[Tuple[int, Optional[int]], Any]:
+        """
+        Rewrite every section in one structured LLM call.
+        
+        Returns:
+            (section_idx, entry_idx) -> result for sections that passed validation;
+            empty when the batch call itself fails
+        """
+        items = [{"id": f"s{key[0]}" + (f"e{key[1]}" if key[1] is not None else ""), **item}
+                 for key, _, _, item in jobs]
+        try:
+            if blocking_client:
+                pending = asyncio.to_thread(self.ai_client.rewrite_sections_batch, items, job_description, target_keywords)
+            else:
+                pending = self.ai_client.rewrite_sections_batch_async(items, job_description, target_keywords)
+            by_id = await asyncio.wait_for(pending, timeout=REWRITE_BATCH_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Batched rewrite failed, using per-section calls: {e or type(e).__name__}")
+            metrics.inc("rewrite_batch_failures")
+            return {}
+        
+        metrics.inc("rewrite_batch_calls")
+        return {key: by_id[item["id"]] for (key, _, _, _), item in zip(jobs, items) if item["id"] in by_id}
+    
+    def _assemble_rewrite(
+        self,
+        layout_schema: Dict[str, Any],
+        results: Dict[Tuple[int, Optional[int]], Any]
+    ) -> Tuple[Dict[str, Any], List[str], List[Dict[str, Any]]]:
+        """
+        Build the rewritten schema from per-call results, in document order.
+        
+        Args:
+            layout_schema: Original layout schema
+            results: (section_idx, entry_idx) -> AI client result or exception
+            
+        Returns:
+            Tuple of (rewritten_schema, explanations, changes)
+        """
         rewritten_schema = layout_schema.copy()
         rewritten_schema["sections"] = []
         explanations = []
         changes = []
         
-        # Process each section
         for idx, section in enumerate(layout_schema.get("sections", [])):
             section_type = section.get("type")
             
-            logger.info(f"Processing section {idx}: {section_type}")
-            
             if section_type == "EXPERIENCE":
                 # Rewrite each experience entry
                 rewritten_entries = []
                 for entry_idx, entry in enumerate(section.get("entries", [])):
-                    try:
-                        result = self.ai_client.rewrite_experience_entry(
-                            entry,
-                            job_description,
-                            target_keywords
-                        )
-                        
-                        # Create rewritten entry
-                        rewritten_entry = entry.copy()
-                        original_bullets = entry.get("bullets", [])
-                        rewritten_entry["bullets"] = result.get("bullets", original_bullets)
-                        
-                        rewritten_entries.append(rewritten_entry)
-                        explanations.append(f"Experience {entry_idx + 1} ({entry.get('company', 'Unknown')}): {result.get('explanation', 'Rewritten')}")
-                        
-                        # Track changes
-                        for i, (orig, new) in enumerate(zip(original_bullets, rewritten_entry["bullets"])):
-                            if orig != new:
-                                changes.append({
-                                    "section": f"Experience - {entry.get('company', 'Unknown')}",
-                                    "bullet_index": i,
-                                    "original": orig,
-                                    "rewritten": new
-                                })
-                    except Exception as e:
-                        logger.error(f"Failed to rewrite experience entry {entry_idx}: {e}")
+                    result = results.get((idx, entry_idx))
+                    if isinstance(result, BaseException):
+                        error = str(result)
+                        logger.error(f"Failed to rewrite experience entry {entry_idx}: {error}")
                         rewritten_entries.append(entry)
-                        explanations.append(f"Experience {entry_idx + 1}: Failed to rewrite - {str(e)}")
+                        explanations.append(f"Experience {entry_idx + 1}: Failed to rewrite - {error}")
+                        continue
+                    
+                    # Create rewritten entry
+                    rewritten_entry = entry.copy()
+                    original_bullets = entry.get("bullets", [])
+                    rewritten_entry["bullets"] = result.get("bullets", original_bullets)
+                    
+                    rewritten_entries.append(rewritten_entry)
+                    explanations.append(f"Experience {entry_idx + 1} ({entry.get('company', 'Unknown')}): {result.get('explanation', 'Rewritten')}")
+                    
+                    # Track changes
+                    for i, (orig, new) in enumerate(zip(original_bullets, rewritten_entry["bullets"])):
+                        if orig != new:
+                            changes.append({
+                                "section": f"Experience - {entry.get('company', 'Unknown')}",
+                                "bullet_index": i,
+                                "original": orig,
+                                "rewritten": new
+                            })
                 
                 rewritten_section = section.copy()
                 rewritten_section["entries"] = rewritten_entries
                 rewritten_schema["sections"].append(rewritten_section)
             
-            elif section_type == "SUMMARY":
-                # Rewrite summary
-                try:
-                    result = self.ai_client.rewrite_summary(
-                        section.get("raw", ""),
-                        job_description,
-                        target_keywords
-                    )
-                    
-                    rewritten_section = section.copy()
-                    original_content = section.get("raw", "")
-                    rewritten_section["raw"] = result.get("content", original_content)
-                    
-                    rewritten_schema["sections"].append(rewritten_section)
-                    explanations.append(f"Summary: {result.get('explanation', 'Rewritten')}")
-                    
-                    if original_content != rewritten_section["raw"]:
-                        changes.append({
-                            "section": "Summary",
-                            "original": original_content,
-                            "rewritten": rewritten_section["raw"]
-                        })
-                except Exception as e:
-                    logger.error(f"Failed to rewrite summary: {e}")
+            elif section_type in ("SUMMARY", "SKILLS"):
+                label = section_type.title()
+                result = results.get((idx, None))
+                if isinstance(result, BaseException):
+                    error = str(result)
+                    logger.error(f"Failed to rewrite {label.lower()}: {error}")
                     rewritten_schema["sections"].append(section)
-                    explanations.append(f"Summary: Failed to rewrite - {str(e)}")
-            
-            elif section_type == "SKILLS":
-                # Rewrite skills
-                try:
-                    result = self.ai_client.rewrite_skills(
-                        section.get("raw", ""),
-                        job_description,
-                        target_keywords
-                    )
-                    
-                    rewritten_section = section.copy()
-                    original_content = section.get("raw", "")
-                    rewritten_section["raw"] = result.get("content", original_content)
-                    
-                    rewritten_schema["sections"].append(rewritten_section)
-                    explanations.append(f"Skills: {result.get('explanation', 'Rewritten')}")
-                    
-                    if original_content != rewritten_section["raw"]:
-                        changes.append({
-                            "section": "Skills",
-                            "original": original_content,
-                            "rewritten": rewritten_section["raw"]
-                        })
-                except Exception as e:
-                    logger.error(f"Failed to rewrite skills: {e}")
-                    rewritten_schema["sections"].append(section)
-                    explanations.append(f"Skills: Failed to rewrite - {str(e)}")
+                    explanations.append(f"{label}: Failed to rewrite - {error}")
+                    continue
+                
+                rewritten_section = section.copy()
+                original_content = section.get("raw", "")
+                rewritten_section["raw"] = result.get("content", original_content)
+                
+                rewritten_schema["sections"].append(rewritten_section)
+                explanations.append(f"{label}: {result.get('explanation', 'Rewritten')}")
+                
+                if original_content != rewritten_section["raw"]:
+                    changes.append({
+                        "section": label,
+                        "original": original_content,
+                        "rewritten": rewritten_section["raw"]
+                    })
             
             else:
                 # Keep other sections unchanged (CONTACT, EDUCATION, etc.)
                 rewritten_schema["sections"].append(section)
                 logger.info(f"Keeping {section_type} section unchanged")
         
-        # Generate delta report
-        delta_report = self._generate_delta_report(
-            layout_schema,
-            rewritten_schema,
-            changes,
-            target_keywords
-        )
-        
-        return {
-            "rewritten_schema": rewritten_schema,
-            "explanations": explanations,
-            "delta_report": delta_report
-        }
+        return rewritten_schema, explanations, changes
     
     def _generate_delta_report(
         self,
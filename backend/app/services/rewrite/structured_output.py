@@ -0,0 +1,306 @@
+"""
+Structured LLM output: tolerant JSON repair and schema validation.
+
+Models asked for JSON still wrap it in code fences, add prose around it,
+leave trailing commas or stop mid-object when they hit the token limit.
+`repair_json` scans the text once, keeps track of open strings and
+containers, and recovers the largest well-formed prefix instead of giving
+up. `validate` checks the result against a small JSON-Schema subset and
+reports problems per top-level field, so callers can re-ask the model for
+just those fields.
+"""
+
+import json
+import logging
+from typing import Dict, Any, List, Tuple
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class JSONRepairError(ValueError):
+    pass
+
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def repair_json(text: str) -> Any:
+    """
+    Parse model output as JSON, repairing what can be repaired.
+
+    Handles code fences and surrounding prose, trailing commas, raw control
+    characters inside strings and truncated output (open strings and
+    containers are closed; a dangling key or partial value is dropped).
+
+    Raises:
+        JSONRepairError: no JSON value could be recovered
+    """
+    if not text:
+        raise JSONRepairError("Empty response")
+
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        raise JSONRepairError("No JSON object in response")
+    start = min(starts)
+
+    try:
+        # Fast path: well-formed JSON followed by nothing or a closing fence
+        value, _ = json.JSONDecoder(strict=False).raw_decode(text, start)
+        return value
+    except json.JSONDecodeError:
+        pass
+
+    out: List[str] = []
+    stack: List[str] = []
+    # (length of `out`, open containers) after each complete member, for truncation
+    cut_points: List[Tuple[int, List[str]]] = []
+    in_string = False
+    escaped = False
+
+    for ch in text[start:]:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+            out.append(ch)
+        elif ch in _CLOSERS:
+            stack.append(ch)
+            out.append(ch)
+        elif ch in "}]":
+            if not stack or _CLOSERS[stack[-1]] != ch:
+                # Stray closer: ignore it
+                continue
+            _strip_trailing_comma(out)
+            stack.pop()
+            out.append(ch)
+            if not stack:
+                break
+            cut_points.append((len(out), list(stack)))
+        elif ch == ",":
+            cut_points.append((len(out), list(stack)))
+            out.append(ch)
+        elif ch == "`" and not stack:
+            break
+        else:
+            out.append(ch)
+
+    candidates = []
+    if in_string or stack:
+        # Truncated: close what is open, or back off to the last complete member.
+        # A string cut mid-way is a partial value, so backing off is preferred then.
+        tail = list(out)
+        if in_string:
+            if escaped:
+                tail.pop()
+            tail.append('"')
+        backoffs = [_close(out[:length], open_stack) for length, open_stack in reversed(cut_points)]
+        closed = _close(tail, stack)
+        candidates = backoffs + [closed] if in_string else [closed] + backoffs
+    else:
+        candidates.append("".join(out))
+
+    for candidate in candidates:
+        try:
+            value = json.loads(candidate, strict=False)
+        except json.JSONDecodeError:
+            continue
+        metrics.inc("llm_json_repairs")
+        return value
+    raise JSONRepairError("Could not repair JSON response")
+
+
+def _strip_trailing_comma(out: List[str]):
+    i = len(out) - 1
+    while i >= 0 and out[i].isspace():
+        i -= 1
+    if i >= 0 and out[i] == ",":
+        del out[i]
+
+
+def _close(out: List[str], stack: List[str]) -> str:
+    text = "".join(out).rstrip()
+    # A dangling separator or key has no value to go with it
+    while text and text[-1] in ",:":
+        separator = text[-1]
+        text = text[:-1].rstrip()
+        if separator == ":" and text.endswith('"') and stack and stack[-1] == "{":
+            # Drop the orphaned key as well (after a "," the string is a complete value)
+            key_start = text.rfind('"', 0, len(text) - 1)
+            text = text[:key_start].rstrip()
+    return text + "".join(_CLOSERS[c] for c in reversed(stack))
+
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool
+}
+
+
+def _check(value: Any, schema: Dict[str, Any], path: str, problems: List[Tuple[str, str]]):
+    expected = schema.get("type")
+    if expected and not isinstance(value, _TYPES[expected]) or \
+            (expected in ("number", "integer") and isinstance(value, bool)):
+        problems.append((path, f"expected {expected}"))
+        return
+    if "enum" in schema and value not in schema["enum"]:
+        problems.append((path, f"expected one of {schema['enum']}"))
+    if expected == "string" and len(value.strip()) < schema.get("minLength", 0):
+        problems.append((path, "must not be empty"))
+    if expected == "array":
+        if "minItems" in schema and len(value) < schema["minItems"] or \
+                "maxItems" in schema and len(value) > schema["maxItems"]:
+            if schema.get("minItems") == schema.get("maxItems"):
+                problems.append((path, f"expected exactly {schema['minItems']} items, got {len(value)}"))
+            else:
+                problems.append((path, f"expected {schema.get('minItems', 0)}-{schema.get('maxItems', 'n')} items, got {len(value)}"))
+        if "items" in schema:
+            for i, item in enumerate(value):
+                _check(item, schema["items"], f"{path}[{i}]", problems)
+    if expected == "object":
+        for field in schema.get("required", []):
+            if field not in value:
+                problems.append((f"{path}.{field}" if path else field, "missing"))
+        for field, subschema in schema.get("properties", {}).items():
+            if field in value:
+                _check(value[field], subschema, f"{path}.{field}" if path else field, problems)
+
+
+def validate(value: Any, schema: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Validate against a JSON-Schema subset (type, required, properties, items,
+    minItems/maxItems, minLength, enum).
+
+    Returns:
+        top-level field -> first problem found under it ("" when the value
+        itself is not an object); empty when valid
+    """
+    problems: List[Tuple[str, str]] = []
+    _check(value, schema, "", problems)
+    by_field: Dict[str, str] = {}
+    for path, reason in problems:
+        field = path.split(".")[0].split("[")[0]
+        by_field.setdefault(field, f"{path}: {reason}" if path != field else reason)
+    return by_field
+
+
+def field_schema(schema: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Sub-schema covering only `fields`, for a targeted re-ask."""
+    properties = schema.get("properties", {})
+    return {
+        "type": "object",
+        "properties": {f: properties[f] for f in fields if f in properties},
+        "required": [f for f in fields if f in properties]
+    }
+
+
+def describe_schema(schema: Dict[str, Any]) -> str:
+    return json.dumps(schema, indent=2)
+
+
+def experience_schema(bullet_count: int) -> Dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": {
+            "bullets": {
+                "type": "array",
+                "items": {"type": "string", "minLength": 1},
+                "minItems": bullet_count,
+                "maxItems": bullet_count
+            },
+            "explanation": {"type": "string"}
+        },
+        "required": ["bullets"]
+    }
+
+
+CONTENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "content": {"type": "string", "minLength": 1},
+        "explanation": {"type": "string"}
+    },
+    "required": ["content"]
+}
+
+BRUTAL_REVIEW_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "plain_text": {"type": "string", "minLength": 1},
+        "marked_up_resume": {"type": "string", "minLength": 1},
+        "changes": {"type": "array", "items": {"type": "object"}},
+        "company_expectations": {
+            "type": "object",
+            "properties": {
+                "role_summary": {"type": "string"},
+                "what_the_company_cares_about": {"type": "array", "items": {"type": "string"}},
+                "ideal_candidate_snapshot": {"type": "array", "items": {"type": "string"}}
+            },
+            "required": ["role_summary", "what_the_company_cares_about", "ideal_candidate_snapshot"]
+        },
+        "harsh_review": {
+            "type": "object",
+            "properties": {
+                "overall_verdict": {"type": "string"},
+                "strengths": {"type": "array"},
+                "weaknesses": {"type": "array"},
+                "missing_or_weak_skills": {"type": "array"},
+                "risk_flags": {"type": "array"},
+                "would_I_interview_you": {"type": "string"},
+                "rationale": {"type": "string"},
+                "top_3_actions": {"type": "array"}
+            },
+            "required": ["overall_verdict", "strengths", "weaknesses", "would_I_interview_you", "top_3_actions"]
+        }
+    },
+    "required": ["plain_text", "marked_up_resume", "changes", "company_expectations", "harsh_review"]
+}
+
+INSIGHTS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "executive_summary": {"type": "string", "minLength": 1},
+        "strengths": {"type": "array", "items": {"type": "string"}},
+        "gaps": {"type": "array", "items": {"type": "string"}},
+        "tactical_actions": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["executive_summary", "strengths", "gaps", "tactical_actions"]
+}
+
+# Chunked brutal review: one part of the resume (map) ...
+CHUNK_REVIEW_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "plain_text": {"type": "string", "minLength": 1},
+        "marked_up_resume": {"type": "string", "minLength": 1},
+        "changes": {"type": "array", "items": {"type": "object"}},
+        "strengths": {"type": "array"},
+        "weaknesses": {"type": "array"},
+        "missing_or_weak_skills": {"type": "array"},
+        "risk_flags": {"type": "array"}
+    },
+    "required": ["plain_text", "marked_up_resume", "changes", "strengths", "weaknesses"]
+}
+
+# ... and the overall verdict from the per-part findings (reduce)
+REVIEW_MERGE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "company_expectations": BRUTAL_REVIEW_SCHEMA["properties"]["company_expectations"],
+        "harsh_review": BRUTAL_REVIEW_SCHEMA["properties"]["harsh_review"]
+    },
+    "required": ["company_expectations", "harsh_review"]
+}
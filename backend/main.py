@@ -1,8 +1,14 @@
-from fastapi import FastAPI, File, UploadFile, Form
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from collections import OrderedDict
 import tempfile
 import os
+import json
+import time
+import asyncio
+import hashlib
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -16,29 +22,19 @@ from app.services.ingestion.pdf_parser import PDFParser
 from app.services.features.extractor import FeatureExtractor
 from app.services.ml.ml_friendliness_classifier import MLFriendlinessClassifier
 from app.services.ml.visibility_scorer import VisibilityScorer
-from app.services.ml.generative_feedback import GenerativeFeedback
+from app.services.ml.generative_feedback import GenerativeFeedback, FEEDBACK_FEATURE_FIELDS
+from app.services.ml.requirement_coverage import RequirementCoverage
+from app.services.ingestion.layout_schema_extractor import LayoutSchemaExtractor
+from app.services.ml.score_distribution import get_score_distribution
+from app.core.metrics import metrics
+from app.core.llm_usage import LLMUsageMiddleware
+from app.core.lifecycle import readiness, build_lifespan, preload_if_requested, WARMUP_RESUME, WARMUP_JD
 
-from fastapi.staticfiles import StaticFiles
-from app.api.v1.endpoints import rewrite
-
-app = FastAPI(title="ATS Emulator API", version="3.0")
-
-# Mount static files for downloads
-output_dir = Path("outputs")
-output_dir.mkdir(exist_ok=True)
-app.mount("/outputs", StaticFiles(directory="outputs"), name="outputs")
-
-# CORS middleware for frontend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:5173", "http://localhost:5174", "http://localhost:3000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include routers
-app.include_router(rewrite.router, prefix="/api/v1", tags=["rewrite"])
+from app.api.v1.endpoints import rewrite, jobs, artifacts
+from app.core.artifacts import artifact_store
+from app.core.jobs import job_queue, QUEUED, RUNNING, SUCCEEDED
+from app.services.export.office_pool import office_pool
+from app.services.rewrite.pipeline import pipeline_event
 
 # Service instances (lazy loaded)
 _services = {}
@@ -63,11 +59,95 @@ def get_visibility_scorer():
         _services['visibility_scorer'] = VisibilityScorer()
     return _services['visibility_scorer']
 
+def get_requirement_coverage():
+    if 'requirement_coverage' not in _services:
+        # Share the already-loaded SentenceTransformer instead of loading another copy
+        _services['requirement_coverage'] = RequirementCoverage(get_visibility_scorer().semantic_model)
+    return _services['requirement_coverage']
+
+def get_schema_extractor():
+    if 'schema_extractor' not in _services:
+        _services['schema_extractor'] = LayoutSchemaExtractor()
+    return _services['schema_extractor']
+
 def get_generative_feedback():
     if 'generative_feedback' not in _services:
         _services['generative_feedback'] = GenerativeFeedback()
     return _services['generative_feedback']
 
+async def _insights_job(params, input_bytes, checkpoint):
+    yield pipeline_event("stage", stage="insights", status="started")
+    ai_insights = await get_generative_feedback().generate_feedback_async(
+        params["features"], params["friendliness"], params["relevance"]
+    )
+    yield pipeline_event("stage", stage="insights", status="done")
+    yield pipeline_event("complete", **ai_insights)
+
+job_queue.register("analysis_insights", _insights_job, concurrency=8)
+
+# Analysis digest -> insights job, so re-analysing the same resume reuses its insights
+_insights_tokens: "OrderedDict[str, str]" = OrderedDict()
+_INSIGHTS_TOKENS_MAX = 1024
+# Upper bound for GET /analyze/insights/{token}?wait=
+INSIGHTS_MAX_WAIT = 30.0
+
+async def _submit_insights(features, friendliness, relevance):
+    """Insights token for this analysis, queueing the AI insights job unless one is reusable."""
+    params = {
+        "features": {k: features[k] for k in FEEDBACK_FEATURE_FIELDS if k in features},
+        "friendliness": friendliness,
+        "relevance": relevance
+    }
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    token = _insights_tokens.get(digest)
+    if token is not None:
+        job = await job_queue.get_async(token)
+        if job is not None and job["status"] in (QUEUED, RUNNING, SUCCEEDED):
+            _insights_tokens.move_to_end(digest)
+            metrics.inc("insights_reused")
+            return token
+    token = await job_queue.submit_async("analysis_insights", params)
+    _insights_tokens[digest] = token
+    while len(_insights_tokens) > _INSIGHTS_TOKENS_MAX:
+        _insights_tokens.popitem(last=False)
+    return token
+
+def _warm_features():
+    features = get_feature_extractor().extract_features({"raw_text": WARMUP_RESUME})
+    get_friendliness_classifier().predict(features)
+
+def _warm_relevance():
+    get_visibility_scorer().predict(WARMUP_RESUME, WARMUP_JD, record=False)
+    get_requirement_coverage()
+
+# Models warmed at startup; /ready stays 503 until all of them are loaded
+WARMERS = {
+    "pdf_parser": get_pdf_parser,
+    "features": _warm_features,
+    "relevance": _warm_relevance,
+}
+preload_if_requested(WARMERS)
+
+app = FastAPI(title="ATS Emulator API", version="3.0", lifespan=build_lifespan(WARMERS, background=[job_queue, office_pool, artifact_store]))
+
+# Per-request LLM token/cost accounting and budgets (inside CORS, so 429s carry CORS headers)
+app.add_middleware(LLMUsageMiddleware)
+
+# CORS middleware for frontend
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:5173", "http://localhost:5174", "http://localhost:3000"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["X-LLM-Usage", "ETag", "Content-Range", "Content-Disposition"],
+)
+
+# Include routers
+app.include_router(rewrite.router, prefix="/api/v1", tags=["rewrite"])
+app.include_router(jobs.router, prefix="/api/v1", tags=["jobs"])
+app.include_router(artifacts.router, prefix="/api/v1", tags=["artifacts"])
+
 @app.get("/")
 async def root():
     return {"message": "ATS Emulator API v3.0 - Operation ATS Heist"}
@@ -76,6 +156,17 @@ async def root():
 async def health():
     return {"status": "operational", "version": "3.0"}
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once every model is loaded and warmed, 503 before."""
+    status = readiness.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+@app.get("/metrics")
+async def get_metrics():
+    """In-process metrics (inference batching, caches, LLM usage)."""
+    return metrics.snapshot()
+
 @app.post("/analyze")
 async def analyze_resume(
     file: UploadFile = File(...),
@@ -88,7 +179,10 @@ async def analyze_resume(
         - features: Extracted features (NER, timeline, category, etc.)
         - friendliness: ATS friendliness score and risks
         - relevance: Job matching score (if JD provided)
-        - ai_insights: Qualitative feedback
+        - requirement_coverage: JD requirement x resume bullet similarity matrix (if JD provided)
+        - ai_insights: Rule-based qualitative feedback (no LLM call)
+        - insights_token: Token for the AI insights computed in the background
+          (GET /analyze/insights/{token}); null when no AI provider is configured
     """
     try:
         # Read file content
@@ -100,28 +194,52 @@ async def analyze_resume(
         
         # Extract features (lazy loaded)
         feature_extractor = get_feature_extractor()
-        features = feature_extractor.extract_features(parsing_result)
+        # Model inference runs in the threadpool so concurrent requests can share batches
+        features = await run_in_threadpool(feature_extractor.extract_features, parsing_result)
         
         # Get friendliness score (lazy loaded)
         friendliness_classifier = get_friendliness_classifier()
         friendliness = friendliness_classifier.predict(features)
         
+        # Empirical percentile among previously analyzed resumes of the same category
+        category = features.get("predicted_category")
+        score_distribution = get_score_distribution()
+        friendliness["percentile"] = score_distribution.percentile("friendliness_ml", friendliness.get("score", 0), category)
+        score_distribution.record("friendliness_ml", friendliness.get("score"), category)
+        
         # Get relevance score if JD provided (lazy loaded)
         relevance = None
+        requirement_coverage = None
         if job_description:
             raw_text = parsing_result.get("raw_text", "")
             visibility_scorer = get_visibility_scorer()
-            relevance = visibility_scorer.predict(raw_text, job_description)
+            relevance = await run_in_threadpool(
+                visibility_scorer.predict, raw_text, job_description, category=category
+            )
+            
+            # Requirement coverage matrix (no LLM call)
+            layout_schema = await run_in_threadpool(
+                get_schema_extractor().extract_from_parsed_data, parsing_result, file.filename
+            )
+            requirement_coverage = await run_in_threadpool(
+                get_requirement_coverage().compute, layout_schema, job_description
+            )
             
-        # Generate AI Insights (lazy loaded)
+        # Deterministic insights now; the LLM round trip runs in the background
         generative_feedback = get_generative_feedback()
-        ai_insights = generative_feedback.generate_feedback(features, friendliness, relevance)
+        ai_insights = generative_feedback.generate_rule_based_feedback(features, friendliness, relevance)
+        insights_token = None
+        if generative_feedback.has_gemini:
+            insights_token = await _submit_insights(features, friendliness, relevance)
         
         return JSONResponse({
             "features": features,
             "friendliness": friendliness,
             "relevance": relevance,
-            "ai_insights": ai_insights
+            "requirement_coverage": requirement_coverage,
+            "ai_insights": ai_insights,
+            "insights_token": insights_token,
+            "insights_url": f"/analyze/insights/{insights_token}" if insights_token else None
         })
         
     except Exception as e:
@@ -132,6 +250,35 @@ async def analyze_resume(
             content={"error": str(e)}
         )
 
+@app.get("/analyze/insights/{token}")
+async def get_ai_insights(token: str, wait: float = 0):
+    """
+    AI insights for an /analyze response.
+
+    Args:
+        token: insights_token from /analyze
+        wait: seconds to hold the request open until the insights are ready
+              (long poll, capped at INSIGHTS_MAX_WAIT)
+
+    Returns:
+        status (pending|ready|failed) and, once ready, ai_insights in the same
+        shape as /analyze's (rule-based again if the AI call failed)
+    """
+    deadline = time.monotonic() + min(max(wait, 0.0), INSIGHTS_MAX_WAIT)
+    while True:
+        job = await job_queue.get_async(token)
+        if job is None or job["type"] != "analysis_insights":
+            raise HTTPException(status_code=404, detail="Unknown insights token")
+        if job["status"] not in (QUEUED, RUNNING) or time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(0.25)
+
+    if job["status"] == SUCCEEDED:
+        return {"token": token, "status": "ready", "ai_insights": job["result"]}
+    if job["status"] in (QUEUED, RUNNING):
+        return {"token": token, "status": "pending", "ai_insights": None}
+    return {"token": token, "status": "failed", "ai_insights": None, "error": job.get("error")}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
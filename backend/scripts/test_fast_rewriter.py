@@ -0,0 +1,62 @@
+"""
+Tests for the deterministic fast rewriter (no API keys needed).
+Run with pytest or directly: python scripts/test_fast_rewriter.py
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.rewrite.fast_rewriter import FastRewriter, find_skills
+
+AMBIGUOUS_EVIDENCE = (
+    "Led go-to-market launch; built R&D dashboards; helped the team spark adoption; "
+    "Swift turnaround; grade C"
+)
+
+
+def test_everyday_words_are_not_skill_evidence():
+    result = FastRewriter().rewrite_skills(
+        "Python, SQL",
+        "We use Go, R, Swift, Spark and C.",
+        ["Go", "R", "Swift", "Spark", "C"],
+        evidence_text=AMBIGUOUS_EVIDENCE
+    )
+    assert result["added"] == []
+    assert set(result["unsupported"]) == {"Go", "R", "Swift", "Spark", "C"}
+    assert "backed by your experience" not in result["explanation"]
+
+
+def test_everyday_words_are_not_skills():
+    assert find_skills("Rest of the day") == []
+    assert find_skills(AMBIGUOUS_EVIDENCE) == []
+
+
+def test_skills_used_as_skills_are_evidence():
+    result = FastRewriter().rewrite_skills(
+        "Python",
+        "",
+        ["Go", "Spark", "REST API", "R"],
+        evidence_text="Built payment services in Go; ran Spark jobs on EMR; designed REST endpoints\nTools: R, Excel"
+    )
+    assert result["added"] == ["Go", "Spark", "REST API", "R"]
+
+
+def main():
+    tests = [value for name, value in globals().items() if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    print(f"\nTotal: {len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
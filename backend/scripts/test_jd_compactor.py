@@ -0,0 +1,91 @@
+"""
+Tests for job description compaction (no API keys needed).
+Run with pytest or directly: python scripts/test_jd_compactor.py
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.rewrite.jd_compactor import JDCompactor
+
+
+def compact(text: str) -> str:
+    return JDCompactor()._compact_text(text)
+
+
+def test_title_mentioning_privacy_is_kept():
+    result = compact(
+        "Privacy Engineer\n"
+        "You will design data-retention pipelines and review systems for privacy risks.\n"
+        "Requirements:\n"
+        "- 3+ years of Python"
+    )
+    assert result.startswith("Title: Privacy Engineer")
+    assert "design data-retention pipelines" in result
+    assert "- 3+ years of Python" in result
+
+
+def test_titles_with_boilerplate_words_are_kept():
+    for title in ("Software Engineer, Privacy & Security", "Compensation Analyst"):
+        result = compact(f"{title}\nRequirements:\n- SQL")
+        assert result.startswith(f"Title: {title}"), result
+
+
+def test_work_item_under_legal_heading_is_kept():
+    result = compact(
+        "Senior Backend Engineer\n"
+        "What You'll Do:\n"
+        "Legal And Compliance Tooling\n"
+        "- Build contract-analysis services in Python"
+    )
+    assert "- Build contract-analysis services in Python" in result
+
+
+def test_boilerplate_headings_are_dropped():
+    result = compact(
+        "Backend Engineer\n"
+        "Requirements:\n"
+        "- Go and PostgreSQL\n"
+        "Benefits:\n"
+        "- Free lunch every day\n"
+        "Diversity & Inclusion:\n"
+        "We welcome everyone.\n"
+        "About Us\n"
+        "We build payment software."
+    )
+    assert "- Go and PostgreSQL" in result
+    for dropped in ("Free lunch", "welcome everyone", "payment software"):
+        assert dropped not in result
+
+
+def test_preferred_heading_needs_whole_word():
+    result = compact(
+        "Data Engineer\n"
+        "Surplus Planning Tools:\n"
+        "- Maintain planning dashboards\n"
+        "Bonus Points:\n"
+        "- Airflow"
+    )
+    assert "Preferred:\n- Airflow" in result
+    assert "Requirements:\n- Maintain planning dashboards" in result
+
+
+def main():
+    tests = [value for name, value in globals().items() if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    print(f"\nTotal: {len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
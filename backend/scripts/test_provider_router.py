@@ -0,0 +1,179 @@
+"""
+Tests for the provider router: hedging, failover and circuit breakers,
+against local fake providers (no API keys needed).
+Run with pytest or directly: python scripts/test_provider_router.py
+"""
+
+import sys
+import os
+import time
+import asyncio
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.rewrite import provider_router
+from app.services.rewrite.base_client import BaseLLMClient
+from app.services.rewrite.provider_router import ProviderRouter, CLOSED, OPEN, HALF_OPEN
+
+# Short timings so the tests run in well under a second each
+provider_router.HEDGE_DEFAULT_DELAY = 0.25
+provider_router.BREAKER_MIN_CALLS = 5
+provider_router.BREAKER_ERROR_RATE = 0.5
+provider_router.BREAKER_COOLDOWN = 0.2
+
+VALID_JSON = '{"content": "ok"}'
+
+
+class FakeProvider(BaseLLMClient):
+    """Answers after `delay` seconds with `response`, or raises `error`."""
+
+    def __init__(self, name: str, delay: float = 0.0, response: str = VALID_JSON, error: Exception = None):
+        self.provider_name = name
+        self.model_name = "fake"
+        self.temperature = 0.2
+        self.delay = delay
+        self.response = response
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    def _generate(self, prompt, system=None, temperature=None, max_tokens=None, json_mode=False):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.response
+
+    async def _generate_async(self, prompt, system=None, temperature=None, max_tokens=None, json_mode=False):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return self.response
+
+
+def test_slow_primary_is_hedged():
+    slow = FakeProvider("slow", delay=1.0, response='{"content": "slow"}')
+    fast = FakeProvider("fast", response='{"content": "fast"}')
+    router = ProviderRouter([slow, fast], hedging=True)
+    started = time.monotonic()
+    assert router._generate("prompt", json_mode=True) == '{"content": "fast"}'
+    elapsed = time.monotonic() - started
+    assert 0.2 <= elapsed < 0.8, elapsed
+    assert slow.calls == 1 and fast.calls == 1
+
+
+def test_slow_primary_is_hedged_async():
+    slow = FakeProvider("slow", delay=1.0, response='{"content": "slow"}')
+    fast = FakeProvider("fast", response='{"content": "fast"}')
+    router = ProviderRouter([slow, fast], hedging=True)
+
+    async def run():
+        started = time.monotonic()
+        text = await router._generate_async("prompt", json_mode=True)
+        return text, time.monotonic() - started
+
+    text, elapsed = asyncio.run(run())
+    assert text == '{"content": "fast"}'
+    assert 0.2 <= elapsed < 0.8, elapsed
+    # The losing request is cancelled in flight
+    assert slow.cancelled == 1
+
+
+def test_no_hedge_when_primary_is_fast():
+    primary = FakeProvider("primary", delay=0.01)
+    secondary = FakeProvider("secondary")
+    router = ProviderRouter([primary, secondary], hedging=True)
+    assert router._generate("prompt") == VALID_JSON
+    assert secondary.calls == 0
+
+
+def test_failing_primary_fails_over():
+    broken = FakeProvider("broken", error=RuntimeError("503 Service Unavailable"))
+    backup = FakeProvider("backup", response='{"content": "backup"}')
+    router = ProviderRouter([broken, backup], hedging=False)
+    assert router._generate("prompt") == '{"content": "backup"}'
+    assert asyncio.run(router._generate_async("prompt")) == '{"content": "backup"}'
+    assert broken.calls == 2 and backup.calls == 2
+
+
+def test_all_providers_failing_raises_last_error():
+    first = FakeProvider("first", error=RuntimeError("first down"))
+    second = FakeProvider("second", error=RuntimeError("second down"))
+    router = ProviderRouter([first, second], hedging=False)
+    try:
+        router._generate("prompt")
+    except RuntimeError as e:
+        assert "second down" in str(e)
+    else:
+        assert False, "expected RuntimeError"
+
+
+def test_breaker_opens_half_opens_and_closes():
+    primary = FakeProvider("primary", error=RuntimeError("500"))
+    backup = FakeProvider("backup")
+    router = ProviderRouter([primary, backup], hedging=False)
+    health = router.health["primary"]
+
+    for _ in range(5):
+        router._generate("prompt")
+    assert health.state == OPEN
+    assert primary.calls == 5
+
+    # Open: the primary is skipped entirely
+    router._generate("prompt")
+    assert primary.calls == 5
+
+    # After the cooldown one trial call goes through; its success closes the breaker
+    time.sleep(provider_router.BREAKER_COOLDOWN + 0.05)
+    assert health.available()
+    primary.error = None
+    assert health.allow() and health.state == HALF_OPEN
+    health.release()
+    router._generate("prompt")
+    assert primary.calls == 6
+    assert health.state == CLOSED
+
+
+def test_failed_trial_reopens_breaker():
+    primary = FakeProvider("primary", error=RuntimeError("500"))
+    backup = FakeProvider("backup")
+    router = ProviderRouter([primary, backup], hedging=False)
+    for _ in range(5):
+        router._generate("prompt")
+    time.sleep(provider_router.BREAKER_COOLDOWN + 0.05)
+    router._generate("prompt")
+    assert primary.calls == 6
+    assert router.health["primary"].state == OPEN
+
+
+def test_invalid_json_loses_the_race():
+    garbage = FakeProvider("garbage", response="Sorry, I cannot help with that.")
+    valid = FakeProvider("valid", delay=0.05, response='{"content": "valid"}')
+    router = ProviderRouter([garbage, valid], hedging=True)
+    assert router._generate("prompt", json_mode=True) == '{"content": "valid"}'
+    assert asyncio.run(router._generate_async("prompt", json_mode=True)) == '{"content": "valid"}'
+    assert router.health["garbage"].snapshot()["error_rate"] == 1.0
+
+
+def main():
+    tests = [value for name, value in globals().items() if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    print(f"\nTotal: {len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""
+Tests for JSON repair of truncated LLM responses (no API keys needed).
+Run with pytest or directly: python scripts/test_structured_output.py
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.rewrite.structured_output import repair_json
+
+
+def test_truncated_after_comma_keeps_value():
+    assert repair_json('{"content":"abc",') == {"content": "abc"}
+
+
+def test_truncated_after_key_drops_key_only():
+    assert repair_json('{"content":"abc","explanation":') == {"content": "abc"}
+
+
+def test_truncated_after_comma_in_array():
+    assert repair_json('{"bullets":["a","b",') == {"bullets": ["a", "b"]}
+
+
+def test_truncated_brutal_review_keeps_harsh_review():
+    text = '{"plain_text":"Jane Doe","harsh_review":{"overall_verdict":"Weak metrics",'
+    result = repair_json(text)
+    assert result["harsh_review"] == {"overall_verdict": "Weak metrics"}
+    assert result["plain_text"] == "Jane Doe"
+
+
+def test_truncated_mid_string_backs_off():
+    assert repair_json('{"content":"abc","explanation":"Added') == {"content": "abc"}
+
+
+def main():
+    tests = [value for name, value in globals().items() if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    print(f"\nTotal: {len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
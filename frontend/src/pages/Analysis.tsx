@@ -8,7 +8,7 @@ import { VendorBadge } from '../components/analysis/VendorBadge';
 import { ScoreGauge } from '../components/analysis/ScoreGauge';
 import { GapVisualizer } from '../components/analysis/GapVisualizer';
 import { IssueCard } from '../components/analysis/IssueCard';
-import { analyzeResume } from '../services/api';
+import { analyzeResume, fetchAIInsights } from '../services/api';
 import type { AnalysisResult } from '../types';
 
 const styles = {
@@ -424,6 +424,14 @@ export const Analysis = () => {
             // Pass jobDescription to analyzeResume if it exists
             const data = await analyzeResume(file, jobDescription || undefined);
             setResult(data);
+            if (data.insights_token) {
+                // Rule-based insights show right away; swap in the AI ones when they land
+                fetchAIInsights(data.insights_token)
+                    .then(insights => {
+                        if (insights) setResult(prev => prev && prev.insights_token === data.insights_token ? { ...prev, ai_insights: insights } : prev);
+                    })
+                    .catch(error => console.error('AI insights failed:', error));
+            }
         } catch (error) {
             console.error('Analysis failed:', error);
         } finally {
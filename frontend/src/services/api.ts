@@ -99,10 +99,27 @@ export const analyzeResume = async (
             level: data.relevance.level
         } : undefined,
         missing_keywords: data.relevance?.missing_keywords || [],
-        ai_insights: data.ai_insights
+        ai_insights: data.ai_insights,
+        insights_token: data.insights_token
     };
 };
 
+// AI insights are computed after /analyze returns; long-poll until they are ready
+export const fetchAIInsights = async (
+    token: string,
+    maxAttempts = 6
+): Promise<AnalysisResult['ai_insights'] | null> => {
+    for (let attempt = 0; attempt < maxAttempts; attempt++) {
+        const response = await api.get<{ status: 'pending' | 'ready' | 'failed'; ai_insights: AnalysisResult['ai_insights'] | null }>(
+            `/analyze/insights/${token}`,
+            { params: { wait: 20 } }
+        );
+        if (response.data.status === 'ready') return response.data.ai_insights;
+        if (response.data.status === 'failed') return null;
+    }
+    return null;
+};
+
 // Templates API
 const mockTemplates: Template[] = [
     {
@@ -216,6 +233,7 @@ export const rewriteSection = async (data: {
     job_description?: string;
     target_keywords?: string[];
     ats_rules?: string[];
+    mode?: 'llm' | 'fast'; // Skills default to 'fast' (no AI call)
 }): Promise<RewriteResult> => {
     const response = await api.post<RewriteResult>('/api/v1/rewrite/section', data);
     return response.data;
@@ -234,6 +252,7 @@ export const rewriteFullResume = async (
     const response = await api.post<FullRewriteResult>('/api/v1/rewrite/full', formData, {
         headers: {
             'Content-Type': 'multipart/form-data',
+            'X-User-Id': userId,
         },
     });
     return response.data;
@@ -280,6 +299,7 @@ export const rewriteWithBrutalFeedback = async (
     const response = await api.post<BrutalRewriteResult>('/api/v1/rewrite/brutal', formData, {
         headers: {
             'Content-Type': 'multipart/form-data',
+            'X-User-Id': userId,
         },
     });
     return response.data;
@@ -52,6 +52,7 @@ export interface AnalysisResult {
         gaps: string[];
         tactical_actions: string[];
     };
+    insights_token?: string | null;
 }
 
 export interface TimelineItem {
@@ -108,6 +109,7 @@ export interface BackendAnalysisResponse {
         gaps: string[];
         tactical_actions: string[];
     };
+    insights_token?: string | null;
 }
 
 // Legacy types (kept for backward compatibility)
@@ -158,6 +160,7 @@ export interface FullRewriteResult {
     before_friendliness: number;
     after_friendliness: number;
     file_url: string;
+    docx_url?: string;
     docx_path?: string;
     pdf_path?: string;
     original_text?: string;